@@ -0,0 +1,94 @@
+"""
+Batching of processed sentences by an estimate of their cost rather than by their number of words.
+
+The tagger and the parser pad every batch into a sentences x length tensor for their word-level LSTM,
+and a words x word length tensor for their character model, and the parser scores every pair of words
+of a sentence.  A batch of a few long sentences, or with a single long word, therefore costs much more
+than its number of words suggests.  BatchCost estimates the cost of a batch from the size of these padded
+tensors, scaled so that a batch without any padding costs about its number of words, and plan_batches
+closes a batch once its cost would go over the budget.
+"""
+
+from collections import namedtuple
+
+PaddingWaste = namedtuple('PaddingWaste', ['words', 'chars'])
+
+class BatchCost():
+    """
+    The cost of a batch of processed sentences, whose first two fields are the word ids and the char ids of every word.
+
+    The cost is the mean of the padded area of the word tensors, of the char tensor divided by the mean word length,
+    and with pairs, of the word pairs scored by the parser divided by the mean sentence length.
+    """
+
+    def __init__(self, data, pairs=False):
+        self.pairs = pairs
+        num_words = sum(len(x[0]) for x in data)
+        num_chars = sum(len(w) for x in data for w in x[1])
+        self.mean_length = max(num_words / max(len(data), 1), 1)
+        self.mean_word_length = max(num_chars / max(num_words, 1), 1)
+
+    def __call__(self, num_sentences, length, num_words, word_length):
+        """ The cost of num_sentences sentences of at most length words, with num_words words of at most word_length chars """
+        costs = [num_sentences * length, num_words * word_length / self.mean_word_length]
+        if self.pairs:
+            costs.append(num_sentences * length * length / self.mean_length)
+        return sum(costs) / len(costs)
+
+
+def plan_batches(data, batch_size, batch_cost=None, min_length_to_batch_separately=None):
+    """
+    Group the sentences of data into batches in their current order.
+
+    Without batch_cost, a batch is closed before it goes over batch_size words.  With a BatchCost,
+    it is closed before its estimated cost goes over batch_size.  A sentence which is longer than
+    min_length_to_batch_separately gets a batch of its own.
+    """
+    res = []
+    current = []
+    currentlen = 0
+    length = 0
+    word_length = 0
+    for x in data:
+        if min_length_to_batch_separately is not None and len(x[0]) > min_length_to_batch_separately:
+            if currentlen > 0:
+                res.append(current)
+                current = []
+                currentlen = 0
+                length = word_length = 0
+            res.append([x])
+            continue
+
+        if batch_cost is None:
+            full = len(x[0]) + currentlen > batch_size
+        else:
+            sent_word_length = max([len(w) for w in x[1]], default=0)
+            full = batch_cost(len(current) + 1, max(length, len(x[0])), currentlen + len(x[0]),
+                              max(word_length, sent_word_length)) > batch_size
+        if full and currentlen > 0:
+            res.append(current)
+            current = []
+            currentlen = 0
+            length = word_length = 0
+        current.append(x)
+        currentlen += len(x[0])
+        if batch_cost is not None:
+            length = max(length, len(x[0]))
+            word_length = max(word_length, sent_word_length)
+
+    if currentlen > 0:
+        res.append(current)
+    return res
+
+def padding_waste(batches):
+    """ The fraction of the word tensors and of the char tensors of the batches which is padding """
+    words = padded_words = chars = padded_chars = 0
+    for batch in batches:
+        lengths = [len(x[0]) for x in batch]
+        word_lengths = [len(w) for x in batch for w in x[1]]
+        words += sum(lengths)
+        padded_words += len(lengths) * max(lengths, default=0)
+        chars += sum(word_lengths)
+        padded_chars += len(word_lengths) * max(word_lengths, default=0)
+    return PaddingWaste(1 - words / padded_words if padded_words else 0.0,
+                        1 - chars / padded_chars if padded_chars else 0.0)
@@ -2,6 +2,7 @@ from __future__ import division
 import torch
 
 import stanza.models.common.seq2seq_constant as constant
+from stanza.models.common import utils
 
 """
  Adapted and modified from the OpenNMT project.
@@ -130,3 +131,72 @@ class Beam(object):
                 hyp[i] = -(cidx+1) # make index 1-based and flip it for token generation
 
         return hyp
+
+
+class BatchBeam(object):
+    """
+    The beams of a whole batch, searched together: the scores, the outputs and the back pointers of all the
+    examples are kept in (batch x size) tensors, and an example leaves the search once the top of its beam is EOS.
+
+    The decoder states of the examples still searched are laid out example by example, `size` rows for each.
+    """
+    def __init__(self, batch_size, size, device=None):
+        self.size = size
+        # the examples still searched
+        self.active = torch.arange(batch_size, device=device)
+        self.scores = torch.zeros(batch_size, size, device=device)
+        # the backpointers and the outputs at each time-step, for all the examples
+        self.prevKs = []
+        self.nextYs = [torch.full((batch_size, size), constant.PAD_ID, dtype=torch.long, device=device)]
+        self.nextYs[0][:, 0] = constant.SOS_ID
+
+    def done(self):
+        return len(self.active) == 0
+
+    def get_current_state(self):
+        "Get the outputs of the active examples for the current timestep (active x size)."
+        return self.nextYs[-1][self.active]
+
+    def advance(self, wordLk):
+        """
+        Advance the beams of the active examples given the log probs of their words `wordLk` (active x size x words).
+
+        Returns: the rows of the decoder states (active x size) from which the beams of the examples which
+        are still active continue (still active x size), flattened to select their next decoder states.
+        """
+        num_active, size, numWords = wordLk.size()
+        if len(self.prevKs) > 0:
+            beamLk = wordLk + self.scores[self.active].unsqueeze(2)
+        else:
+            # first step, expand from the first position
+            beamLk = wordLk[:, :1]
+        bestScores, bestScoresId = beamLk.view(num_active, -1).topk(size, 1, True, True)
+        prevK = bestScoresId // numWords
+
+        # the finished examples keep their beams as they are
+        prevKs = torch.arange(size, device=prevK.device).repeat(len(self.scores), 1)
+        nextYs = torch.full_like(self.nextYs[-1], constant.PAD_ID)
+        prevKs[self.active] = prevK
+        nextYs[self.active] = bestScoresId - prevK * numWords
+        self.scores[self.active] = bestScores
+        self.prevKs.append(prevKs)
+        self.nextYs.append(nextYs)
+
+        # End condition is when top-of-beam is EOS.
+        searching = nextYs[self.active, 0] != constant.EOS_ID
+        origins = prevK + torch.arange(num_active, device=prevK.device).unsqueeze(1) * size
+        self.active = self.active[searching]
+        return origins[searching].view(-1)
+
+    def get_hyps(self):
+        """ The best hypothesis of every example, pruned after its first EOS """
+        _, ks = torch.sort(self.scores, 1, True)
+        k = ks[:, :1]
+        hyps = []
+        for j in range(len(self.prevKs) - 1, -1, -1):
+            hyps.append(self.nextYs[j+1].gather(1, k))
+            k = self.prevKs[j].gather(1, k)
+        if not hyps:
+            return [[] for _ in range(len(self.scores))]
+        hyps = torch.cat(hyps[::-1], 1).tolist()
+        return [utils.prune_hyp(hyp) for hyp in hyps]
@@ -32,6 +32,16 @@ class PairwiseBilinear(nn.Module):
 
         return output
 
+    def aligned(self, input1, input2):
+        ''' The output for each aligned pair of rows of tensors of sizes (N x L x D1) and (N x L x D2): (N x L x O) '''
+        # as in forward, the weight is used as D1 x (O x D2)
+        # ((N x L) x D1) * (D1 x (O x D2)) -> (N x L) x O x D2
+        intermediate = torch.mm(input1.reshape(-1, self.input1_size), self.weight.view(self.input1_size, -1))
+        intermediate = intermediate.view(-1, self.output_size, self.input2_size)
+        # ((N x L) x O x D2) * ((N x L) x D2 x 1) -> (N x L) x O x 1
+        output = intermediate.bmm(input2.reshape(-1, self.input2_size, 1))
+        return output.view(*input1.size()[:-1], self.output_size)
+
 class BiaffineScorer(nn.Module):
     def __init__(self, input1_size, input2_size, output_size):
         super().__init__()
@@ -58,6 +68,12 @@ class PairwiseBiaffineScorer(nn.Module):
         input2 = torch.cat([input2, input2.new_ones(*input2.size()[:-1], 1)], len(input2.size())-1)
         return self.W_bilin(input1, input2)
 
+    def aligned(self, input1, input2):
+        """ Score only the aligned pairs of rows of input1 and input2 """
+        input1 = torch.cat([input1, input1.new_ones(*input1.size()[:-1], 1)], len(input1.size())-1)
+        input2 = torch.cat([input2, input2.new_ones(*input2.size()[:-1], 1)], len(input2.size())-1)
+        return self.W_bilin.aligned(input1, input2)
+
 class DeepBiaffineScorer(nn.Module):
     def __init__(self, input1_size, input2_size, hidden_size, output_size, hidden_func=F.relu, dropout=0, pairwise=True):
         super().__init__()
@@ -71,7 +87,15 @@ class DeepBiaffineScorer(nn.Module):
         self.dropout = nn.Dropout(dropout)
 
     def forward(self, input1, input2):
-        return self.scorer(self.dropout(self.hidden_func(self.W1(input1))), self.dropout(self.hidden_func(self.W2(input2))))
+        return self.scorer(*self.hidden(input1, input2))
+
+    def hidden(self, input1, input2):
+        """ The hidden layers of the inputs, which forward scores against each other """
+        return self.dropout(self.hidden_func(self.W1(input1))), self.dropout(self.hidden_func(self.W2(input2)))
+
+    def aligned(self, hidden1, hidden2):
+        """ Score only the aligned pairs of the hidden layers of a pairwise scorer, eg the words and their chosen heads """
+        return self.scorer.aligned(hidden1, hidden2)
 
 if __name__ == "__main__":
     x1 = torch.randn(3,4)
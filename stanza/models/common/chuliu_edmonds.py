@@ -1,163 +1,185 @@
 # Adapted from Tim's code here: https://github.com/tdozat/Parser-v3/blob/master/scripts/chuliu_edmonds.py
+#
+# The contractions are done in a loop rather than by recursion, and the cycles are found by following
+# the heads, so long sentences do not run into the recursion limit.  The single root is enforced as in
+# Gabow & Tarjan (1984): every root edge is penalised by more than the scores of any two trees can differ,
+# so that the best tree has a single root edge, instead of decoding the sentence again for every candidate root.
 
 import numpy as np
 
-def tarjan(tree):
-    """"""
+def find_cycle(tree):
+    """
+    A cycle of the graph in which the head of node i is tree[i], as an array of its nodes, or None.
+    Self loops, such as the one of the root, are not cycles.
+    """
+    heads = tree.tolist()
+    # 0 for nodes not seen yet, 1 for nodes on the current path, 2 for nodes which do not lead to a cycle
+    state = [0] * len(heads)
+    for start in range(len(heads)):
+        if state[start]:
+            continue
+        path = []
+        node = start
+        while not state[node]:
+            state[node] = 1
+            path.append(node)
+            node = heads[node]
+        if state[node] == 1:
+            # the path came back to one of its own nodes
+            cycle = path[path.index(node):]
+            if len(cycle) > 1:
+                return np.array(cycle)
+        for node in path:
+            state[node] = 2
+    return None
 
-    indices = -np.ones_like(tree)
-    lowlinks = -np.ones_like(tree)
-    onstack = np.zeros_like(tree, dtype=bool)
-    stack = list()
-    _index = [0]
-    cycles = []
-    #-------------------------------------------------------------
-    def strong_connect(i):
-        _index[0] += 1
-        index = _index[-1]
-        indices[i] = lowlinks[i] = index - 1
-        stack.append(i)
-        onstack[i] = True
-        dependents = np.where(np.equal(tree, i))[0]
-        for j in dependents:
-            if indices[j] == -1:
-                strong_connect(j)
-                lowlinks[i] = min(lowlinks[i], lowlinks[j])
-            elif onstack[j]:
-                lowlinks[i] = min(lowlinks[i], indices[j])
+def contract(scores, tree, cycle_locs):
+    """
+    Contract a cycle of tree into a single node, placed last.
+    :return: the scores of the contracted graph, and what expand needs to recover the tree of the whole graph
+    """
+    # t = len(tree); c = len(cycle); n = len(noncycle)
+    cycle = np.zeros(len(tree), dtype=bool)
+    cycle[cycle_locs] = True
+    # heads of cycle in original tree; (c) in t
+    cycle_subtree = tree[cycle]
+    # scores of cycle in original tree; (c) in R
+    cycle_scores = scores[cycle, cycle_subtree]
+    # total score of cycle; () in R
+    cycle_score = cycle_scores.sum()
 
-        # There's a cycle!
-        if lowlinks[i] == indices[i]:
-            cycle = np.zeros_like(indices, dtype=bool)
-            while stack[-1] != i:
-                j = stack.pop()
-                onstack[j] = False
-                cycle[j] = True
-            stack.pop()
-            onstack[i] = False
-            cycle[i] = True
-            if cycle.sum() > 1:
-                cycles.append(cycle)
-        return
-    #-------------------------------------------------------------
-    for i in range(len(tree)):
-        if indices[i] == -1:
-            strong_connect(i)
-    return cycles
+    # locations of noncycle; (t) in [0,1]
+    noncycle = np.logical_not(cycle)
+    # indices of noncycle in original tree; (n) in t
+    noncycle_locs = np.where(noncycle)[0]
+    # cycle_locs in the order of the original tree
+    cycle_locs = np.where(cycle)[0]
 
-def chuliu_edmonds(scores):
-    """"""
-
-    np.fill_diagonal(scores, -float('inf')) # prevent self-loops
-    scores[0] = -float('inf')
-    scores[0,0] = 0
-    tree = np.argmax(scores, axis=1)
-    cycles = tarjan(tree)
-    #print(scores)
-    #print(cycles)
-    if not cycles:
-        return tree
-    else:
-        # t = len(tree); c = len(cycle); n = len(noncycle)
-        # locations of cycle; (t) in [0,1]
-        cycle = cycles.pop()
-        # indices of cycle in original tree; (c) in t
-        cycle_locs = np.where(cycle)[0]
-        # heads of cycle in original tree; (c) in t
-        cycle_subtree = tree[cycle]
-        # scores of cycle in original tree; (c) in R
-        cycle_scores = scores[cycle, cycle_subtree]
-        # total score of cycle; () in R
-        cycle_score = cycle_scores.sum()
+    # scores of cycle's potential heads; (c x n) - (c) + () -> (n x c) in R
+    metanode_head_scores = scores[cycle][:,noncycle] - cycle_scores[:,None] + cycle_score
+    # scores of cycle's potential dependents; (n x c) in R
+    metanode_dep_scores = scores[noncycle][:,cycle]
+    # best noncycle head for each cycle dependent; (n) in c
+    metanode_heads = np.argmax(metanode_head_scores, axis=0)
+    # best cycle head for each noncycle dependent; (n) in c
+    metanode_deps = np.argmax(metanode_dep_scores, axis=1)
 
-        # locations of noncycle; (t) in [0,1]
-        noncycle = np.logical_not(cycle)
-        # indices of noncycle in original tree; (n) in t
-        noncycle_locs = np.where(noncycle)[0]
-        #print(cycle_locs, noncycle_locs)
+    # scores of noncycle graph; (n x n) in R
+    subscores = scores[noncycle][:,noncycle]
+    # pad to contracted graph; (n+1 x n+1) in R
+    subscores = np.pad(subscores, ( (0,1) , (0,1) ), 'constant')
+    # set the contracted graph scores of cycle's potential heads; (c x n)[:, (n) in n] in R -> (n) in R
+    subscores[-1, :-1] = metanode_head_scores[metanode_heads, np.arange(len(noncycle_locs))]
+    # set the contracted graph scores of cycle's potential dependents; (n x c)[(n) in n] in R-> (n) in R
+    subscores[:-1,-1] = metanode_dep_scores[np.arange(len(noncycle_locs)), metanode_deps]
+    return subscores, (tree, cycle_locs, noncycle_locs, metanode_heads, metanode_deps)
 
-        # scores of cycle's potential heads; (c x n) - (c) + () -> (n x c) in R
-        metanode_head_scores = scores[cycle][:,noncycle] - cycle_scores[:,None] + cycle_score
-        # scores of cycle's potential dependents; (n x c) in R
-        metanode_dep_scores = scores[noncycle][:,cycle]
-        # best noncycle head for each cycle dependent; (n) in c
-        metanode_heads = np.argmax(metanode_head_scores, axis=0)
-        # best cycle head for each noncycle dependent; (n) in c
-        metanode_deps = np.argmax(metanode_dep_scores, axis=1)
+def expand(contracted_tree, contraction):
+    """ The tree of the graph before a contraction, from the tree of the contracted graph """
+    tree, cycle_locs, noncycle_locs, metanode_heads, metanode_deps = contraction
+    # head of the cycle; () in n
+    cycle_head = contracted_tree[-1]
+    # fixed tree: (n) in n+1
+    contracted_tree = contracted_tree[:-1]
+    # initialize new tree; (t) in 0
+    new_tree = -np.ones_like(tree)
+    # fixed tree with no heads coming from the cycle: (n) in [0,1]
+    contracted_subtree = contracted_tree < len(contracted_tree)
+    # add the nodes to the new tree (t)[(n)[(n) in [0,1]] in t] in t = (n)[(n)[(n) in [0,1]] in n] in t
+    new_tree[noncycle_locs[contracted_subtree]] = noncycle_locs[contracted_tree[contracted_subtree]]
+    # fixed tree with heads coming from the cycle: (n) in [0,1]
+    contracted_subtree = np.logical_not(contracted_subtree)
+    # add the nodes to the tree (t)[(n)[(n) in [0,1]] in t] in t = (c)[(n)[(n) in [0,1]] in c] in t
+    new_tree[noncycle_locs[contracted_subtree]] = cycle_locs[metanode_deps[contracted_subtree]]
+    # add the old cycle to the tree; (t)[(c) in t] in t = (t)[(c) in t] in t
+    new_tree[cycle_locs] = tree[cycle_locs]
+    # root of the cycle; (n)[() in n] in c = () in c
+    cycle_root = metanode_heads[cycle_head]
+    # add the root of the cycle to the new tree; (t)[(c)[() in c] in t] = (c)[() in c]
+    new_tree[cycle_locs[cycle_root]] = noncycle_locs[cycle_head]
+    return new_tree
 
-        # scores of noncycle graph; (n x n) in R
-        subscores = scores[noncycle][:,noncycle]
-        # pad to contracted graph; (n+1 x n+1) in R
-        subscores = np.pad(subscores, ( (0,1) , (0,1) ), 'constant')
-        # set the contracted graph scores of cycle's potential heads; (c x n)[:, (n) in n] in R -> (n) in R
-        subscores[-1, :-1] = metanode_head_scores[metanode_heads, np.arange(len(noncycle_locs))]
-        # set the contracted graph scores of cycle's potential dependents; (n x c)[(n) in n] in R-> (n) in R
-        subscores[:-1,-1] = metanode_dep_scores[np.arange(len(noncycle_locs)), metanode_deps]
+def chuliu_edmonds(scores):
+    """
+    The maximum spanning tree of scores, where scores[i, j] is the score of j being the head of i and 0 is the root.
+    The scores are changed in place.
+    """
+    contractions = []
+    while True:
+        np.fill_diagonal(scores, -float('inf')) # prevent self-loops
+        scores[0] = -float('inf')
+        scores[0,0] = 0
+        tree = np.argmax(scores, axis=1)
+        cycle = find_cycle(tree)
+        if cycle is None:
+            break
+        scores, contraction = contract(scores, tree, cycle)
+        contractions.append(contraction)
+    while contractions:
+        tree = expand(tree, contractions.pop())
+    return tree
 
-        # MST with contraction; (n+1) in n+1
-        contracted_tree = chuliu_edmonds(subscores)
-        # head of the cycle; () in n
-        #print(contracted_tree)
-        cycle_head = contracted_tree[-1]
-        # fixed tree: (n) in n+1
-        contracted_tree = contracted_tree[:-1]
-        # initialize new tree; (t) in 0
-        new_tree = -np.ones_like(tree)
-        #print(0, new_tree)
-        # fixed tree with no heads coming from the cycle: (n) in [0,1]
-        contracted_subtree = contracted_tree < len(contracted_tree)
-        # add the nodes to the new tree (t)[(n)[(n) in [0,1]] in t] in t = (n)[(n)[(n) in [0,1]] in n] in t
-        new_tree[noncycle_locs[contracted_subtree]] = noncycle_locs[contracted_tree[contracted_subtree]]
-        #print(1, new_tree)
-        # fixed tree with heads coming from the cycle: (n) in [0,1]
-        contracted_subtree = np.logical_not(contracted_subtree)
-        # add the nodes to the tree (t)[(n)[(n) in [0,1]] in t] in t = (c)[(n)[(n) in [0,1]] in c] in t
-        new_tree[noncycle_locs[contracted_subtree]] = cycle_locs[metanode_deps[contracted_subtree]]
-        #print(2, new_tree)
-        # add the old cycle to the tree; (t)[(c) in t] in t = (t)[(c) in t] in t
-        new_tree[cycle_locs] = tree[cycle_locs]
-        #print(3, new_tree)
-        # root of the cycle; (n)[() in n] in c = () in c
-        cycle_root = metanode_heads[cycle_head]
-        # add the root of the cycle to the new tree; (t)[(c)[() in c] in t] = (c)[() in c]
-        new_tree[cycle_locs[cycle_root]] = noncycle_locs[cycle_head]
-        #print(4, new_tree)
-        return new_tree
+def penalise_root(scores):
+    """
+    Lower the scores of the root edges by more than the scores of two trees can differ,
+    so that any tree with a single root edge is better than all the trees with several
+    """
+    finite = scores[np.isfinite(scores)]
+    if len(finite) > 0:
+        scores[1:, 0] -= 1 + len(scores) * (finite.max() - finite.min())
 
 #===============================================================
 def chuliu_edmonds_one_root(scores):
-    """"""
-
+    """ The maximum spanning tree of scores with a single word attached to the root """
     scores = scores.astype(np.float64)
-    tree = chuliu_edmonds(scores)
-    roots_to_try = np.where(np.equal(tree[1:], 0))[0]+1
-    if len(roots_to_try) == 1:
-        return tree
+    penalise_root(scores)
+    return chuliu_edmonds(scores)
+
+def greedy_trees(scores, lengths):
+    """
+    The best head of every word of a padded batch of score matrices, and which sentences these heads already make
+    a single rooted tree, in which case it is their maximum spanning tree.  The scores are changed in place.
+
+    The check is done for the whole batch at once: each word points to the ancestor twice as far away as its head's
+    on every round, so after log2(length) rounds every word of a sentence without cycles points to the root.
+    """
+    batch_size, max_length, _ = scores.shape
+    lengths = np.asarray(lengths)
+    positions = np.arange(max_length)
+    words = positions[None, :] < lengths[:, None]
+    # no self loops, and no heads among the padding
+    scores[:, positions, positions] = -float('inf')
+    scores[np.broadcast_to(~words[:, None, :], scores.shape)] = -float('inf')
+    heads = np.argmax(scores, axis=2)
+    heads[:, 0] = 0
+    heads[~words] = 0
+    one_root = np.sum((heads == 0) & words, axis=1) == 2
+    ancestors = heads
+    distance = 1
+    while distance < max_length:
+        ancestors = np.take_along_axis(ancestors, ancestors, axis=1)
+        distance *= 2
+    no_cycles = np.all(ancestors == 0, axis=1)
+    return heads, one_root & no_cycles
 
-    #-------------------------------------------------------------
-    def set_root(scores, root):
-        root_score = scores[root,0]
-        scores = np.array(scores)
-        scores[1:,0] = -float('inf')
-        scores[root] = -float('inf')
-        scores[root,0] = 0
-        return scores, root_score
-    #-------------------------------------------------------------
+def chuliu_edmonds_batch(scores, lengths):
+    """
+    The single rooted maximum spanning trees of a padded batch of score matrices, one for each length, and which
+    of them were the best heads of their words.  Only the sentences whose best heads do not make a tree are decoded.
+    The scores are converted once for the whole batch, and are not changed.
 
-    best_score, best_tree = -np.inf, None # This is what's causing it to crash
-    for root in roots_to_try:
-        _scores, root_score = set_root(scores, root)
-        _tree = chuliu_edmonds(_scores)
-        tree_probs = _scores[np.arange(len(_scores)), _tree]
-        tree_score = (tree_probs).sum()+(root_score) if (tree_probs > -np.inf).all() else -np.inf
-        if tree_score > best_score:
-            best_score = tree_score
-            best_tree = _tree
-    try:
-        assert best_tree is not None
-    except:
-        with open('debug.log', 'w') as f:
-            f.write('{}: {}, {}\n'.format(tree, scores, roots_to_try))
-            f.write('{}: {}, {}, {}\n'.format(_tree, _scores, tree_probs, tree_score))
-        raise
-    return best_tree
+    Only the greedy check is vectorised: the sentences which need decoding are still decoded one at a time, in
+    Python, holding the GIL.  The speedup comes from the sentences which skip the decoder, and the threads of a
+    DecoderPool overlap the decoding with the scoring of the next batch rather than decoding in parallel.
+    """
+    scores = np.array(scores, dtype=np.float64)
+    heads, greedy = greedy_trees(scores, lengths)
+    trees = []
+    for i, length in enumerate(lengths):
+        if greedy[i]:
+            trees.append(heads[i, :length])
+            continue
+        sentence_scores = scores[i, :length, :length]
+        penalise_root(sentence_scores)
+        trees.append(chuliu_edmonds(sentence_scores))
+    return trees, greedy
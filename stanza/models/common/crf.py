@@ -19,6 +19,11 @@ class CRFLoss(nn.Module):
         self._transitions = nn.Parameter(torch.zeros(num_tag, num_tag))
         self._batch_average = batch_average # if not batch average, average on all tokens
 
+    @property
+    def transitions(self):
+        """ The transition matrix, which is all that decoding needs """
+        return self._transitions
+
     def forward(self, inputs, masks, tag_indices):
         """
         inputs: batch_size x seq_len x num_tags
@@ -0,0 +1,62 @@
+"""
+Features of sentences which only depend on a vocabulary, shared by the data loaders of the processors.
+
+The POS tagger and the parser each map the characters of every word, and the pretrained word ids of every word,
+through vocabularies which usually have the same contents.  The data loaders keep these features on the Sentence
+objects, keyed by the contents of the vocabulary, so that a later processor whose vocabulary has the same units
+reuses them instead of mapping the words again.  The features are kept with the words they were computed from,
+and are computed again if the words of the sentence have been edited since.  They are dropped with the sentence
+when it is rebuilt, for example by the MWT expander, and the pipeline clears them once it is done with a document.
+"""
+
+import hashlib
+
+FEATURES_ATTR = '_vocab_features'
+
+def vocab_key(vocab):
+    """
+    A key which is the same for all vocabularies with the same units and normalisation.
+    It is computed once per vocabulary object.
+    """
+    key = getattr(vocab, '_feature_key', None)
+    if key is None:
+        digest = hashlib.sha1('\n'.join(str(unit) for unit in vocab._id2unit).encode('utf-8', 'surrogatepass')).hexdigest()
+        key = (type(vocab).__name__, getattr(vocab, 'lower', False), digest)
+        vocab._feature_key = key
+    return key
+
+
+class FeatureCache:
+    """
+    Looks up and stores the features of the sentences of a document.
+    With no sentences, for example while training, the features are always computed and never stored.
+    """
+
+    def __init__(self, sentences=None):
+        self.sentences = sentences
+
+    def get(self, sent_idx, key, words, compute):
+        """
+        The features of sentence sent_idx named by key, which compute() returns from the texts of its words
+        if they are not known yet, or were computed from different words
+        """
+        if self.sentences is None:
+            return compute()
+        sentence = self.sentences[sent_idx]
+        features = getattr(sentence, FEATURES_ATTR, None)
+        if features is None:
+            features = dict()
+            setattr(sentence, FEATURES_ATTR, features)
+        words = tuple(words)
+        known = features.get(key)
+        if known is None or known[0] != words:
+            known = (words, compute())
+            features[key] = known
+        return known[1]
+
+
+def clear_features(doc):
+    """ Drop the features kept on the sentences of a document """
+    for sentence in doc.sentences:
+        if hasattr(sentence, FEATURES_ATTR):
+            delattr(sentence, FEATURES_ATTR)
@@ -51,14 +51,18 @@ class LSTMwRecDropout(nn.Module):
             # Assumes input is PackedSequence, returns PackedSequence as well
             batch_size = batch_sizes[0].item()
             states = [list(init.split([1] * batch_size)) for init in inits]
-            h_drop_mask = x.new_ones(batch_size, self.hidden_size)
-            h_drop_mask = self.rec_drop(h_drop_mask)
+            # the recurrent dropout mask is only built when training
+            h_drop_mask = self.rec_drop(x.new_ones(batch_size, self.hidden_size)) if self.training else None
             resh = []
 
+            def prev_h(bs):
+                h = torch.cat(states[0][:bs], 0)
+                return h * h_drop_mask[:bs] if h_drop_mask is not None else h
+
             if not reverse:
                 st = 0
                 for bs in batch_sizes:
-                    s1 = cell(x[st:st+bs], (torch.cat(states[0][:bs], 0) * h_drop_mask[:bs], torch.cat(states[1][:bs], 0)))
+                    s1 = cell(x[st:st+bs], (prev_h(bs), torch.cat(states[1][:bs], 0)))
                     resh.append(s1[0])
                     for j in range(bs):
                         states[0][j] = s1[0][j].unsqueeze(0)
@@ -68,7 +72,7 @@ class LSTMwRecDropout(nn.Module):
                 en = x.size(0)
                 for i in range(batch_sizes.size(0)-1, -1, -1):
                     bs = batch_sizes[i]
-                    s1 = cell(x[en-bs:en], (torch.cat(states[0][:bs], 0) * h_drop_mask[:bs], torch.cat(states[1][:bs], 0)))
+                    s1 = cell(x[en-bs:en], (prev_h(bs), torch.cat(states[1][:bs], 0)))
                     resh.append(s1[0])
                     for j in range(bs):
                         states[0][j] = s1[0][j].unsqueeze(0)
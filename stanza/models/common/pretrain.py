@@ -6,6 +6,7 @@ import re
 
 import lzma
 import logging
+import threading
 import numpy as np
 import torch
 
@@ -26,17 +27,32 @@ class Pretrain:
         self._vec_filename = vec_filename
         self._max_vocab = max_vocab
         self._save_to_file = save_to_file
+        # a Pretrain may be shared by processors loading in parallel, which should not all read its file
+        self._load_lock = threading.RLock()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state['_load_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._load_lock = threading.RLock()
 
     @property
     def vocab(self):
         if not hasattr(self, '_vocab'):
-            self.load()
+            with self._load_lock:
+                if not hasattr(self, '_vocab'):
+                    self.load()
         return self._vocab
 
     @property
     def emb(self):
         if not hasattr(self, '_emb'):
-            self.load()
+            with self._load_lock:
+                if not hasattr(self, '_emb'):
+                    self.load()
         return self._emb
 
     def load(self):
@@ -11,7 +11,7 @@ import numpy as np
 import stanza.models.common.seq2seq_constant as constant
 from stanza.models.common import utils
 from stanza.models.common.seq2seq_modules import LSTMAttention
-from stanza.models.common.beam import Beam
+from stanza.models.common.beam import BatchBeam
 
 logger = logging.getLogger('stanza')
 
@@ -187,25 +187,26 @@ class Seq2SeqModel(nn.Module):
         dec_inputs = self.embedding(self.SOS_tensor)
         dec_inputs = dec_inputs.expand(batch_size, dec_inputs.size(0), dec_inputs.size(1))
 
-        done = [False for _ in range(batch_size)]
-        total_done = 0
-        max_len = 0
-        output_seqs = [[] for _ in range(batch_size)]
+        # the outputs stay on the device until the end, and the sequences which are done leave the batch
+        active = torch.arange(batch_size, device=h_in.device)
+        output_seqs = torch.full((batch_size, self.max_dec_len), constant.EOS_ID, dtype=torch.long, device=h_in.device)
 
-        while total_done < batch_size and max_len < self.max_dec_len:
+        for max_len in range(self.max_dec_len):
             log_probs, (hn, cn) = self.decode(dec_inputs, hn, cn, h_in, src_mask)
             assert log_probs.size(1) == 1, "Output must have 1-step of output."
             _, preds = log_probs.squeeze(1).max(1, keepdim=True)
+            output_seqs[active, max_len] = preds.squeeze(1)
+            searching = preds.squeeze(1) != constant.EOS_ID
+            if not searching.all():
+                if not searching.any():
+                    break
+                active = active[searching]
+                preds = preds[searching]
+                hn, cn = hn[searching], cn[searching]
+                h_in, src_mask = h_in[searching], src_mask[searching]
             dec_inputs = self.embedding(preds) # update decoder inputs
-            max_len += 1
-            for i in range(batch_size):
-                if not done[i]:
-                    token = preds.data[i][0].item()
-                    if token == constant.EOS_ID:
-                        done[i] = True
-                        total_done += 1
-                    else:
-                        output_seqs[i].append(token)
+
+        output_seqs = [utils.prune_hyp(seq) for seq in output_seqs.tolist()]
         return output_seqs, edit_logits
 
     def predict(self, src, src_mask, pos=None, beam_size=5):
@@ -231,52 +232,32 @@ class Seq2SeqModel(nn.Module):
         else:
             edit_logits = None
 
-        # (2) set up beam
+        # (2) set up beam, with the rows of each example next to each other
         with torch.no_grad():
-            h_in = h_in.data.repeat(beam_size, 1, 1) # repeat data for beam search
-            src_mask = src_mask.repeat(beam_size, 1)
+            h_in = h_in.data.repeat_interleave(beam_size, 0) # repeat data for beam search
+            src_mask = src_mask.repeat_interleave(beam_size, 0)
             # repeat decoder hidden states
-            hn = hn.data.repeat(beam_size, 1)
-            cn = cn.data.repeat(beam_size, 1)
-        beam = [Beam(beam_size, self.use_cuda) for _ in range(batch_size)]
-
-        def update_state(states, idx, positions, beam_size):
-            """ Select the states according to back pointers. """
-            for e in states:
-                br, d = e.size()
-                s = e.contiguous().view(beam_size, br // beam_size, d)[:,idx]
-                s.data.copy_(s.data.index_select(0, positions))
+            hn = hn.data.repeat_interleave(beam_size, 0)
+            cn = cn.data.repeat_interleave(beam_size, 0)
+        beam = BatchBeam(batch_size, beam_size, h_in.device)
 
         # (3) main loop
         for i in range(self.max_dec_len):
-            dec_inputs = torch.stack([b.get_current_state() for b in beam]).t().contiguous().view(-1, 1)
+            dec_inputs = beam.get_current_state().view(-1, 1)
             dec_inputs = self.embedding(dec_inputs)
             log_probs, (hn, cn) = self.decode(dec_inputs, hn, cn, h_in, src_mask)
-            log_probs = log_probs.view(beam_size, batch_size, -1).transpose(0,1)\
-                    .contiguous() # [batch, beam, V]
-
-            # advance each beam
-            done = []
-            for b in range(batch_size):
-                is_done = beam[b].advance(log_probs.data[b])
-                if is_done:
-                    done += [b]
-                # update beam state
-                update_state((hn, cn), b, beam[b].get_current_origin(), beam_size)
-
-            if len(done) == batch_size:
+            log_probs = log_probs.view(-1, beam_size, log_probs.size(-1)) # [active, beam, V]
+
+            # advance all the beams, and follow their back pointers in the decoder states
+            origins = beam.advance(log_probs.data)
+            if beam.done():
                 break
+            hn = hn.index_select(0, origins)
+            cn = cn.index_select(0, origins)
+            if len(origins) < len(h_in):
+                # some examples are finished.  all the beams of an example have the same context
+                h_in = h_in.index_select(0, origins)
+                src_mask = src_mask.index_select(0, origins)
 
         # back trace and find hypothesis
-        all_hyp, all_scores = [], []
-        for b in range(batch_size):
-            scores, ks = beam[b].sort_best()
-            all_scores += [scores[0]]
-            k = ks[0]
-            hyp = beam[b].get_hyp(k)
-            hyp = utils.prune_hyp(hyp)
-            hyp = [i.item() for i in hyp]
-            all_hyp += [hyp]
-
-        return all_hyp, edit_logits
-
+        return beam.get_hyps(), edit_logits
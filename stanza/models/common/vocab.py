@@ -3,6 +3,8 @@ from collections import Counter, OrderedDict
 import os
 import pickle
 
+import numpy as np
+
 PAD = '<PAD>'
 PAD_ID = 0
 UNK = '<UNK>'
@@ -67,6 +69,10 @@ class BaseVocab:
     def unmap(self, ids):
         return [self.id2unit(x) for x in ids]
 
+    def unmap_array(self, ids):
+        """ Unmap a numpy array of ids all at once, into an array of units of the same shape """
+        return np.array(self._id2unit, dtype=object)[ids]
+
     def __len__(self):
         return len(self._id2unit)
 
@@ -2,7 +2,9 @@ import random
 import logging
 import torch
 
+from stanza.models.common.batch_cost import BatchCost, plan_batches, padding_waste
 from stanza.models.common.data import map_to_ids, get_long_tensor, get_float_tensor, sort_all
+from stanza.models.common.feature_cache import FeatureCache, vocab_key
 from stanza.models.common.vocab import PAD_ID, VOCAB_PREFIX, ROOT_ID, CompositeVocab, CharVocab
 from stanza.models.pos.vocab import WordVocab, XPOSVocab, FeatureVocab, MultiVocab
 from stanza.models.pos.xpos_vocab_factory import xpos_vocab_factory
@@ -10,7 +12,7 @@ from stanza.models.common.doc import *
 
 logger = logging.getLogger('stanza')
 
-def data_to_batches(data, batch_size, eval_mode, sort_during_eval, min_length_to_batch_separately):
+def data_to_batches(data, batch_size, eval_mode, sort_during_eval, min_length_to_batch_separately, batch_cost=None):
     """
     Given a list of lists, where the first element of each sublist
     represents the sentence, group the sentences into batches.
@@ -19,6 +21,9 @@ def data_to_batches(data, batch_size, eval_mode, sort_during_eval, min_length_to
     length with a bit of random shuffling.  During eval mode, the
     sentences are sorted by length if sort_during_eval is true.
 
+    With a BatchCost, the batches are filled up to a budget of
+    batch_size in its estimate of their cost instead of batch_size words.
+
     Refactored from the data structure in case other models could use
     it and for ease of testing.
 
@@ -26,8 +31,6 @@ def data_to_batches(data, batch_size, eval_mode, sort_during_eval, min_length_to
     when in train mode or when unsorted and represents the original
     location of each sentence in the sort
     """
-    res = []
-
     if not eval_mode:
         # sort sentences (roughly) by length for better memory utilization
         data = sorted(data, key = lambda x: len(x[0]), reverse=random.random() > .5)
@@ -37,26 +40,7 @@ def data_to_batches(data, batch_size, eval_mode, sort_during_eval, min_length_to
     else:
         data_orig_idx = None
 
-    current = []
-    currentlen = 0
-    for x in data:
-        if min_length_to_batch_separately is not None and len(x[0]) > min_length_to_batch_separately:
-            if currentlen > 0:
-                res.append(current)
-                current = []
-                currentlen = 0
-            res.append([x])
-        else:
-            if len(x[0]) + currentlen > batch_size and currentlen > 0:
-                res.append(current)
-                current = []
-                currentlen = 0
-            current.append(x)
-            currentlen += len(x[0])
-
-    if currentlen > 0:
-        res.append(current)
-
+    res = plan_batches(data, batch_size, batch_cost, min_length_to_batch_separately)
     return res, data_orig_idx
 
 
@@ -97,7 +81,8 @@ class DataLoader:
 
         # chunk into batches
         self.data = self.chunk_batches(data)
-        logger.debug("{} batches created.".format(len(self.data)))
+        logger.debug("{} batches created, {:.1%} of the words and {:.1%} of the chars are padding.".format(
+            len(self.data), self.padding_waste.words, self.padding_waste.chars))
 
     def init_vocab(self, data):
         assert self.eval == False # for eval vocab must exist
@@ -121,15 +106,21 @@ class DataLoader:
         processed = []
         xpos_replacement = [[ROOT_ID] * len(vocab['xpos'])] if isinstance(vocab['xpos'], CompositeVocab) else [ROOT_ID]
         feats_replacement = [[ROOT_ID] * len(vocab['feats'])]
-        for sent in data:
-            processed_sent = [[ROOT_ID] + vocab['word'].map([w[0] for w in sent])]
-            processed_sent += [[[ROOT_ID]] + [vocab['char'].map([x for x in w[0]]) for w in sent]]
+        # the word, char and pretrained ids may already be known from another processor
+        features = FeatureCache(self.doc.sentences if self.eval else None)
+        for sent_idx, sent in enumerate(data):
+            words = [w[0] for w in sent]
+            processed_sent = [[ROOT_ID] + features.get(sent_idx, ('word', vocab_key(vocab['word'])), words,
+                                                       lambda: vocab['word'].map(words))]
+            processed_sent += [[[ROOT_ID]] + features.get(sent_idx, ('char', vocab_key(vocab['char'])), words,
+                                                          lambda: [vocab['char'].map([x for x in w]) for w in words])]
             processed_sent += [[ROOT_ID] + vocab['upos'].map([w[1] for w in sent])]
             processed_sent += [xpos_replacement + vocab['xpos'].map([w[2] for w in sent])]
             processed_sent += [feats_replacement + vocab['feats'].map([w[3] for w in sent])]
             if pretrain_vocab is not None:
                 # always use lowercase lookup in pretrained vocab
-                processed_sent += [[ROOT_ID] + pretrain_vocab.map([w[0].lower() for w in sent])]
+                processed_sent += [[ROOT_ID] + features.get(sent_idx, ('pretrain', vocab_key(pretrain_vocab)), words,
+                                                            lambda: pretrain_vocab.map([w.lower() for w in words]))]
             else:
                 processed_sent += [[ROOT_ID] + [PAD_ID] * len(sent)]
             processed_sent += [[ROOT_ID] + vocab['lemma'].map([w[4] for w in sent])]
@@ -204,11 +195,15 @@ class DataLoader:
         random.shuffle(self.data)
 
     def chunk_batches(self, data):
+        # the biaffine scorers make the cost of a sentence grow with the square of its length
+        batch_cost = BatchCost(data, pairs=True) if self.args.get('batch_cost', False) else None
         batches, data_orig_idx = data_to_batches(data=data, batch_size=self.batch_size,
                                                  eval_mode=self.eval, sort_during_eval=self.sort_during_eval,
-                                                 min_length_to_batch_separately=self.min_length_to_batch_separately)
+                                                 min_length_to_batch_separately=self.min_length_to_batch_separately,
+                                                 batch_cost=batch_cost)
         # data_orig_idx might be None at train time, since we don't anticipate unsorting
         self.data_orig_idx = data_orig_idx
+        self.padding_waste = padding_waste(batches)
         return batches
 
 def to_int(string, ignore_error=False):
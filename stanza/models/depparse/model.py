@@ -134,13 +134,14 @@ class Parser(nn.Module):
         lstm_outputs, _ = pad_packed_sequence(lstm_outputs, batch_first=True)
 
         unlabeled_scores = self.unlabeled(self.drop(lstm_outputs), self.drop(lstm_outputs)).squeeze(3)
-        deprel_scores = self.deprel(self.drop(lstm_outputs), self.drop(lstm_outputs))
+        # the relations are scored against every head for training, and only against the chosen heads when parsing
+        deprel_hidden = self.deprel.hidden(self.drop(lstm_outputs), self.drop(lstm_outputs))
 
         #goldmask = head.new_zeros(*head.size(), head.size(-1)+1, dtype=torch.uint8)
         #goldmask.scatter_(2, head.unsqueeze(2), 1)
 
         if self.args['linearization'] or self.args['distance']:
-            head_offset = torch.arange(word.size(1), device=head.device).view(1, 1, -1).expand(word.size(0), -1, -1) - torch.arange(word.size(1), device=head.device).view(1, -1, 1).expand(word.size(0), -1, -1)
+            head_offset = torch.arange(word.size(1), device=word.device).view(1, 1, -1).expand(word.size(0), -1, -1) - torch.arange(word.size(1), device=word.device).view(1, -1, 1).expand(word.size(0), -1, -1)
 
         if self.args['linearization']:
             lin_scores = self.linearization(self.drop(lstm_outputs), self.drop(lstm_outputs)).squeeze(3)
@@ -153,7 +154,8 @@ class Parser(nn.Module):
             dist_kld = -torch.log((dist_target.float() - dist_pred)**2/2 + 1)
             unlabeled_scores += dist_kld.detach()
 
-        diag = torch.eye(head.size(-1)+1, dtype=torch.bool, device=head.device).unsqueeze(0)
+        # the words and the root: the gold heads are not needed when parsing
+        diag = torch.eye(word.size(1), dtype=torch.bool, device=word.device).unsqueeze(0)
         unlabeled_scores.masked_fill_(diag, -float('inf'))
 
         preds = []
@@ -164,6 +166,7 @@ class Parser(nn.Module):
             unlabeled_target = head.masked_fill(word_mask[:, 1:], -1)
             loss = self.crit(unlabeled_scores.contiguous().view(-1, unlabeled_scores.size(2)), unlabeled_target.view(-1))
 
+            deprel_scores = self.deprel.scorer(*deprel_hidden)
             deprel_scores = deprel_scores[:, 1:] # exclude attachment for the root symbol
             #deprel_scores = deprel_scores.masked_select(goldmask.unsqueeze(3)).view(-1, len(self.vocab['deprel']))
             deprel_scores = torch.gather(deprel_scores, 2, head.unsqueeze(2).unsqueeze(3).expand(-1, -1, -1, len(self.vocab['deprel']))).view(-1, len(self.vocab['deprel']))
@@ -187,6 +190,15 @@ class Parser(nn.Module):
         else:
             loss = 0
             preds.append(F.log_softmax(unlabeled_scores, 2).detach().cpu().numpy())
-            preds.append(deprel_scores.max(3)[1].detach().cpu().numpy())
+            preds.append(deprel_hidden)
 
         return loss, preds
+
+    def label(self, deprel_hidden, heads):
+        """
+        The best relation of every word to its head, from the deprel_hidden returned by forward when parsing
+        and a tensor of the heads of the words (N x L)
+        """
+        dep_hidden, head_hidden = deprel_hidden
+        head_hidden = torch.gather(head_hidden, 1, heads.unsqueeze(2).expand(-1, -1, head_hidden.size(2)))
+        return self.deprel.aligned(dep_hidden, head_hidden).argmax(2)
@@ -4,17 +4,24 @@ A trainer class to handle training and testing of models.
 
 import sys
 import logging
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import torch
 from torch import nn
 
 from stanza.models.common.trainer import Trainer as BaseTrainer
 from stanza.models.common import utils, loss
-from stanza.models.common.chuliu_edmonds import chuliu_edmonds_one_root
+from stanza.models.common.chuliu_edmonds import chuliu_edmonds_batch
 from stanza.models.depparse.model import Parser
 from stanza.models.pos.vocab import MultiVocab
 
 logger = logging.getLogger('stanza')
 
+# the output of the parser for a batch, before it is decoded into trees
+ParseScores = namedtuple('ParseScores', ['heads', 'deprel_hidden', 'orig_idx', 'sentlens'])
+
 def unpack_batch(batch, use_cuda):
     """ Unpack a batch from the data loader. """
     if use_cuda:
@@ -65,21 +72,39 @@ class Trainer(BaseTrainer):
         self.optimizer.step()
         return loss_val
 
-    def predict(self, batch, unsort=True):
+    def score(self, batch):
+        """ Run the parser on a batch, leaving the decoding of its scores to decode() """
         inputs, orig_idx, word_orig_idx, sentlens, wordlens = unpack_batch(batch, self.use_cuda)
-        word, word_mask, wordchars, wordchars_mask, upos, xpos, ufeats, pretrained, lemma, head, deprel = inputs
+        word, word_mask, wordchars, wordchars_mask, upos, xpos, ufeats, pretrained, lemma, _, _ = inputs
 
         self.model.eval()
-        batch_size = word.size(0)
-        _, preds = self.model(word, word_mask, wordchars, wordchars_mask, upos, xpos, ufeats, pretrained, lemma, head, deprel, word_orig_idx, sentlens, wordlens)
-        head_seqs = [chuliu_edmonds_one_root(adj[:l, :l])[1:] for adj, l in zip(preds[0], sentlens)] # remove attachment for the root
-        deprel_seqs = [self.vocab['deprel'].unmap([preds[1][i][j+1][h] for j, h in enumerate(hs)]) for i, hs in enumerate(head_seqs)]
+        with torch.no_grad():
+            _, preds = self.model(word, word_mask, wordchars, wordchars_mask, upos, xpos, ufeats, pretrained, lemma, None, None, word_orig_idx, sentlens, wordlens)
+        return ParseScores(preds[0], preds[1], orig_idx, sentlens)
+
+    def decode(self, scores, unsort=True):
+        """ The heads and the relations of the maximum spanning trees of the scores of a batch """
+        sentlens = scores.sentlens
+        trees, greedy = chuliu_edmonds_batch(scores.heads, sentlens)
+        logger.debug("%d of %d trees were the best heads of their words", greedy.sum(), len(greedy))
+        heads = np.zeros(scores.heads.shape[:2], dtype=np.int64)
+        for i, tree in enumerate(trees):
+            heads[i, :len(tree)] = tree
+        # the relations are only scored for the chosen heads
+        with torch.no_grad():
+            deprels = self.model.label(scores.deprel_hidden, torch.from_numpy(heads).to(scores.deprel_hidden[0].device))
+        deprels = self.vocab['deprel'].unmap_array(deprels.cpu().numpy()).tolist()
+        heads = heads.astype(str).tolist()
 
-        pred_tokens = [[[str(head_seqs[i][j]), deprel_seqs[i][j]] for j in range(sentlens[i]-1)] for i in range(batch_size)]
+        # remove attachment for the root
+        pred_tokens = [[[heads[i][j], deprels[i][j]] for j in range(1, sentlens[i])] for i in range(len(sentlens))]
         if unsort:
-            pred_tokens = utils.unsort(pred_tokens, orig_idx)
+            pred_tokens = utils.unsort(pred_tokens, scores.orig_idx)
         return pred_tokens
 
+    def predict(self, batch, unsort=True):
+        return self.decode(self.score(batch), unsort=unsort)
+
     def save(self, filename, skip_modules=True):
         model_state = self.model.state_dict()
         # skip saving modules like pretrained embeddings, because they are large and will be saved in a separate file
@@ -117,3 +142,52 @@ class Trainer(BaseTrainer):
         self.model = Parser(self.args, self.vocab, emb_matrix=emb_matrix)
         self.model.load_state_dict(checkpoint['model'], strict=False)
 
+
+
+class DecoderPool():
+    """
+    Decodes the scores of the parser into trees in a pool of threads, while the parser goes on with the next batches.
+    With no workers the batches are decoded in the calling thread.
+    The decoder holds the GIL for the sentences it decodes, so more than one worker seldom helps.
+    A closed pool starts its threads again when it is next used.
+    """
+
+    def __init__(self, trainer, num_workers=1):
+        self.trainer = trainer
+        self.num_workers = num_workers
+        self.executor = None
+        self.start()
+
+    def start(self):
+        if self.executor is None and self.num_workers > 0:
+            self.executor = ThreadPoolExecutor(self.num_workers)
+
+    def map(self, batches, unsort=True):
+        """
+        Parse an iterable of batches, yielding the predictions of each batch in order.
+        The next batch is scored while the previous ones are being decoded.
+        """
+        self.start()
+        if self.executor is None:
+            for batch in batches:
+                yield self.trainer.predict(batch, unsort=unsort)
+            return
+        pending = deque()
+        for batch in batches:
+            pending.append(self.executor.submit(self.trainer.decode, self.trainer.score(batch), unsort))
+            # don't let the parser run too far ahead of the decoder
+            while len(pending) > 2 * self.num_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -3,6 +3,7 @@ import logging
 import torch
 
 from stanza.models.common.data import map_to_ids, get_long_tensor, get_float_tensor, sort_all
+from stanza.models.common.feature_cache import FeatureCache, vocab_key
 from stanza.models.common.vocab import PAD_ID, VOCAB_PREFIX
 from stanza.models.pos.vocab import CharVocab, WordVocab
 from stanza.models.ner.vocab import TagVocab, MultiVocab
@@ -76,9 +77,15 @@ class DataLoader:
             char_case = lambda x: x.lower()
         else:
             char_case = lambda x: x
-        for sent in data:
-            processed_sent = [vocab['word'].map([case(w[0]) for w in sent])]
-            processed_sent += [[vocab['char'].map([char_case(x) for x in w[0]]) for w in sent]]
+        # the ids are kept apart from those of the words of the other processors, as these are tokens
+        features = FeatureCache(self.doc.sentences if self.eval else None)
+        word_key = ('token_word', vocab_key(vocab['word']), args.get('lowercase', True))
+        char_key = ('token_char', vocab_key(vocab['char']), args.get('char_lowercase', False))
+        for sent_idx, sent in enumerate(data):
+            words = [w[0] for w in sent]
+            processed_sent = [features.get(sent_idx, word_key, words, lambda: vocab['word'].map([case(w) for w in words]))]
+            processed_sent += [features.get(sent_idx, char_key, words,
+                                            lambda: [vocab['char'].map([char_case(x) for x in w]) for w in words])]
             processed_sent += [vocab['tag'].map([w[1] for w in sent])]
             processed.append(processed_sent)
         return processed
@@ -22,7 +22,7 @@ from torch import nn, optim
 
 import stanza.models.depparse.data as data
 from stanza.models.depparse.data import DataLoader
-from stanza.models.depparse.trainer import Trainer
+from stanza.models.depparse.trainer import DecoderPool, Trainer
 from stanza.models.depparse import scorer
 from stanza.models.common import utils
 from stanza.models.common.pretrain import Pretrain
@@ -77,6 +77,8 @@ def parse_args(args=None):
     parser.add_argument('--eval_interval', type=int, default=100)
     parser.add_argument('--max_steps_before_stop', type=int, default=3000)
     parser.add_argument('--batch_size', type=int, default=5000)
+    parser.add_argument('--decode_workers', type=int, default=1, help="Number of threads decoding the trees of a batch while the next batch is parsed.  0 decodes each batch right after parsing it.")
+    parser.add_argument('--batch_cost', action='store_true', help='Fill the batches up to batch_size in an estimate of their padded cost rather than in words.')
     parser.add_argument('--max_grad_norm', type=float, default=1.0, help='Gradient clipping.')
     parser.add_argument('--log_step', type=int, default=20, help='Print log every k steps.')
     parser.add_argument('--save_dir', type=str, default='saved_models/depparse', help='Root dir for saving models.')
@@ -263,8 +265,9 @@ def evaluate(args):
     if len(batch) > 0:
         logger.info("Start evaluation...")
         preds = []
-        for i, b in enumerate(batch):
-            preds += trainer.predict(b)
+        with DecoderPool(trainer, args['decode_workers']) as pool:
+            for batch_preds in pool.map(batch):
+                preds += batch_preds
     else:
         # skip eval if dev data does not exist
         preds = []
@@ -0,0 +1,35 @@
+"""
+Compile the hunspell analyses used by the Lithuanian POS post-filter into a local sqlite file,
+so that hunspell is only needed while tagging for the words the table misses, such as compounds.
+
+Every word form of the hunspell dictionary is analysed once, which takes a while.  For example:
+
+  python -m stanza.models.pos.build_hunspell_table lt_hunspell.db --dict_dir data_files/hunspell
+
+The resulting file can then be passed to the tagger with --morph_hunspell_table lt_hunspell.db
+"""
+
+import argparse
+import logging
+
+from stanza.models.pos.hunspeller.huncheck import DEFAULT_DICT_NAME, DEFAULT_DICT_DIR
+from stanza.models.pos.hunspeller.table import build_hunspell_table
+
+logger = logging.getLogger('stanza')
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('output_file', type=str, help='The sqlite file to create.')
+    parser.add_argument('--dict_dir', type=str, default=DEFAULT_DICT_DIR, help='Directory of the hunspell .dic and .aff files.')
+    parser.add_argument('--dict_name', type=str, default=DEFAULT_DICT_NAME, help='Name of the hunspell .dic and .aff files.')
+    parser.add_argument('--no_numerals', dest='numerals', action='store_false', help="Don't add the numerals generated by decline.py.")
+    args = parser.parse_args(args=args)
+    return args
+
+def main(args=None):
+    args = parse_args(args=args)
+    total = build_hunspell_table(args.output_file, args.dict_name, args.dict_dir, args.numerals)
+    logger.info("Wrote {} entries to {}".format(total, args.output_file))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+"""
+Compile a morphological dictionary for the POS post-filter into a local sqlite file, so that no MySQL server is needed.
+
+The input is the same data that table_filler.py loads into MySQL: the pos_files directory
+(including the gzipped noun shards) plus the treebank training data.  For example:
+
+  python -m stanza.models.pos.build_morph_dict lt_morph.db data_files/lt/morph_dict/pos_files \
+      data_files/lt/morph_dict/lt_alksnis-ud-train.conllu data_files/lt/morph_dict/lt_alksnis-ud-dev.conllu
+
+The resulting file can then be passed to the tagger with --morph_dict lt_morph.db
+"""
+
+import argparse
+import logging
+
+from stanza.models.pos.morph import build_morph_dict
+
+logger = logging.getLogger('stanza')
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('output_file', type=str, help='The sqlite file to create.')
+    parser.add_argument('input_paths', type=str, nargs='+', help='CoNLL-U files or directories of .conllu/.conllu.gz files.')
+    args = parser.parse_args(args=args)
+    return args
+
+def main(args=None):
+    args = parse_args(args=args)
+    total = build_morph_dict(args.output_file, args.input_paths)
+    logger.info("Wrote {} entries to {}".format(total, args.output_file))
+
+if __name__ == '__main__':
+    main()
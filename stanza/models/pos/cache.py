@@ -0,0 +1,174 @@
+"""
+Bounded in-process caches for the analyses used by the POS post-filter.
+
+Word frequencies are heavily skewed, so the same few thousand forms are looked up in the
+morphological dictionary and analysed by hunspell over and over again.  The caches here sit in
+front of both sources and keep the most recently used analyses across batches and documents.
+"""
+
+from collections import OrderedDict
+import logging
+import threading
+
+from stanza.models.pos.morph import MorphDictionary, load_morph_dict
+
+logger = logging.getLogger('stanza')
+
+DEFAULT_CACHE_SIZE = 200000
+
+# marks a word which has not been looked up yet, as opposed to a word known to have no analyses
+_MISSING = object()
+
+class LRUCache():
+    """
+    A mapping of bounded size which forgets the least recently used entries first.
+    Counts hits, misses and evictions so the hit rate can be reported.
+    """
+
+    def __init__(self, max_size=DEFAULT_CACHE_SIZE):
+        if max_size <= 0:
+            raise ValueError("Cache size must be positive, got {}".format(max_size))
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.entries
+
+    def __len__(self):
+        with self.lock:
+            return len(self.entries)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {'size': len(self.entries),
+                    'hits': self.hits,
+                    'misses': self.misses,
+                    'evictions': self.evictions,
+                    'hit_rate': self.hits / lookups if lookups > 0 else 0.0}
+
+def copy_analyses(analyses):
+    """ The post-filter extends the analysis lists in place, so it never gets the cached lists themselves """
+    if analyses[0] is None:
+        return analyses
+    return tuple(list(x) for x in analyses)
+
+def read_frequency_list(filename, max_words=None):
+    """
+    Read the words of a frequency list such as frequent_lemma_study/{lt,sme}/freqs_found.txt,
+    taking the first column of each line, most frequent first
+    """
+    words = []
+    with open(filename, encoding='utf-8') as fin:
+        for line in fin:
+            pieces = line.split()
+            if not pieces:
+                continue
+            words.append(pieces[0])
+            if max_words is not None and len(words) >= max_words:
+                break
+    return words
+
+
+class CachedMorphDictionary(MorphDictionary):
+    """
+    Wraps a MorphDictionary, only querying it for words which are not cached yet.
+    Words which are not in the dictionary are cached too, so they are not queried again.
+    """
+
+    def __init__(self, morph_dict, max_size=DEFAULT_CACHE_SIZE):
+        self.morph_dict = morph_dict
+        self.cache = LRUCache(max_size)
+
+    def find_many(self, words):
+        found = dict()
+        missing = []
+        for word in dict.fromkeys(words):
+            entry = self.cache.get(word, _MISSING)
+            if entry is _MISSING:
+                missing.append(word)
+            elif entry is not None:
+                found[word] = copy_analyses(entry)
+        if missing:
+            queried = self.morph_dict.find_many(missing)
+            for word in missing:
+                entry = queried.get(word)
+                self.cache.put(word, entry)
+                if entry is not None:
+                    found[word] = copy_analyses(entry)
+        return found
+
+    def warm(self, words):
+        """
+        Preload the analyses of the given words, both as written and lowercased
+        """
+        words = list(words)
+        self.find_many(words + [w.lower() for w in words])
+
+    def warm_from_file(self, filename, max_words=None):
+        words = read_frequency_list(filename, max_words)
+        self.warm(words)
+        logger.info("Preloaded dictionary analyses of {} words from {}".format(len(words), filename))
+
+    def stats(self):
+        return self.cache.stats()
+
+def load_cached_morph_dict(name, max_size=DEFAULT_CACHE_SIZE, warmup_file=None):
+    """
+    Open the morphological dictionary given by name, as in load_morph_dict, behind a cache.
+    If warmup_file is given, the analyses of the words it lists are loaded right away.
+    """
+    morph_dict = CachedMorphDictionary(load_morph_dict(name), max_size)
+    if warmup_file:
+        morph_dict.warm_from_file(warmup_file)
+    return morph_dict
+
+
+class CachedHunchecker():
+    """
+    Wraps a Hunchecker, so that each word form is only analysed by hunspell once
+    """
+
+    def __init__(self, hunchecker, max_size=DEFAULT_CACHE_SIZE):
+        self.hunchecker = hunchecker
+        self.cache = LRUCache(max_size)
+
+    def hunspell_to_conll(self, word):
+        result = self.cache.get(word, _MISSING)
+        if result is _MISSING:
+            result = self.hunchecker.hunspell_to_conll(word)
+            self.cache.put(word, result)
+        return copy_analyses(result)
+
+    def analyse_many(self, words):
+        return {word: self.hunspell_to_conll(word) for word in words}
+
+    def warm(self, words):
+        for word in words:
+            self.hunspell_to_conll(word)
+            self.hunspell_to_conll(word.lower())
+
+    def stats(self):
+        return self.cache.stats()
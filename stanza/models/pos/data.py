@@ -2,7 +2,9 @@ import random
 import logging
 import torch
 
+from stanza.models.common.batch_cost import BatchCost, plan_batches, padding_waste
 from stanza.models.common.data import map_to_ids, get_long_tensor, get_float_tensor, sort_all
+from stanza.models.common.feature_cache import FeatureCache, vocab_key
 from stanza.models.common.vocab import PAD_ID, VOCAB_PREFIX, CharVocab
 from stanza.models.pos.vocab import WordVocab, XPOSVocab, FeatureVocab, MultiVocab
 from stanza.models.pos.xpos_vocab_factory import xpos_vocab_factory
@@ -46,7 +48,8 @@ class DataLoader:
 
         # chunk into batches
         self.data = self.chunk_batches(data)
-        logger.debug("{} batches created.".format(len(self.data)))
+        logger.debug("{} batches created, {:.1%} of the words and {:.1%} of the chars are padding.".format(
+            len(self.data), self.padding_waste.words, self.padding_waste.chars))
 
     def init_vocab(self, data):
         assert self.eval == False # for eval vocab must exist
@@ -64,17 +67,25 @@ class DataLoader:
 
     def preprocess(self, data, vocab, pretrain_vocab, args):
         processed = []
-        for sent in data:
-            processed_sent = [vocab['word'].map([w[0] for w in sent])]
-            processed_sent += [[vocab['char'].map([x for x in w[0]]) for w in sent]]
+        # the word, char and pretrained ids may already be known from another processor
+        features = FeatureCache(self.doc.sentences if self.eval else None)
+        for sent_idx, sent in enumerate(data):
+            words = [w[0] for w in sent]
+            processed_sent = [features.get(sent_idx, ('word', vocab_key(vocab['word'])), words,
+                                           lambda: vocab['word'].map(words))]
+            processed_sent += [features.get(sent_idx, ('char', vocab_key(vocab['char'])), words,
+                                            lambda: [vocab['char'].map([x for x in w]) for w in words])]
             processed_sent += [vocab['upos'].map([w[1] for w in sent])]
             processed_sent += [vocab['xpos'].map([w[2] for w in sent])]
             processed_sent += [vocab['feats'].map([w[3] for w in sent])]
             if pretrain_vocab is not None:
                 # always use lowercase lookup in pretrained vocab
-                processed_sent += [pretrain_vocab.map([w[0].lower() for w in sent])]
+                processed_sent += [features.get(sent_idx, ('pretrain', vocab_key(pretrain_vocab)), words,
+                                                lambda: pretrain_vocab.map([w.lower() for w in words]))]
             else:
                 processed_sent += [[PAD_ID] * len(sent)]
+            # keep the words themselves for the dictionary lookups of the post-filter
+            processed_sent += [words]
             processed.append(processed_sent)
         return processed
 
@@ -90,7 +101,7 @@ class DataLoader:
         batch = self.data[key]
         batch_size = len(batch)
         batch = list(zip(*batch))
-        assert len(batch) == 6
+        assert len(batch) == 7
 
         # sort sentences by lens for easy RNN operations
         lens = [len(x) for x in batch[0]]
@@ -115,7 +126,8 @@ class DataLoader:
         ufeats = get_long_tensor(batch[4], batch_size)
         pretrained = get_long_tensor(batch[5], batch_size)
         sentlens = [len(x) for x in batch[0]]
-        return words, words_mask, wordchars, wordchars_mask, upos, xpos, ufeats, pretrained, orig_idx, word_orig_idx, sentlens, word_lens
+        text = batch[6]
+        return words, words_mask, wordchars, wordchars_mask, upos, xpos, ufeats, pretrained, orig_idx, word_orig_idx, sentlens, word_lens, text
 
     def __iter__(self):
         for i in range(self.__len__()):
@@ -141,25 +153,13 @@ class DataLoader:
         random.shuffle(self.data)
 
     def chunk_batches(self, data):
-        res = []
-
         if not self.eval:
             # sort sentences (roughly) by length for better memory utilization
             data = sorted(data, key = lambda x: len(x[0]), reverse=random.random() > .5)
         elif self.sort_during_eval:
             (data, ), self.data_orig_idx = sort_all([data], [len(x[0]) for x in data])
 
-        current = []
-        currentlen = 0
-        for x in data:
-            if len(x[0]) + currentlen > self.batch_size and currentlen > 0:
-                res.append(current)
-                current = []
-                currentlen = 0
-            current.append(x)
-            currentlen += len(x[0])
-
-        if currentlen > 0:
-            res.append(current)
-
+        batch_cost = BatchCost(data) if self.args.get('batch_cost', False) else None
+        res = plan_batches(data, self.batch_size, batch_cost)
+        self.padding_waste = padding_waste(res)
         return res
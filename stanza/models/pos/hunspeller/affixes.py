@@ -0,0 +1,182 @@
+"""
+Expand a hunspell dictionary into the word forms it describes.
+
+Only the parts of the .aff format used by data_files/hunspell/lt-LT_morphology.aff are read:
+numeric flags, flag aliases (AF), the NEEDAFFIX and CIRCUMFIX flags and prefix and suffix rules with
+their conditions and continuation flags.  Roots and affixes flagged NEEDAFFIX only make words together
+with another affix, and affixes flagged CIRCUMFIX only with a prefix and a suffix which both are.
+Compounds are not produced, so hunspell accepts words which are not in the expansion.
+"""
+
+import re
+
+def condition_regex(condition, suffix):
+    """
+    Translate the condition of an affix rule, such as [^dt]ė, into a regular expression
+    which matches the end of the word for suffixes and the start of the word for prefixes
+    """
+    if condition == '.':
+        return None
+    pattern = []
+    in_brackets = False
+    for i, c in enumerate(condition):
+        if c == '[':
+            in_brackets = True
+            pattern.append(c)
+        elif c == ']':
+            in_brackets = False
+            pattern.append(c)
+        elif c == '^' and in_brackets and condition[i - 1] == '[':
+            pattern.append(c)
+        elif c == '.' and not in_brackets:
+            pattern.append(c)
+        else:
+            pattern.append(re.escape(c))
+    pattern = ''.join(pattern)
+    return re.compile(pattern + '$' if suffix else '^' + pattern)
+
+
+class AffixRule():
+    """ A single PFX or SFX line: strip these characters from the root, add those, if the condition matches """
+
+    def __init__(self, strip, add, condition, suffix, cross_product, continuation=()):
+        self.strip = '' if strip == '0' else strip
+        self.add = '' if add == '0' else add
+        # the flags of the affixes which may be added on top of this one
+        self.continuation = continuation
+        self.condition = condition_regex(condition, suffix)
+        self.suffix = suffix
+        self.cross_product = cross_product
+
+    def apply(self, word):
+        """ The word with this affix, or None if the rule does not apply to it """
+        if self.suffix:
+            if not word.endswith(self.strip) or (self.condition is not None and not self.condition.search(word)):
+                return None
+            return word[:len(word) - len(self.strip)] + self.add
+        if not word.startswith(self.strip) or (self.condition is not None and not self.condition.search(word)):
+            return None
+        return self.add + word[len(self.strip):]
+
+
+class AffixFile():
+    """
+    The affix rules of a hunspell .aff file, which expand the entries of the matching .dic file
+    """
+
+    def __init__(self, filename):
+        self.flag_aliases = []
+        self.need_affix = None
+        self.circumfix = None
+        self.prefixes = dict()
+        self.suffixes = dict()
+        self.read(filename)
+
+    def read(self, filename):
+        with open(filename, encoding='utf-8') as fin:
+            lines = fin.readlines()
+        i = 0
+        while i < len(lines):
+            pieces = lines[i].split()
+            i += 1
+            if not pieces or pieces[0].startswith('#'):
+                continue
+            if pieces[0] == 'FLAG' and pieces[1] != 'num':
+                raise ValueError("Only numeric hunspell flags are supported, got FLAG {}".format(pieces[1]))
+            if pieces[0] == 'NEEDAFFIX':
+                self.need_affix = pieces[1]
+            elif pieces[0] == 'CIRCUMFIX':
+                self.circumfix = pieces[1]
+            elif pieces[0] == 'AF' and len(self.flag_aliases) == 0 and pieces[1].isdigit() and ',' not in pieces[1]:
+                # the first AF line is the number of aliases, which are then numbered from 1
+                count = int(pieces[1])
+                for line in lines[i:i + count]:
+                    self.flag_aliases.append(self.parse_flags(line.split()[1]))
+                i += count
+            elif pieces[0] in ('PFX', 'SFX') and len(pieces) == 4:
+                flag, cross_product, count = pieces[1], pieces[2] == 'Y', int(pieces[3])
+                suffix = pieces[0] == 'SFX'
+                rules = (self.suffixes if suffix else self.prefixes).setdefault(flag, [])
+                for line in lines[i:i + count]:
+                    rule = line.split()
+                    add, continuation = rule[3].split('/', 1) if '/' in rule[3] else (rule[3], None)
+                    continuation = self.flags(continuation) if continuation else ()
+                    rules.append(AffixRule(rule[2], add, rule[4] if len(rule) > 4 else '.', suffix, cross_product,
+                                           continuation))
+                i += count
+
+    @staticmethod
+    def parse_flags(flags):
+        return flags.split(',')
+
+    def flags(self, flags):
+        """ Resolve the flags of a .dic entry or an affix, which are either an alias number or a list of flags """
+        if self.flag_aliases and flags.isdigit():
+            return self.flag_aliases[int(flags) - 1]
+        return self.parse_flags(flags)
+
+    def valid(self, rules):
+        """
+        Whether the affixes of rules, all applied to a root, make a word: they are not all NEEDAFFIX,
+        and there is a CIRCUMFIX prefix if and only if there is a CIRCUMFIX suffix
+        """
+        if all(self.need_affix in rule.continuation for rule in rules):
+            return False
+        circumfix_suffix = any(self.circumfix in rule.continuation for rule in rules if rule.suffix)
+        circumfix_prefix = any(self.circumfix in rule.continuation for rule in rules if not rule.suffix)
+        return circumfix_suffix == circumfix_prefix
+
+    def expand(self, root, flags):
+        """
+        Yield the root, unless it is flagged NEEDAFFIX, and every word made from it by the affixes it is flagged
+        with: up to two suffixes, as hunspell allows, and a prefix when both affixes allow the combination
+        or when the suffix allows the prefix
+        """
+        if self.need_affix not in flags:
+            yield root
+        # the forms with one or two suffixes, with the rules which made them
+        suffixed = []
+        for flag in flags:
+            for rule in self.suffixes.get(flag, ()):
+                form = rule.apply(root)
+                if form is None:
+                    continue
+                suffixed.append((form, [rule]))
+                for second_flag in rule.continuation:
+                    for second_rule in self.suffixes.get(second_flag, ()):
+                        second_form = second_rule.apply(form)
+                        if second_form is not None:
+                            suffixed.append((second_form, [rule, second_rule]))
+        for form, rules in suffixed:
+            if self.valid(rules):
+                yield form
+        for form, rules in [(root, [])] + suffixed:
+            # prefixes allowed by the continuation of the suffixes rather than by the root
+            prefix_rules = [prefix_rule for rule in rules for second_flag in rule.continuation
+                            for prefix_rule in self.prefixes.get(second_flag, ())]
+            if all(rule.cross_product for rule in rules):
+                prefix_rules.extend(prefix_rule for flag in flags for prefix_rule in self.prefixes.get(flag, ())
+                                    if not rules or prefix_rule.cross_product)
+            for prefix_rule in prefix_rules:
+                prefixed = prefix_rule.apply(form)
+                if prefixed is not None and self.valid(rules + [prefix_rule]):
+                    yield prefixed
+
+    def expand_dictionary(self, filename):
+        """
+        Yield the forms of every entry of a .dic file.  The same form can be yielded more than once.
+        """
+        with open(filename, encoding='utf-8') as fin:
+            # the first line is the number of entries
+            fin.readline()
+            for line in fin:
+                line = line.strip()
+                if not line:
+                    continue
+                # anything after the whitespace is morphological information
+                entry = line.split()[0]
+                if '/' in entry:
+                    root, flags = entry.split('/', 1)
+                    yield from self.expand(root, self.flags(flags))
+                else:
+                    yield entry
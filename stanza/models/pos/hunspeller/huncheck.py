@@ -1,7 +1,36 @@
-from hunspell import Hunspell
+import logging
+import os
+import threading
+import time
+
 from stanza.models.pos.hunspeller.pos import *
 from stanza.models.pos.hunspeller.decline import *
 
+logger = logging.getLogger('stanza')
+
+DEFAULT_DICT_NAME = 'lt-LT_morphology'
+# data_files/hunspell at the root of the repository
+DEFAULT_DICT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, os.pardir, os.pardir, os.pardir,
+                                'data_files', 'hunspell')
+DEFAULT_DICT_DIR = os.path.normpath(DEFAULT_DICT_DIR)
+
+# the analysers loaded in this process, keyed by the path of their dictionary
+_huncheckers = dict()
+_huncheckers_lock = threading.Lock()
+
+def get_hunchecker(dict_file=DEFAULT_DICT_NAME, dict_data_dir=DEFAULT_DICT_DIR):
+    """
+    Get the analyser of the given dictionary, loading it the first time it is asked for.
+    Loading the dictionary takes a while, so each one is only loaded once per process.
+    """
+    key = os.path.abspath(os.path.join(dict_data_dir, dict_file))
+    with _huncheckers_lock:
+        if key not in _huncheckers:
+            start_time = time.time()
+            _huncheckers[key] = Hunchecker(dict_file, dict_data_dir)
+            logger.info("Loaded hunspell dictionary {} in {:.2f} seconds".format(key, time.time() - start_time))
+        return _huncheckers[key]
+
 
 class Hunchecker():
     """
@@ -9,8 +38,14 @@ class Hunchecker():
     """
 
     def __init__(self, dict_file, dict_data_dir=None):
+        from hunspell import Hunspell
+
+        if dict_data_dir is not None and not os.path.isfile(os.path.join(dict_data_dir, dict_file + '.dic')):
+            raise FileNotFoundError("Hunspell dictionary not found: {}".format(os.path.join(dict_data_dir, dict_file + '.dic')))
         self.h = Hunspell(dict_file, hunspell_data_dir=dict_data_dir)
         #h = Hunspell('lt-LT_morphology', hunspell_data_dir='D:/Hunspell-Zodynai-ir-gramatika-v.45')
+        # the same analyser can be shared by several threads
+        self.lock = threading.Lock()
 
     def hunspell_to_conll(self, input):
         """
@@ -53,7 +88,8 @@ class Hunchecker():
 
         akr = ['acronym', 'acronym_substandard']
 
-        output = self.h.analyze(input)
+        with self.lock:
+            output = self.h.analyze(input)
         if len(output) < 1:
             return None, None, None, None
         poss_outputs = list()
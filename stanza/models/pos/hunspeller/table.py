@@ -0,0 +1,151 @@
+"""
+A precompiled table of the hunspell analyses used by the POS post-filter for Lithuanian.
+
+Analysing a word with hunspell and turning the result into XPOS and UFeats tags with the objects
+of decline.py and pos.py is slow, and only depends on the word form.  build_hunspell_table lists
+every form described by the hunspell dictionary, analyses each of them once and stores the results,
+together with the numerals of decline.py, in a sqlite file with the same layout as the morphological
+dictionary.  HunspellTable then answers the post-filter with a single query per batch.
+
+The forms are listed by affixes.AffixFile, which does not make compounds, so hunspell recognises words
+which are not in the table.  HunspellTable can ask hunspell itself about the words it does not have.
+"""
+
+import logging
+import os
+import sqlite3
+import tempfile
+from itertools import islice
+
+from stanza.models.pos.cache import CachedMorphDictionary, DEFAULT_CACHE_SIZE
+from stanza.models.pos.hunspeller.affixes import AffixFile
+from stanza.models.pos.hunspeller.decline import generate_numerals
+from stanza.models.pos.hunspeller.huncheck import get_hunchecker, DEFAULT_DICT_NAME, DEFAULT_DICT_DIR
+from stanza.models.pos.morph import SQLiteMorphDictionary, read_morph_entries, write_morph_dict
+
+logger = logging.getLogger('stanza')
+
+NO_ANALYSES = (None, None, None, None)
+
+def case_variants(word):
+    """
+    The forms under which hunspell looks up a word: capitalised and uppercase words are also
+    looked up in lowercase, and uppercase words capitalised, so that eg VILNIUJE finds Vilniuje
+    """
+    variants = [word]
+    if len(word) > 1 and word.isupper():
+        variants.append(word.capitalize())
+    if word[:1].isupper() and (len(word) == 1 or word[1:].islower() or word.isupper()):
+        variants.append(word.lower())
+    return variants
+
+
+class HunspellTable():
+    """
+    Looks up the analyses of a table compiled by build_hunspell_table.
+    A drop in replacement for a (cached) Hunchecker, which only needs hunspell for the words missing from the table.
+
+    :param fallback: a function returning the analyser of the words missing from the table, such as compounds,
+      eg a CachedHunchecker.  It is called on the first miss; if hunspell or its dictionary is not installed,
+      the misses are left without analyses
+    """
+
+    def __init__(self, filename, max_size=DEFAULT_CACHE_SIZE, fallback=None):
+        self.filename = filename
+        self.morph_dict = CachedMorphDictionary(SQLiteMorphDictionary(filename), max_size)
+        self.fallback = fallback
+        self.fallback_analyser = None
+
+    def get_fallback_analyser(self):
+        if self.fallback_analyser is None and self.fallback is not None:
+            try:
+                self.fallback_analyser = self.fallback()
+            except (ImportError, OSError) as e:
+                logger.warning("Hunspell is not available, so the words missing from {} are not analysed: {}".format(self.filename, e))
+            self.fallback = None
+        return self.fallback_analyser
+
+    def analyse_many(self, words):
+        """
+        Analyse many words with one query
+        :return: a dict mapping every word to its lists of lemmas, UPOS, XPOS and UFeats tags, or Nones
+        """
+        variants = {word: case_variants(word) for word in words}
+        found = self.morph_dict.find_many(v for word_variants in variants.values() for v in word_variants)
+        analyses = dict()
+        for word, word_variants in variants.items():
+            rows = []
+            for variant in word_variants:
+                if variant in found:
+                    for row in zip(*found[variant]):
+                        if row not in rows:
+                            rows.append(row)
+            analyses[word] = tuple(list(x) for x in zip(*rows)) if rows else NO_ANALYSES
+        missing = [word for word, word_analyses in analyses.items() if word_analyses is NO_ANALYSES]
+        if missing and self.get_fallback_analyser() is not None:
+            analyses.update(self.fallback_analyser.analyse_many(missing))
+        return analyses
+
+    def hunspell_to_conll(self, word):
+        return self.analyse_many([word])[word]
+
+    def warm(self, words):
+        words = list(words)
+        self.analyse_many(words + [w.lower() for w in words])
+
+    def stats(self):
+        stats = self.morph_dict.stats()
+        if self.fallback_analyser is not None:
+            stats['fallback'] = self.fallback_analyser.stats()
+        return stats
+
+
+def list_forms(dict_file, aff_file, forms_file, chunk_size=100000):
+    """
+    Expand the hunspell dictionary into a table of distinct word forms in the sqlite file forms_file.
+    The forms are kept on disk, as there are tens of millions of them.
+    :return: the open connection to forms_file
+    """
+    affixes = AffixFile(aff_file)
+    db = sqlite3.connect(forms_file)
+    db.execute('CREATE TABLE forms (word TEXT PRIMARY KEY)')
+    forms = affixes.expand_dictionary(dict_file)
+    while True:
+        chunk = list(islice(forms, chunk_size))
+        if not chunk:
+            break
+        db.executemany('INSERT OR IGNORE INTO forms VALUES (?)', [(form,) for form in chunk])
+    db.commit()
+    return db
+
+def build_hunspell_table(output_file, dict_name=DEFAULT_DICT_NAME, dict_dir=DEFAULT_DICT_DIR, numerals=True):
+    """
+    Compile the analyses of every form of a hunspell dictionary into a table readable by HunspellTable.
+    This needs hunspell, which the table then replaces while tagging, except for compounds.
+    :param output_file: the sqlite file to create.  An existing file is replaced
+    :param dict_name: the name of the .dic and .aff files
+    :param dict_dir: the directory of the .dic and .aff files
+    :param numerals: whether to add the numerals generated by decline.generate_numerals
+    :return: the number of entries written
+    """
+    hunchecker = get_hunchecker(dict_name, dict_dir)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        forms = list_forms(os.path.join(dict_dir, dict_name + '.dic'), os.path.join(dict_dir, dict_name + '.aff'),
+                           os.path.join(tmp_dir, 'forms.db'))
+        logger.info("Analysing {} word forms".format(forms.execute('SELECT COUNT(*) FROM forms').fetchone()[0]))
+
+        def entries():
+            # the forms hunspell does not recognise are left out
+            for (word,) in forms.execute('SELECT word FROM forms'):
+                lemma, upos, xpos, feats = hunchecker.hunspell_to_conll(word)
+                if upos is not None:
+                    yield from zip([word] * len(upos), lemma, upos, xpos, feats)
+            if numerals:
+                numerals_file = os.path.join(tmp_dir, 'numerals.conllu')
+                generate_numerals(numerals_file)
+                yield from read_morph_entries(numerals_file)
+
+        try:
+            return write_morph_dict(output_file, entries())
+        finally:
+            forms.close()
@@ -1,20 +1,95 @@
+from abc import ABC, abstractmethod
 from stanza.models.common.doc import Document
 from stanza.utils.conll import CoNLL
 from collections import Counter
 import gzip
+from itertools import islice
+import os
 import shutil
+import sqlite3
 from stanza.models.pos.vocab import CharVocab, WordVocab, XPOSVocab, FeatureVocab, MultiVocab
-import mysql.connector
 import configparser
 
 '''Connect to a morphological dictionary and retrieve a word and its information'''
 
-class MorphDictionary():
+# maximum number of words sent to the database in a single query
+DEFAULT_CHUNK_SIZE = 1000
+# sqlite refuses statements with too many parameters, so its chunks are smaller
+SQLITE_CHUNK_SIZE = 500
 
-    def __init__(self, table_name):
+# the MySQL login data, edit it before filling the tables with data_files/{lt,sme}/morph_dict/table_filler.py
+DEFAULT_CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.properties')
+
+class MorphDictionary(ABC):
+    """
+    Base class for the morphological dictionary backends used by the POS post-filter.
+    Backends only need to implement find_many.
+    """
+
+    def find(self, word):
+        """
+        Retrieve the analyses of a single word
+        :param word: the word
+        :return: lists of possible lemmas, UPOS, XPOS and UFeats tags, or Nones if the word is not in the dictionary
+        """
+        found = self.find_many([word])
+        if word not in found:
+            return None, None, None, None
+        return found[word]
+
+    @abstractmethod
+    def find_many(self, words):
+        """
+        Retrieve the analyses of many words at once
+        :param words: an iterable of words
+        :return: a dict mapping every word found in the dictionary to its lists of lemmas, UPOS, XPOS and UFeats tags
+        """
+        pass
+
+
+class SQLMorphDictionary(MorphDictionary):
+    """
+    Base class for the dictionaries stored in an SQL table with word, lemma, upos, xpos and feats columns
+    """
+
+    # the parameter placeholder of the database driver
+    PLACEHOLDER = None
+
+    def _query_chunks(self, cursor, query, words, chunk_size):
+        """
+        Run a `where word in (...)` query for every chunk of words and collect the matching rows.
+        The query has a single {} slot which is filled with the placeholders of a chunk.
+        """
+        # remove duplicates but keep the order, so that the chunks are deterministic
+        words = list(dict.fromkeys(words))
+        found = dict()
+        for i in range(0, len(words), chunk_size):
+            chunk = words[i:i + chunk_size]
+            placeholders = ', '.join([self.PLACEHOLDER] * len(chunk))
+            cursor.execute(query.format(placeholders), tuple(chunk))
+            requested = set(chunk)
+            for m in cursor.fetchall():
+                if m[0] in requested:  # make sure the words are actually the same and not mixed up due to utf8 issues
+                    lemmas, upos, xpos, feats = found.setdefault(m[0], ([], [], [], []))
+                    lemmas += [m[1]]
+                    upos += [m[2]]
+                    xpos += [m[3]]
+                    feats += [m[4]]
+        return found
+
+
+class MySQLMorphDictionary(SQLMorphDictionary):
+    """
+    A dictionary stored in a MySQL table, as created by data_files/{lt,sme}/morph_dict/table_filler.py
+    """
+
+    PLACEHOLDER = '%s'
+
+    def __init__(self, table_name, chunk_size=DEFAULT_CHUNK_SIZE, config_file=DEFAULT_CONFIG_FILE):
+        import mysql.connector
 
         config = configparser.ConfigParser()
-        config.read('config.properties')
+        config.read(config_file)
 
         self.mydb = mysql.connector.connect(
         host=config["myDB"]["host"],
@@ -22,30 +97,115 @@ class MorphDictionary():
         password=config["myDB"]["password"],
         database=config["myDB"]["database"])
         self.mydb.set_charset_collation('utf8mb4', 'utf8mb4_unicode_520_ci')
-        
+
         self.db = table_name
         self.myc = self.mydb.cursor()
+        self.chunk_size = chunk_size
 
-    def find(self, word):
+    def find_many(self, words):
+        """
+        Retrieve the analyses of many words at once, using one query per chunk of words instead of one query per word
+        """
+        query = "select word, lemma, upos, xpos, feats from " + self.db + " where word in ({})"
+        return self._query_chunks(self.myc, query, words, self.chunk_size)
 
-        lemmas = list()
-        upos = list()
-        xpos = list()
-        feats = list()
-        
-        self.myc.execute("select word, lemma, upos, xpos, feats from " + self.db + " where word = '" + word + "'")
-        myresult = self.myc.fetchall()
-        
-        if len(myresult) < 1:
-            return None, None, None, None
+
+class SQLiteMorphDictionary(SQLMorphDictionary):
+    """
+    A dictionary compiled into a local sqlite file by build_morph_dict.  No database server is needed.
+    """
+
+    PLACEHOLDER = '?'
+
+    def __init__(self, filename, chunk_size=SQLITE_CHUNK_SIZE):
+        if not os.path.isfile(filename):
+            raise FileNotFoundError("Morphological dictionary file not found: {}".format(filename))
+        # the dictionary is never written to while tagging
+        self.conn = sqlite3.connect('file:{}?mode=ro'.format(filename), uri=True, check_same_thread=False)
+        self.myc = self.conn.cursor()
+        self.filename = filename
+        self.chunk_size = chunk_size
+
+    def find_many(self, words):
+        query = "select word, lemma, upos, xpos, feats from morph where word in ({})"
+        return self._query_chunks(self.myc, query, words, self.chunk_size)
+
+
+def load_morph_dict(name):
+    """
+    Open the morphological dictionary given by --morph_dict:
+    an existing file is read as a compiled sqlite dictionary, anything else is taken to be the name of a MySQL table
+    """
+    if os.path.isfile(name):
+        return SQLiteMorphDictionary(name)
+    return MySQLMorphDictionary(name)
+
+
+def list_conllu_files(paths):
+    """
+    Expand a list of files and directories into the .conllu and .conllu.gz files they contain, in a stable order
+    """
+    filenames = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                filenames.extend(os.path.join(root, f) for f in sorted(files)
+                                 if f.endswith('.conllu') or f.endswith('.conllu.gz'))
         else:
-            for m in myresult:
-                if m[0] == word:  # make sure the words are actually the same and not mixed up due to utf8 issues
-                    lemmas += [m[1]]
-                    upos += [m[2]]
-                    xpos += [m[3]]
-                    feats += [m[4]]
-            if len(lemmas) > 0:
-                return lemmas, upos, xpos, feats
-            else:
-                return None, None, None, None
\ No newline at end of file
+            filenames.append(path)
+    return filenames
+
+def read_morph_entries(filename):
+    """
+    Read the (word, lemma, upos, xpos, feats) columns of every token line in a possibly gzipped CoNLL-U file
+    """
+    open_fn = gzip.open if filename.endswith('.gz') else open
+    with open_fn(filename, 'rt', encoding='utf-8') as fin:
+        for line in fin:
+            line = line.rstrip('\r\n')
+            if not line.strip() or line.startswith('#'):
+                continue
+            pieces = line.split('\t')
+            if len(pieces) < 6:
+                continue
+            yield tuple(pieces[1:6])
+
+def write_morph_dict(output_file, entries, chunk_size=100000):
+    """
+    Write (word, lemma, upos, xpos, feats) entries into a new sqlite dictionary indexed on the word form,
+    readable by SQLiteMorphDictionary.  An existing file is replaced.
+    :return: the number of entries written
+    """
+    if os.path.exists(output_file):
+        os.remove(output_file)
+    db = sqlite3.connect(output_file)
+    try:
+        db.execute('CREATE TABLE morph (word TEXT, lemma TEXT, upos TEXT, xpos TEXT, feats TEXT)')
+        total = 0
+        entries = iter(entries)
+        while True:
+            chunk = list(islice(entries, chunk_size))
+            if not chunk:
+                break
+            db.executemany('INSERT INTO morph VALUES (?, ?, ?, ?, ?)', chunk)
+            total += len(chunk)
+        # add index for faster look-up
+        db.execute('CREATE INDEX morph_word ON morph (word)')
+        db.commit()
+    finally:
+        db.close()
+    return total
+
+def build_morph_dict(output_file, paths):
+    """
+    Compile CoNLL-U files into a sqlite dictionary indexed on the word form, readable by SQLiteMorphDictionary.
+
+    Every token line becomes a row, exactly like the MySQL tables built by table_filler.py,
+    so both backends return the same analyses.
+    :param output_file: the sqlite file to create.  An existing file is replaced
+    :param paths: CoNLL-U files, or directories which are searched for .conllu and .conllu.gz files
+    :return: the number of entries written
+    """
+    entries = (entry for filename in list_conllu_files(paths) for entry in read_morph_entries(filename))
+    return write_morph_dict(output_file, entries)
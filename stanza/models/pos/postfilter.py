@@ -0,0 +1,315 @@
+"""
+The morphological post-filter of the POS tagger.
+
+The tagger only proposes its most likely UPOS tags and the UFeats conditioned on each of them.
+The post-filter checks the tags against a morphological dictionary, and hunspell for Lithuanian,
+and corrects the ones which are not possible for the word.  It runs on plain python data, so it
+can work in a thread or process pool while the tagger runs the network on the next batch.
+"""
+
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import logging
+import multiprocessing
+import threading
+
+from stanza.models.pos.cache import CachedHunchecker, DEFAULT_CACHE_SIZE, copy_analyses, load_cached_morph_dict, read_frequency_list
+from stanza.models.pos.hunspeller.huncheck import get_hunchecker, DEFAULT_DICT_NAME, DEFAULT_DICT_DIR
+from stanza.models.pos.hunspeller.table import HunspellTable
+
+logger = logging.getLogger('stanza')
+
+# the predictions of the tagger for a batch of sentences, in their original order:
+#   words: the words of each sentence
+#   tags: [upos, xpos, feats] for each word
+#   candidates: (upos ids, feats ids) of the most likely upos tags of each word, best first,
+#               and of the feats predicted when conditioning on each of them
+TaggedBatch = namedtuple('TaggedBatch', ['words', 'tags', 'candidates'])
+
+class PostFilter():
+    """
+    Corrects the predictions of the tagger with a morphological dictionary.
+
+    The dictionary is given either as an open MorphDictionary or by the morph_dict entry of args,
+    in which case it is opened on first use.  Only a filter built from args can be sent to another process.
+    """
+
+    def __init__(self, vocab, args, morph_dict=None):
+        self.vocab = vocab
+        self.args = args
+        self.lang = args.get('lang')
+        self.morph_dict = morph_dict
+        # created on first use, for Lithuanian only
+        self.hunspell = None
+        # the dictionary and hunspell are not safe to use from several threads at once
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        if self.morph_dict is not None and not self.args.get('morph_dict'):
+            raise TypeError("A PostFilter can only be sent to another process if its dictionary is given in args['morph_dict']")
+        state = dict(self.__dict__)
+        state['morph_dict'] = None
+        state['hunspell'] = None
+        del state['lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def _load(self):
+        if self.morph_dict is None:
+            self.morph_dict = load_cached_morph_dict(self.args['morph_dict'],
+                                                     self.args.get('morph_cache_size', DEFAULT_CACHE_SIZE),
+                                                     self.args.get('morph_cache_warmup'))
+        # initialise hunspell for Lithuanian, keeping its analyses cached for the following batches
+        if self.lang == 'lt' and self.hunspell is None:
+            cache_size = self.args.get('morph_cache_size', DEFAULT_CACHE_SIZE)
+            def load_hunspell():
+                # hunspell itself is only loaded once per process, and shared by all filters
+                hunchecker = get_hunchecker(self.args.get('morph_hunspell_name') or DEFAULT_DICT_NAME,
+                                            self.args.get('morph_hunspell_dir') or DEFAULT_DICT_DIR)
+                return CachedHunchecker(hunchecker, cache_size)
+            if self.args.get('morph_hunspell_table'):
+                # the precompiled analyses only need hunspell for the words they miss, such as compounds
+                self.hunspell = HunspellTable(self.args['morph_hunspell_table'], cache_size, fallback=load_hunspell)
+            else:
+                self.hunspell = load_hunspell()
+            if self.args.get('morph_cache_warmup'):
+                self.hunspell.warm(read_frequency_list(self.args['morph_cache_warmup']))
+
+    def known_tag(self, name, tag):
+        """ Tags the model does not know are replaced as they would be by the model's vocab """
+        vocab = self.vocab[name]
+        return vocab.unmap([vocab.map([tag])[0]])[0]
+
+    def __call__(self, tagged):
+        """
+        Filter a TaggedBatch
+        :return: the corrected [upos, xpos, feats] of each word of each sentence
+        """
+        candidates = tagged.candidates
+        pair = [x for x in zip(tagged.words, [[list(t) for t in sent] for sent in tagged.tags])]
+
+        # fetch the dictionary entries of every word in the batch, both as written and lowercased, up front
+        batch_words = set(w for sent in tagged.words for w in sent)
+        with self.lock:
+            self._load()
+            analyses = self.morph_dict.find_many(sorted(batch_words | set(w.lower() for w in batch_words)))
+            if self.hunspell is not None:
+                hunspell_analyses = self.hunspell.analyse_many(batch_words)
+
+        def lookup(word):
+            # copy the lists, as they are extended with analyses from other sources below
+            if word not in analyses:
+                return None, None, None, None
+            return copy_analyses(analyses[word])
+
+        def hunspell_lookup(word):
+            return copy_analyses(hunspell_analyses[word])
+
+        logger.debug('Post-filtering...')
+        for p in range(len(pair)):  # get a sentence
+            words = pair[p][0]
+            tags = pair[p][1]
+
+            a = 0
+            while a < len(words):
+
+                lemma, upos, xpos, feats = lookup(words[a])
+                if upos is None:
+                    lemma, upos, xpos, feats = lookup(words[a].lower())
+                else:
+                    lemma2, upos2, xpos2, feats2 = lookup(words[a].lower())
+                    if lemma2:
+                        for i in range(len(lemma2)):
+                            if upos2[i] not in upos or feats2[i] not in feats:
+                                lemma += [lemma2[i]]
+                                upos += [upos2[i]]
+                                xpos += [xpos2[i]]
+                                feats += [feats2[i]]
+
+                if self.lang == 'lt':
+                    if upos is None:
+                        lemma, upos, xpos, feats = hunspell_lookup(words[a])
+                    else:
+                        lemma_h, upos_h, xpos_h, feats_h = hunspell_lookup(words[a])
+                        if upos_h is not None:
+                            for i in range(len(upos_h)):
+                                if upos_h[i] not in upos or feats_h[i] not in feats:
+                                    lemma += [lemma_h[i]]
+                                    upos += [upos_h[i]]
+                                    xpos += [xpos_h[i]]
+                                    feats += [feats_h[i]]
+
+                if upos is not None:
+                    if tags[a][0] not in upos:
+                        new_upos = None
+                        tag_idx = None
+                        if len(upos) > 1:
+                            max_values = self.vocab['upos'].unmap(candidates[p][a][0][1:])
+                            # go through the values in the order of the most likely one
+                            for m in range(len(max_values)):  # for every max upos tag
+                                # found one of the possible predicted values in the upos list
+                                if max_values[m] in upos:
+                                    indices = [i for i, x in enumerate(upos) if x == max_values[m]]
+                                    if len(indices) > 1:  # more than one upos list items matches the max value item
+                                        # check if an exact match can be found, using the most informative ufeats tag
+                                        for d in indices:
+                                            if feats[d] == self.vocab['feats'].unmap(candidates[p][a][1][1:])[m] and \
+                                                    upos[d] == max_values[m]:
+                                                new_upos = upos[d]
+                                                tag_idx = d
+                                                break
+                                    if len(indices) == 1 or new_upos is None:
+                                        new_upos = max_values[m]
+                                        tag_idx = upos.index(max_values[m])
+                                    break
+                            if new_upos is None:  # last resort
+                                new_upos = upos[0]
+                                tag_idx = 0
+                        else:  # only one item in upos list
+                            new_upos = upos[0]
+                            tag_idx = 0
+
+                        new_xpos = xpos[tag_idx]
+                        new_feats = feats[tag_idx]
+                        # let the tagger deal with multiword tokens itself
+                        if ('Hyph=Yes' not in new_feats and 'Hyph=Yes' in tags[a][2]) or (
+                                'Hyph=Yes' in new_feats and 'Hyph=Yes' not in tags[a][2]):
+                            new_upos = new_xpos = new_feats = None
+
+                        if new_upos is not None:
+                            tags[a][0] = self.known_tag('upos', new_upos)
+                            tags[a][1] = self.known_tag('xpos', new_xpos)
+                            tags[a][2] = self.known_tag('feats', new_feats)
+
+                    else:
+                        new_xpos = new_feats = None
+                        all_found = False
+                        for x in range(len(xpos)):
+                            if tags[a][1] == xpos[x] and tags[a][2] == feats[x] and upos[x] == tags[a][0]:
+                                all_found = True
+                                break
+
+                        if not all_found:
+                            if len(upos) == 1 or (False not in [feats[a] == feats[a + 1] for a in
+                                                                range(len(feats) - 1)] and False not in [
+                                                      upos[a] == upos[a + 1] for a in range(len(upos) - 1)]):
+                                new_feats = feats[0]
+                                if '*' not in tags[a][1]:
+                                    new_xpos = xpos[0]
+                                all_found = True
+
+                        if not all_found:
+                            if len([i for i, x in enumerate(upos) if x == tags[a][0]]) == 1:
+                                new_feats = feats[upos.index(tags[a][0])]
+                                if '*' not in tags[a][1]:
+                                    new_xpos = xpos[upos.index(tags[a][0])]
+                                all_found = True
+
+                        if not all_found:
+                            found_ft = False
+                            for x in range(len(xpos)):
+                                if tags[a][2] == feats[x] and upos[x] == tags[a][0]:
+                                    found_ft = True
+                                    if xpos[x] != tags[a][1] and '*' not in tags[a][1]:
+                                        new_xpos = xpos[x]
+                                    break
+
+                            if not found_ft:
+                                for x in range(len(xpos)):
+                                    if tags[a][1] == xpos[x] and tags[a][2] != feats[x] and upos[x] == tags[a][0]:
+                                        new_feats = feats[x]
+                                        break
+
+                        if new_feats:
+                            if ('Hyph=Yes' not in new_feats and 'Hyph=Yes' in tags[a][2]) or (
+                                    'Hyph=Yes' in new_feats and 'Hyph=Yes' not in tags[a][2]):
+                                # let the tagger deal with multiword tokens itself
+                                new_xpos = new_feats = None
+
+                        if new_xpos is not None:
+                            tags[a][1] = self.known_tag('xpos', new_xpos)
+                        if new_feats is not None:
+                            tags[a][2] = self.known_tag('feats', new_feats)
+
+                a += 1
+
+        logger.debug('Post-filtering complete.')
+        return [tags for _, tags in pair]
+
+
+# the filter of each worker process of a PostFilterPool
+_worker_filter = None
+
+def _init_worker(post_filter):
+    global _worker_filter
+    _worker_filter = post_filter
+
+def _filter_in_worker(tagged):
+    return _worker_filter(tagged)
+
+# how the worker processes of a PostFilterPool are started.  They are not forked, as the process
+# starting them may already be running the threads of a pipeline
+DEFAULT_START_METHOD = 'spawn'
+
+class PostFilterPool():
+    """
+    Runs a PostFilter in a pool of threads, or of processes, while the tagger goes on with the next batches.
+    With no workers the batches are filtered in the calling thread.
+
+    The filter itself is Python code which holds the GIL, so threads only help while they wait on
+    the dictionary, eg a MySQL server.  Processes also run the filtering alongside the tagger.
+    A closed pool starts its workers again when it is next used.
+    """
+
+    def __init__(self, post_filter, num_workers=1, processes=False, start_method=DEFAULT_START_METHOD):
+        self.post_filter = post_filter
+        self.num_workers = num_workers
+        self.processes = processes
+        self.start_method = start_method
+        self.executor = None
+        self.start()
+
+    def start(self):
+        if self.executor is not None or self.num_workers <= 0:
+            return
+        if self.processes:
+            # every process gets its own copy of the filter, which opens its own dictionary
+            self.executor = ProcessPoolExecutor(self.num_workers, mp_context=multiprocessing.get_context(self.start_method),
+                                                initializer=_init_worker, initargs=(self.post_filter,))
+            self.run = _filter_in_worker
+        else:
+            self.executor = ThreadPoolExecutor(self.num_workers)
+            self.run = self.post_filter
+
+    def map(self, tagged_batches):
+        """
+        Filter an iterable of TaggedBatch, yielding the corrected tags of each batch in order.
+        The next batch is taken from tagged_batches while the previous ones are being filtered.
+        """
+        self.start()
+        if self.executor is None:
+            for tagged in tagged_batches:
+                yield self.post_filter(tagged)
+            return
+        pending = deque()
+        for tagged in tagged_batches:
+            pending.append(self.executor.submit(self.run, tagged))
+            # don't let the tagger run too far ahead of the filter
+            while len(pending) > 2 * self.num_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -9,7 +9,8 @@ from torch import nn
 
 from stanza.models.common.trainer import Trainer as BaseTrainer
 from stanza.models.common import utils, loss
-from stanza.models.pos.model import Tagger
+from stanza.models.pos.model import Tagger, UPOS_CANDIDATES
+from stanza.models.pos.postfilter import TaggedBatch
 from stanza.models.pos.vocab import MultiVocab
 
 logger = logging.getLogger('stanza')
@@ -24,13 +25,13 @@ def unpack_batch(batch, use_cuda):
     word_orig_idx = batch[9]
     sentlens = batch[10]
     wordlens = batch[11]
-    return inputs, orig_idx, word_orig_idx, sentlens, wordlens
+    text = batch[12]
+    return inputs, orig_idx, word_orig_idx, sentlens, wordlens, text
 
 class Trainer(BaseTrainer):
     """ A trainer for training models. """
-    def __init__(self, args=None,  doc=None, vocab=None, pretrain=None, model_file=None, use_cuda=False):
+    def __init__(self, args=None, vocab=None, pretrain=None, model_file=None, use_cuda=False):
         self.use_cuda = use_cuda
-        self.doc = doc
         if model_file is not None:
             # load everything from file
             self.load(model_file, pretrain)
@@ -38,8 +39,7 @@ class Trainer(BaseTrainer):
             # build model from scratch
             self.args = args
             self.vocab = vocab
-            self.doc = doc
-            self.model = Tagger(args, vocab, self.doc, emb_matrix=pretrain.emb if pretrain is not None else None, share_hid=args['share_hid'])
+            self.model = Tagger(args, vocab, emb_matrix=pretrain.emb if pretrain is not None else None, share_hid=args['share_hid'])
         self.parameters = [p for p in self.model.parameters() if p.requires_grad]
         if self.use_cuda:
             self.model.cuda()
@@ -48,7 +48,7 @@ class Trainer(BaseTrainer):
         self.optimizer = utils.get_optimizer(self.args['optim'], self.parameters, self.args['lr'], betas=(0.9, self.args['beta2']), eps=1e-6)
 
     def update(self, batch, eval=False):
-        inputs, orig_idx, word_orig_idx, sentlens, wordlens = unpack_batch(batch, self.use_cuda)
+        inputs, orig_idx, word_orig_idx, sentlens, wordlens, _ = unpack_batch(batch, self.use_cuda)
         word, word_mask, wordchars, wordchars_mask, upos, xpos, ufeats, pretrained = inputs
 
         if eval:
@@ -66,13 +66,24 @@ class Trainer(BaseTrainer):
         self.optimizer.step()
         return loss_val
 
-    def predict(self, batch, unsort=True, morph_dict=None, start=None, end=None):
-        inputs, orig_idx, word_orig_idx, sentlens, wordlens = unpack_batch(batch, self.use_cuda)
-        word, word_mask, wordchars, wordchars_mask, upos, xpos, ufeats, pretrained = inputs
+    def predict(self, batch, unsort=True, candidates=False, num_candidates=None):
+        """
+        Tag a batch.  With candidates=True, the tags are returned in a TaggedBatch together with the words
+        and the num_candidates candidate tags which the post-filter chooses from, by default morph_topk of the args
+        """
+        inputs, orig_idx, word_orig_idx, sentlens, wordlens, text = unpack_batch(batch, self.use_cuda)
+        word, word_mask, wordchars, wordchars_mask, _, _, _, pretrained = inputs
 
         self.model.eval()
         batch_size = word.size(0)
-        _, preds = self.model(word, word_mask, wordchars, wordchars_mask, upos, xpos, ufeats, pretrained, word_orig_idx, sentlens, wordlens)
+        if not candidates:
+            num_candidates = 0
+        elif num_candidates is None:
+            num_candidates = self.args.get('morph_topk', UPOS_CANDIDATES)
+        # without the gold tags the model skips the loss
+        with torch.no_grad():
+            _, preds = self.model(word, word_mask, wordchars, wordchars_mask, None, None, None, pretrained, word_orig_idx, sentlens, wordlens,
+                                  num_candidates=num_candidates)
         upos_seqs = [self.vocab['upos'].unmap(sent) for sent in preds[0].tolist()]
         xpos_seqs = [self.vocab['xpos'].unmap(sent) for sent in preds[1].tolist()]
         feats_seqs = [self.vocab['feats'].unmap(sent) for sent in preds[2].tolist()]
@@ -80,7 +91,17 @@ class Trainer(BaseTrainer):
         pred_tokens = [[[upos_seqs[i][j], xpos_seqs[i][j], feats_seqs[i][j]] for j in range(sentlens[i])] for i in range(batch_size)]
         if unsort:
             pred_tokens = utils.unsort(pred_tokens, orig_idx)
-        return pred_tokens
+        if not candidates:
+            return pred_tokens
+
+        upos_candidates = preds[3].tolist()
+        feats_candidates = preds[4].tolist()
+        candidate_tokens = [[(upos_candidates[i][j], feats_candidates[i][j]) for j in range(sentlens[i])] for i in range(batch_size)]
+        words = list(text)
+        if unsort:
+            candidate_tokens = utils.unsort(candidate_tokens, orig_idx)
+            words = utils.unsort(words, orig_idx)
+        return TaggedBatch(words, pred_tokens, candidate_tokens)
 
     def save(self, filename, skip_modules=True):
         model_state = self.model.state_dict()
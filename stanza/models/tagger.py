@@ -21,6 +21,7 @@ from torch import nn, optim
 import stanza.models.pos.data as data
 from stanza.models.pos.data import DataLoader
 from stanza.models.pos.trainer import Trainer
+from stanza.models.pos.model import UPOS_CANDIDATES
 from stanza.models.pos import scorer
 from stanza.models.common import utils
 from stanza.models.common.pretrain import Pretrain
@@ -29,7 +30,8 @@ from stanza.models.common.doc import *
 from stanza.utils.conll import CoNLL
 from stanza.models import _training_logging
 
-from stanza.models.pos.morph import MorphDictionary
+from stanza.models.pos.cache import load_cached_morph_dict, DEFAULT_CACHE_SIZE
+from stanza.models.pos.postfilter import PostFilter, PostFilterPool
 
 logger = logging.getLogger('stanza')
 
@@ -79,6 +81,7 @@ def parse_args(args=None):
             help="Use fixed evaluation interval for all treebanks, otherwise by default the interval will be increased for larger treebanks.")
     parser.add_argument('--max_steps_before_stop', type=int, default=3000, help='Changes learning method or early terminates after this many steps if the dev scores are not improving')
     parser.add_argument('--batch_size', type=int, default=5000)
+    parser.add_argument('--batch_cost', action='store_true', help='Fill the batches up to batch_size in an estimate of their padded cost rather than in words.')
     parser.add_argument('--max_grad_norm', type=float, default=1.0, help='Gradient clipping.')
     parser.add_argument('--log_step', type=int, default=20, help='Print log every k steps.')
     parser.add_argument('--save_dir', type=str, default='saved_models/pos', help='Root dir for saving models.')
@@ -89,7 +92,15 @@ def parse_args(args=None):
     parser.add_argument('--cpu', action='store_true', help='Ignore CUDA.')
 
     parser.add_argument('--augment_nopunct', type=float, default=None, help='Augment the training data by copying this fraction of punct-ending sentences as non-punct.  Default of None will aim for roughly 10%')
-    parser.add_argument('--morph_dict', default=None, help="Path to the morphological dictionary.")
+    parser.add_argument('--morph_dict', default=None, help="Morphological dictionary for the post-filter: a sqlite file built by stanza.models.pos.build_morph_dict, or the name of a MySQL table.")
+    parser.add_argument('--morph_topk', type=int, default=UPOS_CANDIDATES, help="Number of most likely UPOS tags, and the UFeats conditioned on them, which the post-filter chooses from.  Higher is slower but may correct more tags.")
+    parser.add_argument('--morph_cache_size', type=int, default=DEFAULT_CACHE_SIZE, help="Number of word forms whose dictionary and hunspell analyses are kept in memory by the post-filter.")
+    parser.add_argument('--morph_hunspell_dir', default=None, help="Directory of the hunspell dictionary used by the post-filter for Lithuanian.  Defaults to data_files/hunspell in this repository.")
+    parser.add_argument('--morph_hunspell_name', default=None, help="Name of the hunspell .dic and .aff files.  Defaults to lt-LT_morphology.")
+    parser.add_argument('--morph_hunspell_table', default=None, help="Precompiled hunspell analyses for Lithuanian, built by stanza.models.pos.build_hunspell_table, used instead of hunspell itself.")
+    parser.add_argument('--morph_workers', type=int, default=1, help="Number of workers running the post-filter while the next batches are tagged.  0 filters each batch right after tagging it.  Threads only help while waiting on the dictionary.")
+    parser.add_argument('--morph_processes', action='store_true', help="Run the post-filter workers in separate processes instead of threads.")
+    parser.add_argument('--morph_cache_warmup', default=None, help="Frequency list, one word per line, whose analyses are loaded before tagging, eg frequent_lemma_study/lt/freqs_found.txt")
 
     args = parser.parse_args(args=args)
     return args
@@ -257,15 +268,14 @@ def evaluate(args):
     pretrain = load_pretrain(args)
 
     # load model
-    train_doc = Document(CoNLL.conll2dict(input_file=args['eval_file']))
     logger.info("Loading model from: {}".format(model_file))
     use_cuda = args['cuda'] and not args['cpu']
-    trainer = Trainer(doc=train_doc, pretrain=pretrain, model_file=model_file, use_cuda=use_cuda)
+    trainer = Trainer(pretrain=pretrain, model_file=model_file, use_cuda=use_cuda)
     loaded_args, vocab = trainer.args, trainer.vocab
 
     # load config
     for k in args:
-        if k.endswith('_dir') or k.endswith('_file') or k in ['shorthand'] or k == 'mode':
+        if k.endswith('_dir') or k.endswith('_file') or k.startswith('morph_') or k in ['shorthand'] or k == 'mode':
             loaded_args[k] = args[k]
 
     # load data
@@ -276,18 +286,25 @@ def evaluate(args):
         logger.info("Start evaluation...")
         preds = []
         if args['morph_dict']:
-            print('Collecting morph dictionary...')
-            morph_dict = MorphDictionary(args['morph_dict'])
-            print('Completed.')
+            if args['morph_processes']:
+                # every worker process opens the dictionary itself
+                post_filter = PostFilter(vocab, loaded_args)
+            else:
+                print('Collecting morph dictionary...')
+                morph_dict = load_cached_morph_dict(args['morph_dict'], args['morph_cache_size'], args['morph_cache_warmup'])
+                print('Completed.')
+                post_filter = PostFilter(vocab, loaded_args, morph_dict)
+            # the post-filter works on a batch while the next one is tagged
+            with PostFilterPool(post_filter, args['morph_workers'], args['morph_processes']) as pool:
+                for filtered in pool.map(trainer.predict(b, candidates=True, num_candidates=args['morph_topk']) for b in batch):
+                    preds += filtered
+            if post_filter.morph_dict is not None:
+                logger.info("Dictionary cache: {}".format(post_filter.morph_dict.stats()))
+                if post_filter.hunspell is not None:
+                    logger.info("Hunspell cache: {}".format(post_filter.hunspell.stats()))
         else:
-            morph_dict = None
-        start = 0
-        end = 0
-        for i, b in enumerate(batch):
-            end += len(b[8])  # b[8] is orig_idx
-            # data_orig_idx=batch.data_orig_idx,
-            preds += trainer.predict(b, morph_dict=morph_dict, start=start, end=end)
-            start += len(b[8])
+            for i, b in enumerate(batch):
+                preds += trainer.predict(b)
     else:
         # skip eval if dev data does not exist
         preds = []
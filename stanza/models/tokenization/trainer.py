@@ -57,14 +57,15 @@ class Trainer(BaseTrainer):
 
     def predict(self, inputs):
         self.model.eval()
-        units, labels, features, _ = inputs
+        # the labels are only needed for the loss
+        units, _, features, _ = inputs
 
         if self.use_cuda:
             units = units.cuda()
-            labels = labels.cuda()
             features = features.cuda()
 
-        pred = self.model(units, features)
+        with torch.no_grad():
+            pred = self.model(units, features)
 
         return pred.data.cpu().numpy()
 
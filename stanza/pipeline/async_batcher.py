@@ -0,0 +1,108 @@
+"""
+An asyncio front end to a Pipeline, for serving it behind an async web server.
+
+Requests which arrive close together are collected into one batch and annotated with a single call to
+Pipeline.process in a worker thread, so that the event loop is never blocked by the models and the
+processors see larger batches.  While a batch is being annotated, the requests arriving in the meantime
+queue up for the next one, so the batches grow with the load.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import logging
+
+from stanza.models.common.doc import Document
+
+logger = logging.getLogger('stanza')
+
+DEFAULT_MAX_BATCH_SIZE = 32
+# how long the first request of a batch waits for others to join it, in seconds
+DEFAULT_MAX_WAIT = 0.005
+
+class _Request():
+    def __init__(self, doc, future):
+        self.doc = doc
+        self.future = future
+
+
+class AsyncBatcher():
+    """
+    Annotates the documents given to process() in batches of at most max_batch_size documents.
+
+    A batch is started once it is full, or max_wait seconds after its first request.  The batches are
+    run one at a time with Pipeline.process in executor, by default a thread of the batcher's own.
+    """
+
+    def __init__(self, pipeline, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait=DEFAULT_MAX_WAIT, executor=None):
+        if max_batch_size < 1:
+            raise ValueError("An AsyncBatcher needs batches of at least one document, got {}".format(max_batch_size))
+        self.pipeline = pipeline
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.own_executor = executor is None
+        self.executor = ThreadPoolExecutor(1) if executor is None else executor
+        self.pending = []
+        self.batch_full = None
+        self.serving = None
+        self.batch_sizes = []
+
+    async def process(self, doc, timeout=None):
+        """
+        Annotate a text or a Document, waiting for the result without blocking the event loop.
+
+        :param timeout: the number of seconds after which to give up with an asyncio.TimeoutError
+        Cancelling the caller, or running out of time, drops the request from its batch if the batch has not
+        started yet.  A batch which is already running is finished, and the result of the request is discarded.
+        """
+        loop = asyncio.get_running_loop()
+        if not isinstance(doc, Document):
+            doc = Document([], text=doc)
+        request = _Request(doc, loop.create_future())
+        self.pending.append(request)
+        if self.serving is None:
+            self.batch_full = asyncio.Event()
+            self.serving = asyncio.ensure_future(self.serve())
+        if len(self.pending) >= self.max_batch_size:
+            self.batch_full.set()
+        if timeout is None:
+            return await request.future
+        return await asyncio.wait_for(request.future, timeout)
+
+    def next_batch(self):
+        # the requests which were cancelled or timed out while waiting are dropped
+        self.pending = [request for request in self.pending if not request.future.done()]
+        batch = self.pending[:self.max_batch_size]
+        self.pending = self.pending[self.max_batch_size:]
+        if len(self.pending) < self.max_batch_size:
+            self.batch_full.clear()
+        return batch
+
+    async def serve(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while self.pending:
+                if not self.batch_full.is_set():
+                    try:
+                        await asyncio.wait_for(self.batch_full.wait(), self.max_wait)
+                    except asyncio.TimeoutError:
+                        pass
+                batch = self.next_batch()
+                if not batch:
+                    continue
+                self.batch_sizes.append(len(batch))
+                try:
+                    docs = await loop.run_in_executor(self.executor, self.pipeline.process, [request.doc for request in batch])
+                except Exception as e:
+                    for request in batch:
+                        if not request.future.done():
+                            request.future.set_exception(e)
+                else:
+                    for request, doc in zip(batch, docs):
+                        if not request.future.done():
+                            request.future.set_result(doc)
+        finally:
+            self.serving = None
+
+    def close(self):
+        if self.own_executor:
+            self.executor.shutdown()
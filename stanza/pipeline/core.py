@@ -5,14 +5,18 @@ Pipeline that runs tokenize,mwt,pos,lemma,depparse
 import io
 import itertools
 import sys
+import threading
+import time
 import torch
 import logging
 import json
 import os
 
+from concurrent.futures import ThreadPoolExecutor
 from distutils.util import strtobool
 from stanza.pipeline._constants import *
 from stanza.models.common.doc import Document
+from stanza.models.common.feature_cache import clear_features
 from stanza.pipeline.processor import Processor, ProcessorRequirementsException
 from stanza.pipeline.registry import NAME_TO_PROCESSOR_CLASS, PIPELINE_NAMES
 from stanza.pipeline.tokenize_processor import TokenizeProcessor
@@ -21,13 +25,95 @@ from stanza.pipeline.pos_processor import POSProcessor
 from stanza.pipeline.lemma_processor import LemmaProcessor
 from stanza.pipeline.depparse_processor import DepparseProcessor
 from stanza.pipeline.sentiment_processor import SentimentProcessor
+from stanza.pipeline.async_batcher import AsyncBatcher
+from stanza.pipeline.stages import run_stages, DEFAULT_QUEUE_SIZE
+from stanza.pipeline.worker_pool import PipelineWorkerPool
 from stanza.pipeline.ner_processor import NERProcessor
 from stanza.resources.common import DEFAULT_MODEL_DIR, \
     maintain_processor_list, add_dependencies, build_default_config, set_logging_level, process_pipeline_parameters, sort_processors
+from stanza.utils.conll import CoNLL
 from stanza.utils.helper_func import make_table
 
 logger = logging.getLogger('stanza')
 
+DEFAULT_STREAM_CHUNK_SIZE = 100000
+# the number of processors whose models are loaded at the same time.  Loading them in parallel is an opt-in
+DEFAULT_LOAD_THREADS = 1
+
+# the resources.json files read so far, by path, with the time they were modified
+_resources_cache = dict()
+_resources_lock = threading.Lock()
+
+def load_resources_file(resources_filepath):
+    """
+    Read a resources.json file, or reuse what was read from it before if it has not changed since.
+    The result is shared between pipelines and should not be modified.
+    """
+    if not os.path.exists(resources_filepath):
+        raise ResourcesFileNotFoundError(resources_filepath)
+    stat = os.stat(resources_filepath)
+    with _resources_lock:
+        cached = _resources_cache.get(resources_filepath)
+        if cached is not None and cached[0] == (stat.st_mtime_ns, stat.st_size):
+            return cached[1]
+        with open(resources_filepath) as infile:
+            resources = json.load(infile)
+        _resources_cache[resources_filepath] = ((stat.st_mtime_ns, stat.st_size), resources)
+        return resources
+
+def iterate_paragraphs(texts):
+    """
+    Yield the paragraphs of a file handle or another iterable of strings.
+    Paragraphs are separated by blank lines.  A string which does not end with a newline
+    also ends the paragraph, so both lines read from a file and whole texts can be passed.
+    """
+    lines = []
+    for text in texts:
+        for line in text.splitlines(keepends=True):
+            if line.strip():
+                lines.append(line)
+            elif lines:
+                yield ''.join(lines).rstrip()
+                lines = []
+        if lines and not text.endswith('\n'):
+            yield ''.join(lines).rstrip()
+            lines = []
+    if lines:
+        yield ''.join(lines).rstrip()
+
+def chunk_paragraphs(paragraphs, chunk_size):
+    """
+    Group paragraphs into texts of about chunk_size characters, separated by blank lines.
+    A paragraph longer than chunk_size is cut between its lines, or kept whole if it is a single line.
+    """
+    chunk = []
+    length = 0
+    for paragraph in paragraphs:
+        if len(paragraph) > chunk_size:
+            if chunk:
+                yield '\n\n'.join(chunk)
+                chunk = []
+                length = 0
+            pieces = []
+            piece_length = 0
+            for line in paragraph.split('\n'):
+                if pieces and piece_length + len(line) > chunk_size:
+                    yield '\n'.join(pieces)
+                    pieces = []
+                    piece_length = 0
+                pieces.append(line)
+                piece_length += len(line) + 1
+            # the end of the paragraph can go with the following ones
+            paragraph = '\n'.join(pieces)
+        if chunk and length + len(paragraph) > chunk_size:
+            yield '\n\n'.join(chunk)
+            chunk = []
+            length = 0
+        chunk.append(paragraph)
+        length += len(paragraph) + 2
+    if chunk:
+        yield '\n\n'.join(chunk)
+
 class ResourcesFileNotFoundError(FileNotFoundError):
     def __init__(self, resources_filepath):
         super().__init__(f"Resources file not found at: {resources_filepath}  Try to download the model again.")
@@ -71,8 +157,19 @@ class PipelineRequirementsException(Exception):
 
 class Pipeline:
 
-    def __init__(self, lang='en', dir=DEFAULT_MODEL_DIR, package='default', processors={}, logging_level=None, verbose=None, use_gpu=True, **kwargs):
+    def __init__(self, lang='en', dir=DEFAULT_MODEL_DIR, package='default', processors={}, logging_level=None, verbose=None, use_gpu=True,
+                 lazy=False, load_threads=DEFAULT_LOAD_THREADS, **kwargs):
+        """
+        With lazy, the model of a processor is only loaded when the pipeline first uses it,
+        see process.  Otherwise the models are all loaded here, load_threads at a time.
+        The time spent setting up each component is kept in load_times.
+        """
         self.lang, self.dir, self.kwargs = lang, dir, kwargs
+        self.lazy = lazy
+        self.load_threads = load_threads
+        self.load_times = dict()
+        self._load_lock = threading.Lock()
+        start = time.time()
 
         # set global logging level
         set_logging_level(logging_level, verbose)
@@ -82,10 +179,7 @@ class Pipeline:
         # Load resources.json to obtain latest packages.
         logger.debug('Loading resource file...')
         resources_filepath = os.path.join(dir, 'resources.json')
-        if not os.path.exists(resources_filepath):
-            raise ResourcesFileNotFoundError(resources_filepath)
-        with open(resources_filepath) as infile:
-            resources = json.load(infile)
+        resources = load_resources_file(resources_filepath)
         if lang in resources:
             if 'alias' in resources[lang]:
                 logger.info(f'"{lang}" is an alias for "{resources[lang]["alias"]}"')
@@ -105,24 +199,31 @@ class Pipeline:
 
         self.config = build_default_config(resources, lang, dir, self.load_list)
         self.config.update(kwargs)
+        self._resources, self._resolved_lang = resources, lang
+        self.load_times['resources'] = time.time() - start
 
         # Load processors
         self.processors = {}
+        # the AsyncBatcher of aprocess, created on first use
+        self.batcher = None
 
         # configs that are the same for all processors
-        pipeline_level_configs = {'lang': lang, 'mode': 'predict'}
+        # the processors check their requirements when they are built, and load their models in load_processors
+        pipeline_level_configs = {'lang': lang, 'mode': 'predict', 'defer_loading': True}
         self.use_gpu = torch.cuda.is_available() and use_gpu
         logger.info("Use device: {}".format("gpu" if self.use_gpu else "cpu"))
 
         # set up processors
         pipeline_reqs_exceptions = []
+        self._unloaded = []
         for item in self.load_list:
             processor_name, _, _ = item
-            logger.info('Loading: ' + processor_name)
+            logger.info('Building: ' + processor_name)
             curr_processor_config = self.filter_config(processor_name, self.config)
             curr_processor_config.update(pipeline_level_configs)
             logger.debug('With settings: ')
             logger.debug(curr_processor_config)
+            start = time.time()
             try:
                 # try to build processor, throw an exception if there is a requirements issue
                 self.processors[processor_name] = NAME_TO_PROCESSOR_CLASS[processor_name](config=curr_processor_config,
@@ -135,36 +236,80 @@ class Pipeline:
                 # entire proposed pipeline, but at this point the pipeline will not be built successfully
                 self.processors[processor_name] = e.err_processor
             except FileNotFoundError as e:
-                # For a FileNotFoundError, we try to guess if there's
-                # a missing model directory or file.  If so, we
-                # suggest the user try to download the models
-                if 'model_path' in curr_processor_config:
-                    model_path = curr_processor_config['model_path']
-                    model_dir, model_name = os.path.split(model_path)
-                    lang_dir = os.path.dirname(model_dir)
-                    if not os.path.exists(lang_dir):
-                        # model files for this language can't be found in the expected directory
-                        raise LanguageNotDownloadedError(lang, lang_dir, model_path) from e
-                    if processor_name not in resources[lang]:
-                        # user asked for a model which doesn't exist for this language?
-                        raise UnsupportedProcessorError(processor_name, lang)
-                    if not os.path.exists(model_path):
-                        model_name, _ = os.path.splitext(model_name)
-                        # TODO: before recommending this, check that such a thing exists in resources.json.
-                        # currently that case is handled by ignoring the model, anyway
-                        raise FileNotFoundError('Could not find model file %s, although there are other models downloaded for language %s.  Perhaps you need to download a specific model.  Try: stanza.download(lang="%s",package=None,processors={"%s":"%s"})' % (model_path, lang, lang, processor_name, model_name)) from e
-
-                # if we couldn't find a more suitable description of the
-                # FileNotFoundError, just raise the old error
-                raise
+                self.raise_missing_model(processor_name, e)
+            self.load_times[processor_name] = time.time() - start
+            self._unloaded.append(processor_name)
 
         # if there are any processor exceptions, throw an exception to indicate pipeline build failure
         if pipeline_reqs_exceptions:
             logger.info('\n')
             raise PipelineRequirementsException(pipeline_reqs_exceptions)
 
+        if lazy:
+            logger.info("Done building processors, their models will be loaded when they are first used")
+            return
+        self.load_processors()
+        logger.info("Startup times:\n{}".format(self.load_report()))
         logger.info("Done loading processors!")
 
+    def raise_missing_model(self, processor_name, e):
+        """
+        For a FileNotFoundError, we try to guess if there's
+        a missing model directory or file.  If so, we
+        suggest the user try to download the models
+        """
+        resources, lang = self._resources, self._resolved_lang
+        curr_processor_config = self.filter_config(processor_name, self.config)
+        if 'model_path' in curr_processor_config:
+            model_path = curr_processor_config['model_path']
+            model_dir, model_name = os.path.split(model_path)
+            lang_dir = os.path.dirname(model_dir)
+            if not os.path.exists(lang_dir):
+                # model files for this language can't be found in the expected directory
+                raise LanguageNotDownloadedError(lang, lang_dir, model_path) from e
+            if processor_name not in resources[lang]:
+                # user asked for a model which doesn't exist for this language?
+                raise UnsupportedProcessorError(processor_name, lang)
+            if not os.path.exists(model_path):
+                model_name, _ = os.path.splitext(model_name)
+                # TODO: before recommending this, check that such a thing exists in resources.json.
+                # currently that case is handled by ignoring the model, anyway
+                raise FileNotFoundError('Could not find model file %s, although there are other models downloaded for language %s.  Perhaps you need to download a specific model.  Try: stanza.download(lang="%s",package=None,processors={"%s":"%s"})' % (model_path, lang, lang, processor_name, model_name)) from e
+
+        # if we couldn't find a more suitable description of the
+        # FileNotFoundError, just raise the old error
+        raise e
+
+    def load_processor(self, processor_name):
+        start = time.time()
+        try:
+            self.processors[processor_name].load()
+        except FileNotFoundError as e:
+            self.raise_missing_model(processor_name, e)
+        self.load_times[processor_name] += time.time() - start
+
+    def load_processors(self, processors=None):
+        """
+        Load the models of the given processors, or of all the processors, which are not loaded yet.
+        Up to load_threads models are loaded at the same time.
+        """
+        with self._load_lock:
+            to_load = [name for name in self._unloaded if processors is None or name in processors]
+            if not to_load:
+                return
+            logger.info('Loading: ' + ','.join(to_load))
+            if self.load_threads > 1 and len(to_load) > 1:
+                with ThreadPoolExecutor(min(self.load_threads, len(to_load))) as executor:
+                    list(executor.map(self.load_processor, to_load))
+            else:
+                for name in to_load:
+                    self.load_processor(name)
+            self._unloaded = [name for name in self._unloaded if name not in to_load]
+
+    def load_report(self):
+        """ A table of the seconds spent reading resources.json and building and loading each processor """
+        return make_table(['Component', 'Seconds'], [[name, '{:.2f}'.format(seconds)] for name, seconds in self.load_times.items()])
+
     def update_kwargs(self, kwargs, processor_list):
         processor_dict = {processor: {'package': package, 'dependencies': dependencies} for (processor, package, dependencies) in processor_list}
         for key, value in kwargs.items():
@@ -193,20 +338,115 @@ class Pipeline:
         """
         return [self.processors[processor_name] for processor_name in PIPELINE_NAMES if self.processors.get(processor_name)]
 
-    def process(self, doc):
-        # run the pipeline
+    def process(self, doc, processors=None):
+        """
+        Run the processors of the pipeline on a text, a Document or a list of Documents.
+
+        :param processors: the names of the processors to run, as a list or a comma separated string.
+                           By default all of them are run.  In a lazy pipeline, only the models of
+                           the processors which are run are loaded
+        """
+        if isinstance(processors, str):
+            processors = processors.split(',')
+        processor_names = [processor_name for processor_name in PIPELINE_NAMES if self.processors.get(processor_name)
+                           and (processors is None or processor_name in processors)]
+        self.load_processors(processor_names)
 
         # determine whether we are in bulk processing mode for multiple documents
         bulk=(isinstance(doc, list) and len(doc) > 0 and isinstance(doc[0], Document))
-        for processor_name in PIPELINE_NAMES:
-            if self.processors.get(processor_name):
-                process = self.processors[processor_name].bulk_process if bulk else self.processors[processor_name].process
-                doc = process(doc)
+        for processor_name in processor_names:
+            process = self.processors[processor_name].bulk_process if bulk else self.processors[processor_name].process
+            doc = process(doc)
+        # the features shared by the processors are not needed anymore
+        for processed in (doc if bulk else [doc]):
+            if isinstance(processed, Document):
+                clear_features(processed)
         return doc
 
-    def __call__(self, doc):
+    def stream(self, texts, chunk_size=DEFAULT_STREAM_CHUNK_SIZE, output='document', pipelined=False,
+               queue_size=DEFAULT_QUEUE_SIZE):
+        """
+        Process a large input piece by piece, yielding the results as they are ready.
+
+        The input is cut into chunks of whole paragraphs of about chunk_size characters,
+        and each chunk is run through every processor before the next one is read,
+        so the memory used depends on chunk_size rather than on the size of the input.
+
+        With pipelined, every processor runs in its own thread and works on a chunk while the
+        processors after it work on the chunks before, with at most queue_size chunks waiting
+        between two processors.  The first results are then ready sooner, and the processors
+        keep more of the cores busy.
+
+        :param texts: a file handle, or any other iterable of strings.  Paragraphs are separated by
+                      blank lines, and each string ends a paragraph unless it ends with a newline,
+                      so that lines read from a file are joined back together
+        :param chunk_size: the number of characters to collect before running the processors.
+                           Paragraphs are not split unless a single one is longer than this,
+                           in which case it is cut between lines
+        :param output: 'document' to yield Documents, 'conllu' to yield their CoNLL-U text
+        :param pipelined: whether to run the processors concurrently on successive chunks
+        :param queue_size: the number of chunks which may wait for each processor when pipelined
+        """
+        if output not in ('document', 'conllu'):
+            raise ValueError("Unknown stream output {}, expected 'document' or 'conllu'".format(output))
+        chunks = chunk_paragraphs(iterate_paragraphs(texts), chunk_size)
+        if pipelined:
+            self.load_processors()
+            docs = run_stages([processor.process for processor in self.loaded_processors], chunks, queue_size)
+        else:
+            docs = (self.process(chunk) for chunk in chunks)
+        for doc in docs:
+            if pipelined:
+                clear_features(doc)
+            if output == 'conllu':
+                doc = CoNLL.conll_as_string(CoNLL.convert_dict(doc.to_dict()))
+            yield doc
+
+    def worker_pool(self, num_workers, docs_per_task=1, max_pending=None, torch_threads=1):
+        """
+        A PipelineWorkerPool running this pipeline in num_workers forked processes, eg
+
+            with nlp.worker_pool(4) as pool:
+                for doc in pool.map(texts):
+                    ...
+        """
+        # the models are loaded before the workers are forked, so that they share them
+        self.load_processors()
+        return PipelineWorkerPool(self, num_workers, docs_per_task=docs_per_task, max_pending=max_pending,
+                                  torch_threads=torch_threads)
+
+    async def aprocess(self, doc, timeout=None):
+        """
+        Annotate a text or a Document from a coroutine, without blocking the event loop.
+
+        Concurrent calls are annotated together in batches by self.batcher, an AsyncBatcher which is
+        created on first use and may be replaced to change the size of its batches or its executor.
+        """
+        if self.batcher is None:
+            self.batcher = AsyncBatcher(self)
+        return await self.batcher.process(doc, timeout=timeout)
+
+    def close(self):
+        """
+        Stop the workers started by the processors, eg the post-filter of the tagger or the decoder of the parser,
+        and the thread of the batcher of aprocess.
+        The pipeline can also be used as a context manager, which closes it at the end.
+        """
+        for processor in self.loaded_processors:
+            processor.close()
+        if self.batcher is not None:
+            self.batcher.close()
+            self.batcher = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __call__(self, doc, processors=None):
         assert any([isinstance(doc, str), isinstance(doc, list),
                     isinstance(doc, Document)]), 'input should be either str, list or Document'
-        doc = self.process(doc)
+        doc = self.process(doc, processors=processors)
         return doc
 
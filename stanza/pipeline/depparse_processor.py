@@ -3,12 +3,12 @@ Processor for performing dependency parsing
 """
 
 from stanza.models.common import doc
-from stanza.models.common.pretrain import Pretrain
 from stanza.models.common.utils import unsort
 from stanza.models.depparse.data import DataLoader
-from stanza.models.depparse.trainer import Trainer
+from stanza.models.depparse.trainer import DecoderPool, Trainer
 from stanza.pipeline._constants import *
 from stanza.pipeline.processor import UDProcessor, register_processor
+from stanza.pipeline.shared_models import get_shared, model_key, shared_pretrain
 
 DEFAULT_SEPARATE_BATCH=150
 
@@ -32,8 +32,11 @@ class DepparseProcessor(UDProcessor):
             self._requires = self.__class__.REQUIRES_DEFAULT
 
     def _set_up_model(self, config, use_gpu):
-        self._pretrain = Pretrain(config['pretrain_path']) if 'pretrain_path' in config else None
-        self._trainer = Trainer(pretrain=self.pretrain, model_file=config['model_path'], use_cuda=use_gpu)
+        self._pretrain = shared_pretrain(config['pretrain_path']) if 'pretrain_path' in config else None
+        self._trainer = get_shared(model_key(DEPPARSE, use_gpu, config['model_path'], config.get('pretrain_path')),
+                                   lambda: Trainer(pretrain=self.pretrain, model_file=config['model_path'], use_cuda=use_gpu))
+        # the trees of a batch are decoded while the next batch is parsed
+        self._decoder_pool = DecoderPool(self._trainer, config.get('decode_workers', 1))
 
     def process(self, document):
         try:
@@ -41,8 +44,8 @@ class DepparseProcessor(UDProcessor):
                                sort_during_eval=self.config.get('sort_during_eval', True),
                                min_length_to_batch_separately=self.config.get('min_length_to_batch_separately', DEFAULT_SEPARATE_BATCH))
             preds = []
-            for i, b in enumerate(batch):
-                preds += self.trainer.predict(b)
+            for batch_preds in self.decoder_pool.map(batch):
+                preds += batch_preds
             if batch.data_orig_idx is not None:
                 preds = unsort(preds, batch.data_orig_idx)
             batch.doc.set([doc.HEAD, doc.DEPREL], [y for x in preds for y in x])
@@ -56,3 +59,16 @@ class DepparseProcessor(UDProcessor):
                 raise RuntimeError(new_message) from e
             else:
                 raise
+
+    def after_fork(self):
+        if self.decoder_pool is not None:
+            # the threads of the parent are not usable after a fork
+            self._decoder_pool = DecoderPool(self.trainer, 0)
+
+    def close(self):
+        if self.decoder_pool is not None:
+            self.decoder_pool.close()
+
+    @property
+    def decoder_pool(self):
+        return getattr(self, '_decoder_pool', None)
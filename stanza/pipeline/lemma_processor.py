@@ -7,6 +7,7 @@ from stanza.models.lemma.data import DataLoader
 from stanza.models.lemma.trainer import Trainer
 from stanza.pipeline._constants import *
 from stanza.pipeline.processor import UDProcessor, register_processor
+from stanza.pipeline.shared_models import get_shared, model_key
 
 @register_processor(name=LEMMA)
 class LemmaProcessor(UDProcessor):
@@ -35,7 +36,8 @@ class LemmaProcessor(UDProcessor):
             self.config['batch_size'] = LemmaProcessor.DEFAULT_BATCH_SIZE
         else:
             self._use_identity = False
-            self._trainer = Trainer(model_file=config['model_path'], use_cuda=use_gpu)
+            self._trainer = get_shared(model_key(LEMMA, use_gpu, config['model_path']),
+                                       lambda: Trainer(model_file=config['model_path'], use_cuda=use_gpu))
 
     def _set_up_requires(self):
         if self.config.get('pos') and not self.use_identity:
@@ -44,9 +46,10 @@ class LemmaProcessor(UDProcessor):
             self._requires = LemmaProcessor.REQUIRES_DEFAULT
 
     def process(self, document):
-        if not self.use_identity:
+        if not self.use_identity and not self.config.get('dict_only', False) and not self.config.get('ensemble_dict', False):
             batch = DataLoader(document, self.config['batch_size'], self.config, vocab=self.vocab, evaluation=True)
         else:
+            # only the words of the document are needed here; the seq2seq model gets its own data loader
             batch = DataLoader(document, self.config['batch_size'], self.config, evaluation=True, conll_only=True)
         if self.use_identity:
             preds = [word.text for sent in batch.doc.sentences for word in sent.words]
@@ -7,7 +7,8 @@ import io
 from stanza.models.mwt.data import DataLoader
 from stanza.models.mwt.trainer import Trainer
 from stanza.pipeline._constants import *
-from stanza.pipeline.processor import UDProcessor, register_processor
+from stanza.pipeline.processor import UDProcessor, register_processor, combine_documents
+from stanza.pipeline.shared_models import get_shared, model_key
 
 @register_processor(MWT)
 class MWTProcessor(UDProcessor):
@@ -18,9 +19,11 @@ class MWTProcessor(UDProcessor):
     REQUIRES_DEFAULT = set([TOKENIZE])
 
     def _set_up_model(self, config, use_gpu):
-        self._trainer = Trainer(model_file=config['model_path'], use_cuda=use_gpu)
+        self._trainer = get_shared(model_key(MWT, use_gpu, config['model_path']),
+                                   lambda: Trainer(model_file=config['model_path'], use_cuda=use_gpu))
 
-    def process(self, document):
+    def predict(self, document):
+        """ The expansions of the multi-word tokens of the document, in order """
         batch = DataLoader(document, self.config['batch_size'], self.config, vocab=self.vocab, evaluation=True)
         if len(batch) > 0:
             dict_preds = self.trainer.predict_dict(batch.doc.get_mwt_expansions(evaluation=True))
@@ -37,6 +40,18 @@ class MWTProcessor(UDProcessor):
         else:
             # skip eval if dev data does not exist
             preds = []
+        return preds
 
-        batch.doc.set_mwt_expansions(preds)
-        return batch.doc
+    def process(self, document):
+        document.set_mwt_expansions(self.predict(document))
+        return document
+
+    def bulk_process(self, docs):
+        """ The tokens of all the documents are expanded together, and the expansions are then split between them """
+        preds = self.predict(combine_documents(docs))
+        start = 0
+        for document in docs:
+            end = start + len(document.get_mwt_expansions(evaluation=True))
+            document.set_mwt_expansions(preds[start:end])
+            start = end
+        return docs
@@ -8,7 +8,8 @@ from stanza.models.common.utils import unsort
 from stanza.models.ner.data import DataLoader
 from stanza.models.ner.trainer import Trainer
 from stanza.pipeline._constants import *
-from stanza.pipeline.processor import UDProcessor, register_processor
+from stanza.pipeline.processor import UDProcessor, combine_documents, register_processor
+from stanza.pipeline.shared_models import get_shared, model_key
 
 logger = logging.getLogger('stanza')
 
@@ -24,9 +25,11 @@ class NERProcessor(UDProcessor):
         # set up trainer
         args = {'charlm_forward_file': config.get('forward_charlm_path', None),
                 'charlm_backward_file': config.get('backward_charlm_path', None)}
-        self._trainer = Trainer(args=args, model_file=config['model_path'], use_cuda=use_gpu)
+        self._trainer = get_shared(model_key(NER, use_gpu, config['model_path'], args['charlm_forward_file'], args['charlm_backward_file']),
+                                   lambda: Trainer(args=args, model_file=config['model_path'], use_cuda=use_gpu))
 
-    def process(self, document):
+    def _tag(self, document):
+        """ Set the NER tags of the tokens of a document, without collecting its entities """
         # set up a eval-only data loader and skip tag preprocessing
         batch = DataLoader(
             document, self.config['batch_size'], self.config, vocab=self.vocab, evaluation=True, preprocess_tags=False)
@@ -34,7 +37,20 @@ class NERProcessor(UDProcessor):
         for i, b in enumerate(batch):
             preds += self.trainer.predict(b)
         batch.doc.set([doc.NER], [y for x in preds for y in x], to_token=True)
+        return batch.doc
+
+    def process(self, document):
+        document = self._tag(document)
         # collect entities into document attribute
-        total = len(batch.doc.build_ents())
+        total = len(document.build_ents())
         logger.debug(f'{total} entities found in document.')
-        return batch.doc
+        return document
+
+    def bulk_process(self, docs):
+        if hasattr(self, '_variant'):
+            return super().bulk_process(docs)
+        # the documents are tagged together, but the entities are collected for each of them
+        self._tag(combine_documents(docs))
+        total = sum(len(document.build_ents()) for document in docs)
+        logger.debug(f'{total} entities found in {len(docs)} documents.')
+        return docs
@@ -2,13 +2,18 @@
 Processor for performing part-of-speech tagging
 """
 
+import pickle
+
 from stanza.models.common import doc
-from stanza.models.common.pretrain import Pretrain
 from stanza.models.common.utils import unsort
+from stanza.models.pos.cache import load_cached_morph_dict, DEFAULT_CACHE_SIZE
 from stanza.models.pos.data import DataLoader
+from stanza.models.pos.model import UPOS_CANDIDATES
+from stanza.models.pos.postfilter import PostFilter, PostFilterPool
 from stanza.models.pos.trainer import Trainer
 from stanza.pipeline._constants import *
 from stanza.pipeline.processor import UDProcessor, register_processor
+from stanza.pipeline.shared_models import get_shared, model_key, shared_pretrain
 
 @register_processor(name=POS)
 class POSProcessor(UDProcessor):
@@ -20,17 +25,56 @@ class POSProcessor(UDProcessor):
 
     def _set_up_model(self, config, use_gpu):
         # get pretrained word vectors
-        self._pretrain = Pretrain(config['pretrain_path']) if 'pretrain_path' in config else None
-        # set up trainer
-        self._trainer = Trainer(pretrain=self.pretrain, model_file=config['model_path'], use_cuda=use_gpu)
+        self._pretrain = shared_pretrain(config['pretrain_path']) if 'pretrain_path' in config else None
+        # set up trainer, which may be shared with other pipelines
+        self._trainer = get_shared(model_key(POS, use_gpu, config['model_path'], config.get('pretrain_path')),
+                                   lambda: Trainer(pretrain=self.pretrain, model_file=config['model_path'], use_cuda=use_gpu))
+        # set up the morphological post-filter once, so that its dictionary and workers are shared by all documents
+        self._post_filter_pool = None
+        if config.get('morph_dict'):
+            # the post-filter settings are added to a copy of the args of the model, which may be shared
+            morph_args = dict(self._trainer.args)
+            morph_args.update({k: v for k, v in config.items() if k.startswith('morph_')})
+            if config.get('morph_processes', False):
+                # every worker process opens the dictionary itself
+                post_filter = PostFilter(self._trainer.vocab, morph_args)
+            else:
+                morph_dict = load_cached_morph_dict(config['morph_dict'],
+                                                    config.get('morph_cache_size', DEFAULT_CACHE_SIZE),
+                                                    config.get('morph_cache_warmup'))
+                post_filter = PostFilter(self._trainer.vocab, morph_args, morph_dict)
+            self._post_filter_pool = PostFilterPool(post_filter, config.get('morph_workers', 1),
+                                                    config.get('morph_processes', False))
 
     def process(self, document):
         batch = DataLoader(
             document, self.config['batch_size'], self.config, self.pretrain, vocab=self.vocab, evaluation=True,
             sort_during_eval=True)
         preds = []
-        for i, b in enumerate(batch):
-            preds += self.trainer.predict(b)
+        if self.post_filter_pool is not None:
+            # the post-filter works on a batch while the next one is tagged
+            num_candidates = self.post_filter_pool.post_filter.args.get('morph_topk', UPOS_CANDIDATES)
+            for filtered in self.post_filter_pool.map(self.trainer.predict(b, candidates=True, num_candidates=num_candidates)
+                                                      for b in batch):
+                preds += filtered
+        else:
+            for i, b in enumerate(batch):
+                preds += self.trainer.predict(b)
         preds = unsort(preds, batch.data_orig_idx)
         batch.doc.set([doc.UPOS, doc.XPOS, doc.FEATS], [y for x in preds for y in x])
         return batch.doc
+
+    def after_fork(self):
+        if self.post_filter_pool is not None:
+            # the dictionary connections and the threads of the parent are not usable after a fork:
+            # the copy of the filter reopens its dictionaries, and filters in the worker itself
+            post_filter = pickle.loads(pickle.dumps(self.post_filter_pool.post_filter))
+            self._post_filter_pool = PostFilterPool(post_filter, 0)
+
+    def close(self):
+        if self.post_filter_pool is not None:
+            self.post_filter_pool.close()
+
+    @property
+    def post_filter_pool(self):
+        return getattr(self, '_post_filter_pool', None)
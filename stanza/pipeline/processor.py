@@ -3,7 +3,9 @@ Base classes for processors
 """
 
 from abc import ABC, abstractmethod
+import threading
 
+from stanza.models.common.doc import Document
 from stanza.pipeline.registry import NAME_TO_PROCESSOR_CLASS, PIPELINE_NAMES, PROCESSOR_VARIANTS
 
 class ProcessorRequirementsException(Exception):
@@ -78,6 +80,18 @@ class Processor(ABC):
 
         return [self.process(doc) for doc in docs]
 
+    def load(self):
+        """ Load the models of the processor, if it was built with defer_loading.  Called by the pipeline before the processor is used. """
+        pass
+
+    def after_fork(self):
+        """ Called in each worker process of a PipelineWorkerPool, to replace what cannot be shared with the parent process. """
+        pass
+
+    def close(self):
+        """ Stop the threads or the processes the processor started.  Called by Pipeline.close. """
+        pass
+
     def _set_up_provides(self):
         """ Set up what processor requirements this processor fulfills.  Default is to use a class defined list. """
         self._provides = self.__class__.PROVIDES_DEFAULT
@@ -151,16 +165,41 @@ class UDProcessor(Processor):
         self._pretrain = None
         self._trainer = None
         self._vocab = None
-        if not hasattr(self, '_variant'):
-            self._set_up_model(config, use_gpu)
-
-        # build the final config for the processor
-        self._set_up_final_config(config)
+        self._use_gpu = use_gpu
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        # a pipeline builds all of its processors before loading their models, see Pipeline.load_processors
+        if not config.get('defer_loading', False):
+            self.load()
+
+    def load(self):
+        """ Load the model, unless it is already loaded.  Several threads may call this at once. """
+        with self._load_lock:
+            if self._loaded:
+                return
+            if not hasattr(self, '_variant'):
+                self._set_up_model(self._config, self._use_gpu)
+
+            # build the final config for the processor
+            self._set_up_final_config(self._config)
+            self._loaded = True
 
     @abstractmethod
     def _set_up_model(self, config, gpu):
         pass
 
+    def bulk_process(self, docs):
+        """
+        Process a list of Documents as if their sentences came from a single Document, so that the batches
+        of the model are filled with sentences from many documents and sorted by length across all of them.
+        The annotations are set on the sentences, which still belong to their own documents.
+        """
+        if hasattr(self, '_variant'):
+            return self._variant.bulk_process(docs)
+
+        self.process(combine_documents(docs))
+        return docs
+
     def _set_up_final_config(self, config):
         """ Finalize the configurations for this processor, based off of values from a UD model. """
         # set configurations from loaded model
@@ -201,6 +240,14 @@ class UDProcessor(Processor):
         else:
             return False
 
+def combine_documents(docs):
+    """ A Document holding the sentences of all of docs, which are not copied """
+    combined = Document([])
+    combined.sentences = [sentence for doc in docs for sentence in doc.sentences]
+    combined.num_tokens = sum(doc.num_tokens for doc in docs)
+    combined.num_words = sum(doc.num_words for doc in docs)
+    return combined
+
 class ProcessorRegisterException(Exception):
     """ Exception indicating processor or processor registration failure """
 
@@ -13,9 +13,9 @@ import stanza.models.classifiers.cnn_classifier as cnn_classifier
 
 from stanza.models.common import doc
 from stanza.models.common.char_model import CharacterLanguageModel
-from stanza.models.common.pretrain import Pretrain
 from stanza.pipeline._constants import *
 from stanza.pipeline.processor import UDProcessor, register_processor
+from stanza.pipeline.shared_models import get_shared, model_key, shared_pretrain
 
 @register_processor(SENTIMENT)
 class SentimentProcessor(UDProcessor):
@@ -27,21 +27,26 @@ class SentimentProcessor(UDProcessor):
     def _set_up_model(self, config, use_gpu):
         # get pretrained word vectors
         pretrain_path = config.get('pretrain_path', None)
-        self._pretrain = Pretrain(pretrain_path) if pretrain_path else None
+        self._pretrain = shared_pretrain(pretrain_path) if pretrain_path else None
         forward_charlm_path = config.get('forward_charlm_path', None)
-        charmodel_forward = CharacterLanguageModel.load(forward_charlm_path, finetune=False) if forward_charlm_path else None
         backward_charlm_path = config.get('backward_charlm_path', None)
-        charmodel_backward = CharacterLanguageModel.load(backward_charlm_path, finetune=False) if backward_charlm_path else None
-        # set up model
-        self._model = cnn_classifier.load(filename=config['model_path'],
-                                          pretrain=self._pretrain,
-                                          charmodel_forward=charmodel_forward,
-                                          charmodel_backward=charmodel_backward)
-        self._batch_size = config.get('batch_size', None)
 
-        # TODO: move this call to load()
-        if use_gpu:
-            self._model.cuda()
+        def load_model():
+            charmodel_forward = CharacterLanguageModel.load(forward_charlm_path, finetune=False) if forward_charlm_path else None
+            charmodel_backward = CharacterLanguageModel.load(backward_charlm_path, finetune=False) if backward_charlm_path else None
+            model = cnn_classifier.load(filename=config['model_path'],
+                                        pretrain=self._pretrain,
+                                        charmodel_forward=charmodel_forward,
+                                        charmodel_backward=charmodel_backward)
+            # TODO: move this call to load()
+            if use_gpu:
+                model.cuda()
+            return model
+
+        # set up model, which may be shared with other pipelines
+        self._model = get_shared(model_key(SENTIMENT, use_gpu, config['model_path'], pretrain_path,
+                                           forward_charlm_path, backward_charlm_path), load_model)
+        self._batch_size = config.get('batch_size', None)
 
     def process(self, document):
         sentences = document.sentences
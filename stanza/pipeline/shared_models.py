@@ -0,0 +1,51 @@
+"""
+Models and embeddings shared by the processors of all the pipelines of a process.
+
+The processors only read their trainers and pretrained embeddings while annotating, so two pipelines for the same
+language, eg one with the morphological post-filter and one without, can use the same loaded objects.  They are
+kept by the files they were loaded from and the device they are on, and only as long as a processor holds them:
+the registry itself only has weak references, so a model is dropped once the last pipeline using it is.
+"""
+
+import os
+import threading
+import weakref
+
+from stanza.models.common.pretrain import Pretrain
+
+_models = weakref.WeakValueDictionary()
+_lock = threading.Lock()
+# a lock per key, so that a model wanted by two processors loading in parallel is only loaded once.
+# It is removed once the model is stored, after which the model is found without it
+_key_locks = dict()
+
+def model_key(kind, use_gpu, *paths):
+    """ The key of a model of a given kind, loaded from paths (some of which may be None) onto the cpu or the gpu """
+    return (kind, 'cuda' if use_gpu else 'cpu') + tuple(os.path.realpath(path) if path else None for path in paths)
+
+def get_shared(key, load):
+    """ The model with the given key, which load() returns if no processor holds it already """
+    with _lock:
+        model = _models.get(key)
+        if model is not None:
+            return model
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+    with key_lock:
+        try:
+            model = _models.get(key)
+            if model is None:
+                model = load()
+                _models[key] = model
+        finally:
+            with _lock:
+                if _key_locks.get(key) is key_lock:
+                    del _key_locks[key]
+    return model
+
+def shared_pretrain(filename):
+    """ The Pretrain of filename.  Its embeddings are only read from the file when they are first needed """
+    return get_shared(model_key('pretrain', False, filename), lambda: Pretrain(filename))
+
+def shared_keys():
+    """ The keys of the models which are currently loaded """
+    return list(_models.keys())
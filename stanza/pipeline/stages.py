@@ -0,0 +1,89 @@
+"""
+Runs the processors of a pipeline as concurrent stages.
+
+Each processor works in its own thread on chunks of documents, taking them from a bounded queue filled by the
+processor before it, so that for example the tagger works on one chunk while the parser works on the previous
+one.  The networks release the GIL while they compute, which lets the stages overlap.
+"""
+
+import queue
+import threading
+
+DEFAULT_QUEUE_SIZE = 2
+
+# marks the end of the chunks
+_DONE = object()
+
+class _Failure():
+    """ An exception raised by a stage, passed on to the consumer of the results """
+    def __init__(self, exception):
+        self.exception = exception
+
+
+def run_stages(stages, chunks, queue_size=DEFAULT_QUEUE_SIZE):
+    """
+    Pass every chunk through all the stages, yielding the results in order.
+
+    :param stages: functions which each take a chunk and return it processed
+    :param chunks: an iterable of chunks, which is read in a separate thread as the first stage has room for them
+    :param queue_size: the number of chunks which may wait between two stages
+    """
+    stop = threading.Event()
+    queues = [queue.Queue(queue_size) for _ in range(len(stages) + 1)]
+
+    def put(q, item):
+        # give up when the consumer has stopped reading
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def get(q):
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return _DONE
+
+    def feed():
+        try:
+            for chunk in chunks:
+                if not put(queues[0], chunk):
+                    return
+        except BaseException as e:
+            put(queues[0], _Failure(e))
+            return
+        put(queues[0], _DONE)
+
+    def work(stage, q_in, q_out):
+        while True:
+            item = get(q_in)
+            if item is not _DONE and not isinstance(item, _Failure):
+                try:
+                    item = stage(item)
+                except BaseException as e:
+                    item = _Failure(e)
+            if not put(q_out, item) or item is _DONE or isinstance(item, _Failure):
+                return
+
+    threads = [threading.Thread(target=feed, daemon=True)]
+    threads += [threading.Thread(target=work, args=(stage, q_in, q_out), daemon=True)
+                for stage, q_in, q_out in zip(stages, queues, queues[1:])]
+    for thread in threads:
+        thread.start()
+    try:
+        while True:
+            item = queues[-1].get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.exception
+            yield item
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
@@ -10,6 +10,7 @@ from stanza.models.tokenization.trainer import Trainer
 from stanza.models.tokenization.utils import output_predictions
 from stanza.pipeline._constants import *
 from stanza.pipeline.processor import UDProcessor, register_processor
+from stanza.pipeline.shared_models import get_shared, model_key
 from stanza.pipeline.registry import PROCESSOR_VARIANTS
 from stanza.utils.datasets.postprocess_vietnamese_tokenizer_data import paras_to_chunks
 from stanza.models.common import doc
@@ -36,7 +37,8 @@ class TokenizeProcessor(UDProcessor):
         if config.get('pretokenized'):
             self._trainer = None
         else:
-            self._trainer = Trainer(model_file=config['model_path'], use_cuda=use_gpu)
+            self._trainer = get_shared(model_key(TOKENIZE, use_gpu, config['model_path']),
+                                       lambda: Trainer(model_file=config['model_path'], use_cuda=use_gpu))
 
     def process_pre_tokenized_text(self, input_src):
         """
@@ -91,3 +93,7 @@ class TokenizeProcessor(UDProcessor):
                                    orig_text=raw_text,
                                    no_ssplit=self.config.get('no_ssplit', False))
         return doc.Document(document, raw_text)
+
+    def bulk_process(self, docs):
+        """ Each document is tokenized separately, as the tokenizer builds new Documents from the text """
+        return [self.process(document) for document in docs]
@@ -0,0 +1,134 @@
+"""
+Runs a loaded Pipeline in several worker processes, for throughput on machines without a GPU.
+
+The workers are forked from the process which loaded the pipeline, so the model weights and the pretrained
+embeddings are shared with it copy-on-write rather than loaded again by every worker.  Documents are sent to
+the workers in tasks of a few documents, and the processed documents come back in the order they were given.
+"""
+
+from collections import deque, namedtuple
+import logging
+import multiprocessing
+import os
+import time
+
+import torch
+
+from stanza.models.common.doc import Document
+
+logger = logging.getLogger('stanza')
+
+# what a worker reports with every task it finishes
+TaskStats = namedtuple('TaskStats', ['pid', 'docs', 'sentences', 'seconds'])
+
+# the pipelines of the open pools, by the id of their pool.  They stay here as long as the pool is open,
+# as multiprocessing forks a new worker from this process whenever one of them dies
+_pool_pipelines = dict()
+# the pipeline of a worker process
+_worker_pipeline = None
+
+def _init_worker(pool_id, torch_threads):
+    global _worker_pipeline
+    _worker_pipeline = _pool_pipelines[pool_id]
+    # the workers share the cores between them
+    if torch_threads is not None:
+        torch.set_num_threads(torch_threads)
+    for processor in _worker_pipeline.loaded_processors:
+        processor.after_fork()
+
+def _process_in_worker(docs):
+    start = time.time()
+    docs = [doc if isinstance(doc, Document) else Document([], text=doc) for doc in docs]
+    docs = _worker_pipeline.process(docs)
+    stats = TaskStats(os.getpid(), len(docs), sum(len(doc.sentences) for doc in docs), time.time() - start)
+    return docs, stats
+
+
+class PipelineWorkerPool():
+    """
+    Processes documents with a Pipeline in num_workers forked processes.
+
+    Documents are either raw text or Documents, and are sent in tasks of docs_per_task documents, which are
+    processed together as in Pipeline.process with a list of Documents.  At most max_pending tasks are
+    sent ahead of the results being read, so a long input is only read as fast as the workers process it.
+    If max_tasks_per_worker is set, a worker is replaced by a newly forked one after that many tasks, which
+    bounds the memory a long running worker can grow to.
+
+    Threads do not survive a fork, and the locks they hold stay locked in the child, so the worker threads
+    of the processors, eg the decoder of the parser or the post-filter of the tagger, are stopped before
+    forking.  The processors start them again when they are next used, and the workers do without them.
+    As workers may be forked again while the pool is open, the pipeline should not be used by this
+    process in the meantime.  Torch sets up its own threads again in the workers, torch_threads of them.
+    """
+
+    def __init__(self, pipeline, num_workers, docs_per_task=1, max_pending=None, torch_threads=1, max_tasks_per_worker=None):
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            raise RuntimeError("A PipelineWorkerPool needs to fork its workers, which this platform does not support")
+        if num_workers < 1:
+            raise ValueError("A PipelineWorkerPool needs at least one worker, got {}".format(num_workers))
+        self.pipeline = pipeline
+        self.num_workers = num_workers
+        self.docs_per_task = docs_per_task
+        self.max_pending = max_pending if max_pending is not None else 2 * num_workers
+        self.worker_stats = dict()
+        for processor in pipeline.loaded_processors:
+            processor.close()
+        _pool_pipelines[id(self)] = pipeline
+        try:
+            self.pool = multiprocessing.get_context('fork').Pool(num_workers, initializer=_init_worker,
+                                                                 initargs=(id(self), torch_threads),
+                                                                 maxtasksperchild=max_tasks_per_worker)
+        except BaseException:
+            del _pool_pipelines[id(self)]
+            raise
+        logger.info("Started {} pipeline workers".format(num_workers))
+
+    def tasks(self, docs):
+        task = []
+        for doc in docs:
+            task.append(doc)
+            if len(task) == self.docs_per_task:
+                yield task
+                task = []
+        if task:
+            yield task
+
+    def map(self, docs):
+        """
+        Process an iterable of texts or Documents, yielding the processed Documents in the same order
+        """
+        pending = deque()
+        for task in self.tasks(docs):
+            pending.append(self.pool.apply_async(_process_in_worker, (task,)))
+            while len(pending) >= self.max_pending:
+                yield from self.result(pending.popleft())
+        while pending:
+            yield from self.result(pending.popleft())
+
+    def result(self, async_result):
+        docs, stats = async_result.get()
+        worker = self.worker_stats.setdefault(stats.pid, {'tasks': 0, 'docs': 0, 'sentences': 0, 'seconds': 0.0})
+        worker['tasks'] += 1
+        worker['docs'] += stats.docs
+        worker['sentences'] += stats.sentences
+        worker['seconds'] += stats.seconds
+        return docs
+
+    def stats(self):
+        """ The number of tasks, documents and sentences processed by each worker, and the time it spent, by pid """
+        return {pid: dict(stats) for pid, stats in self.worker_stats.items()}
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+            _pool_pipelines.pop(id(self), None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None and self.pool is not None:
+            self.pool.terminate()
+        self.close()
@@ -0,0 +1,51 @@
+"""
+Helpers shared by the tests of the POS tagger, its morphological dictionary and its post-filter
+"""
+
+import os
+
+from stanza.models import tagger
+from stanza.models.common.doc import Document
+from stanza.models.pos.data import DataLoader
+from stanza.models.pos.morph import MorphDictionary
+from stanza.models.pos.trainer import Trainer
+from stanza.utils.conll import CoNLL
+
+# a morphological dictionary in memory, which remembers the words it is queried for
+class FakeDictionary(MorphDictionary):
+    def __init__(self, entries):
+        self.entries = entries
+        self.queries = []
+
+    def find_many(self, words):
+        words = list(words)
+        self.queries.append(words)
+        return {w: tuple(list(x) for x in self.entries[w]) for w in words if w in self.entries}
+
+
+# a small Lithuanian treebank for the tests of the tagger and its morphological dictionary
+TREEBANK = """
+# sent_id = 1
+1	Namas	namas	NOUN	dkt.vyr.vns.V.	Case=Nom|Gender=Masc|Number=Sing	0	root	_	_
+2	yra	būti	VERB	vksm.asm.tiesiog.es.vns.3.	Mood=Ind|Number=Sing|Person=3|Tense=Pres	1	cop	_	_
+3	didelis	didelis	ADJ	bdv.nelygin.vyr.vns.V.	Case=Nom|Gender=Masc|Number=Sing	1	amod	_	_
+
+# sent_id = 2
+1	Jis	jis	PRON	įv.vyr.vns.V.	Case=Nom|Gender=Masc|Number=Sing	2	nsubj	_	_
+2	eina	eiti	VERB	vksm.asm.tiesiog.es.vns.3.	Mood=Ind|Number=Sing|Person=3|Tense=Pres	0	root	_	_
+
+""".lstrip()
+
+def build_tiny_tagger(tmp_dir, extra_args=()):
+    """
+    Build a small, untrained tagger from TREEBANK and save it to tmp_dir/lt/pos/test.pt
+    Returns the trainer and its training data
+    """
+    args = vars(tagger.parse_args(['--shorthand', 'lt_alksnis', '--lang', 'lt', '--no_pretrain',
+                                   '--hidden_dim', '10', '--char_hidden_dim', '10', '--deep_biaff_hidden_dim', '10',
+                                   '--composite_deep_biaff_hidden_dim', '10', '--word_emb_dim', '10'] + list(extra_args)))
+    data = DataLoader(Document(CoNLL.conll2dict(input_str=TREEBANK)), 10, args, None, evaluation=False)
+    trainer = Trainer(args=args, vocab=data.vocab, use_cuda=False)
+    os.makedirs(os.path.join(tmp_dir, 'lt', 'pos'), exist_ok=True)
+    trainer.save(os.path.join(tmp_dir, 'lt', 'pos', 'test.pt'))
+    return trainer, data
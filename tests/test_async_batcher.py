@@ -0,0 +1,109 @@
+"""
+Tests of the asyncio front end which annotates concurrent requests in batches
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from stanza.pipeline.async_batcher import AsyncBatcher
+from stanza.pipeline.core import Pipeline
+from tests import *
+
+pytestmark = [pytest.mark.travis, pytest.mark.pipeline]
+
+class FakePipeline():
+    """ uppercases the text of each document, optionally waiting for release before returning """
+    def __init__(self, release=None):
+        self.release = release
+        self.calls = []
+
+    def process(self, docs):
+        self.calls.append([doc.text for doc in docs])
+        if self.release is not None:
+            assert self.release.wait(5)
+        if any(doc.text == 'fail' for doc in docs):
+            raise ValueError("fail")
+        for doc in docs:
+            doc.text = doc.text.upper()
+        return docs
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+def test_batches():
+    pipeline = FakePipeline()
+    batcher = AsyncBatcher(pipeline, max_batch_size=4, max_wait=0.05)
+
+    async def requests():
+        return await asyncio.gather(*[batcher.process("text {}".format(i)) for i in range(10)])
+
+    docs = run(requests())
+    batcher.close()
+    assert [doc.text for doc in docs] == ["TEXT {}".format(i) for i in range(10)]
+    assert batcher.batch_sizes == [4, 4, 2]
+
+def test_failure():
+    batcher = AsyncBatcher(FakePipeline(), max_wait=0.05)
+
+    async def requests():
+        return await asyncio.gather(batcher.process("ok"), batcher.process("fail"), return_exceptions=True)
+
+    results = run(requests())
+    batcher.close()
+    # the whole batch fails together
+    assert all(isinstance(result, ValueError) for result in results)
+
+def test_timeout():
+    """ a request which times out while a batch is running is dropped from the next batch """
+    release = threading.Event()
+    pipeline = FakePipeline(release)
+    batcher = AsyncBatcher(pipeline, max_batch_size=1, max_wait=0)
+
+    async def requests():
+        first = asyncio.ensure_future(batcher.process("first"))
+        await asyncio.sleep(0.05)
+        with pytest.raises(asyncio.TimeoutError):
+            await batcher.process("late", timeout=0.05)
+        release.set()
+        return await first
+
+    assert run(requests()).text == "FIRST"
+    batcher.close()
+    assert pipeline.calls == [["first"]]
+
+def test_cancel():
+    release = threading.Event()
+    pipeline = FakePipeline(release)
+    batcher = AsyncBatcher(pipeline, max_batch_size=1, max_wait=0)
+
+    async def requests():
+        first = asyncio.ensure_future(batcher.process("first"))
+        second = asyncio.ensure_future(batcher.process("second"))
+        third = asyncio.ensure_future(batcher.process("third"))
+        await asyncio.sleep(0.05)
+        second.cancel()
+        release.set()
+        return await first, await third
+
+    first, third = run(requests())
+    batcher.close()
+    assert (first.text, third.text) == ("FIRST", "THIRD")
+    assert pipeline.calls == [["first"], ["third"]]
+
+def test_pipeline_close():
+    """ closing the pipeline stops the thread of its batcher """
+    pipeline = FakePipeline()
+    pipeline.loaded_processors = []
+    pipeline.batcher = AsyncBatcher(pipeline)
+    executor = pipeline.batcher.executor
+    assert run(pipeline.batcher.process("text")).text == "TEXT"
+    Pipeline.close(pipeline)
+    assert pipeline.batcher is None
+    with pytest.raises(RuntimeError):
+        executor.submit(print)
@@ -0,0 +1,43 @@
+"""
+Tests of the beam search of the seq2seq models
+"""
+
+import pytest
+import torch
+
+import stanza.models.common.seq2seq_constant as constant
+from stanza.models.common import utils
+from stanza.models.common.beam import Beam, BatchBeam
+
+pytestmark = [pytest.mark.travis, pytest.mark.pipeline]
+
+def random_log_probs(batch_size, beam_size, vocab_size, eos_bias):
+    logits = torch.randn(batch_size, beam_size, vocab_size)
+    logits[:, :, constant.EOS_ID] += eos_bias
+    return torch.log_softmax(logits, 2)
+
+@pytest.mark.parametrize("beam_size", [2, 4])
+def test_batch_beam(beam_size):
+    """ the batched beam finds the same hypotheses as one beam per example, and drops finished examples """
+    torch.manual_seed(1234)
+    batch_size, vocab_size, max_len = 8, 12, 15
+    beams = [Beam(beam_size) for _ in range(batch_size)]
+    batch_beam = BatchBeam(batch_size, beam_size)
+    for step in range(max_len):
+        log_probs = random_log_probs(batch_size, beam_size, vocab_size, step / 4)
+        active = batch_beam.active
+        assert torch.equal(batch_beam.get_current_state(), torch.stack([beams[b].get_current_state() for b in active.tolist()]))
+        origins = batch_beam.advance(log_probs[active])
+        for b in active.tolist():
+            beams[b].advance(log_probs[b])
+        still_active = [b for b in active.tolist() if not beams[b].done]
+        assert batch_beam.active.tolist() == still_active
+        assert len(origins) == len(still_active) * beam_size
+        if batch_beam.done():
+            break
+
+    expected = []
+    for beam in beams:
+        _, ks = beam.sort_best()
+        expected.append(utils.prune_hyp([x.item() for x in beam.get_hyp(ks[0])]))
+    assert batch_beam.get_hyps() == expected
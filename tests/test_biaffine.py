@@ -0,0 +1,26 @@
+"""
+Tests of scoring only some of the pairs of a biaffine scorer
+"""
+
+import pytest
+import torch
+
+from stanza.models.common.biaffine import DeepBiaffineScorer
+
+pytestmark = [pytest.mark.travis, pytest.mark.pipeline]
+
+def test_aligned():
+    """ scoring the words against their heads gives the scores of these pairs among all the pairs """
+    torch.manual_seed(1234)
+    scorer = DeepBiaffineScorer(6, 6, 5, 4, pairwise=True)
+    scorer.eval()
+    with torch.no_grad():
+        scorer.scorer.W_bilin.weight.normal_()
+        inputs = torch.randn(3, 7, 6)
+        hidden1, hidden2 = scorer.hidden(inputs, inputs)
+        pairwise = scorer(inputs, inputs)
+        heads = torch.randint(7, (3, 7))
+        aligned = scorer.aligned(hidden1, torch.gather(hidden2, 1, heads.unsqueeze(2).expand(-1, -1, hidden2.size(2))))
+    assert aligned.shape == (3, 7, 4)
+    expected = torch.gather(pairwise, 2, heads.view(3, 7, 1, 1).expand(-1, -1, 1, 4)).squeeze(2)
+    assert torch.allclose(aligned, expected, atol=1e-5)
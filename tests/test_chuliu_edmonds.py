@@ -0,0 +1,151 @@
+"""
+Tests of the maximum spanning tree decoder of the parser
+"""
+
+import itertools
+import time
+
+import numpy as np
+import pytest
+
+from stanza.models.common.chuliu_edmonds import chuliu_edmonds_batch, chuliu_edmonds_one_root, find_cycle, greedy_trees
+from stanza.models.depparse.trainer import DecoderPool
+from stanza.pipeline.depparse_processor import DepparseProcessor
+
+pytestmark = [pytest.mark.travis, pytest.mark.pipeline]
+
+def is_tree(heads):
+    """ whether heads, with heads[0] for the root, is a tree with a single word attached to the root """
+    no_self_loops = all(h != i for i, h in enumerate(heads) if i > 0)
+    return heads[0] == 0 and sum(heads[1:] == 0) == 1 and no_self_loops and find_cycle(heads) is None
+
+def tree_score(scores, heads):
+    return sum(scores[i, h] for i, h in enumerate(heads) if i > 0)
+
+def best_tree_score(scores):
+    """ the score of the best single rooted tree, by trying every assignment of heads """
+    n = len(scores)
+    best = -float('inf')
+    for heads in itertools.product(range(n), repeat=n-1):
+        heads = np.array((0,) + heads)
+        if is_tree(heads):
+            best = max(best, tree_score(scores, heads))
+    return best
+
+def test_find_cycle():
+    assert find_cycle(np.array([0, 0, 1, 2])) is None
+    assert sorted(find_cycle(np.array([0, 3, 1, 2]))) == [1, 2, 3]
+    assert sorted(find_cycle(np.array([0, 0, 3, 2]))) == [2, 3]
+
+def test_exact():
+    """ the decoded tree is the best single rooted tree """
+    rng = np.random.default_rng(1234)
+    for _ in range(200):
+        n = rng.integers(2, 7)
+        scores = rng.normal(size=(n, n))
+        original = scores.copy()
+        heads = chuliu_edmonds_one_root(scores)
+        assert np.array_equal(scores, original)
+        assert is_tree(heads)
+        assert tree_score(scores, heads) == pytest.approx(best_tree_score(scores))
+
+def test_prefers_root_edge():
+    """ every word would rather attach to the root, but only one of them can """
+    scores = np.full((4, 4), -5.0)
+    scores[1:, 0] = [1.0, 3.0, 2.0]
+    scores[1, 2] = scores[3, 2] = -1.0
+    assert list(chuliu_edmonds_one_root(scores)) == [0, 2, 0, 2]
+
+def test_batch():
+    """ a padded batch decodes to the same trees as its sentences one at a time, including long ones """
+    rng = np.random.default_rng(4321)
+    lengths = [3, 40, 400, 12]
+    scores = rng.normal(size=(len(lengths), max(lengths), max(lengths))).astype(np.float32)
+    trees, _ = chuliu_edmonds_batch(scores, lengths)
+    for sentence_scores, length, heads in zip(scores, lengths, trees):
+        assert len(heads) == length
+        assert is_tree(heads)
+        assert np.array_equal(heads, chuliu_edmonds_one_root(sentence_scores[:length, :length]))
+
+def test_greedy_trees():
+    """ only the sentences whose best heads make a single rooted tree are decoded greedily """
+    def sentence_scores(heads, length=6):
+        scores = np.zeros((length, length))
+        scores[np.arange(len(heads)), heads] = 1.0
+        # the best head among the padding, which is not a head
+        scores[:, -1] = 2.0
+        return scores
+    batch = [[0, 0, 1, 2],    # a tree
+             [0, 0, 0, 2],    # two root edges
+             [0, 2, 3, 1, 0], # a cycle
+             [0, 2, 0]]       # a tree
+    lengths = [len(heads) for heads in batch]
+    scores = np.stack([sentence_scores(heads) for heads in batch])
+    heads, greedy = greedy_trees(scores.copy(), lengths)
+    assert list(greedy) == [True, False, False, True]
+    for i, length in enumerate(lengths):
+        assert list(heads[i, :length]) == batch[i]
+
+    trees, greedy = chuliu_edmonds_batch(scores, lengths)
+    assert list(greedy) == [True, False, False, True]
+    assert list(trees[0]) == batch[0]
+    for tree, length in zip(trees, lengths):
+        assert is_tree(tree) and len(tree) == length
+
+def test_greedy_long():
+    """ the greedy check follows long chains of heads """
+    length = 300
+    scores = np.zeros((1, length, length))
+    scores[0, np.arange(2, length), np.arange(1, length - 1)] = 1.0
+    heads, greedy = greedy_trees(scores.copy(), [length])
+    assert greedy[0]
+    scores[0, 1, length - 1] = 1.0
+    heads, greedy = greedy_trees(scores.copy(), [length])
+    assert not greedy[0]
+
+def test_batch_speedup():
+    """ a batch whose best heads make trees is much faster to decode than its sentences one at a time """
+    rng = np.random.default_rng(1234)
+    batch_size, length = 32, 100
+    scores = rng.normal(size=(batch_size, length, length))
+    # each word would rather attach to the word before it
+    scores[:, np.arange(1, length), np.arange(length - 1)] += 10.0
+    lengths = [length] * batch_size
+
+    def best_time(decode):
+        times = []
+        for _ in range(3):
+            start = time.perf_counter()
+            decode()
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    _, greedy = chuliu_edmonds_batch(scores, lengths)
+    assert greedy.all()
+    batch_time = best_time(lambda: chuliu_edmonds_batch(scores, lengths))
+    single_time = best_time(lambda: [chuliu_edmonds_one_root(sentence) for sentence in scores])
+    assert batch_time * 2 < single_time
+
+class FakeTrainer:
+    """ scores a batch by doubling it, and decodes the scores by listing them """
+    def score(self, batch):
+        return [x * 2 for x in batch]
+
+    def decode(self, scores, unsort=True):
+        return list(scores)
+
+    def predict(self, batch, unsort=True):
+        return self.decode(self.score(batch), unsort)
+
+@pytest.mark.parametrize("num_workers", [0, 1, 2])
+def test_decoder_pool(num_workers):
+    batches = [[i, i + 1] for i in range(10)]
+    with DecoderPool(FakeTrainer(), num_workers) as pool:
+        assert list(pool.map(batches)) == [[i * 2, i * 2 + 2] for i in range(10)]
+
+def test_processor_close():
+    """ closing the parser, as Pipeline.close does, stops the threads of its decoder """
+    processor = DepparseProcessor.__new__(DepparseProcessor)
+    processor._decoder_pool = DecoderPool(FakeTrainer(), 2)
+    processor.close()
+    assert processor.decoder_pool.executor is None
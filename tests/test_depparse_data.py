@@ -2,6 +2,7 @@
 Test some pieces of the depparse dataloader
 """
 import pytest
+from stanza.models.common.batch_cost import BatchCost, padding_waste
 from stanza.models.depparse.data import data_to_batches
 
 pytestmark = [pytest.mark.travis, pytest.mark.pipeline]
@@ -57,6 +58,38 @@ def test_data_to_batches_eval_mode():
     batched_data = data_to_batches(data, batch_size=5, eval_mode=True, sort_during_eval=False, min_length_to_batch_separately=3)
     check_batches(batched_data[0], [1, 4, 1], ['A', 'B', 'C'])
 
+def make_fake_words(*lengths, word_length=3):
+    """ sentences of word ids and char ids, with all words word_length chars long """
+    return [[[i] * length, [[1] * word_length] * length] for i, length in enumerate(lengths)]
+
+def test_batch_cost():
+    """ a batch without padding costs its number of words, padding and long sentences cost more """
+    data = make_fake_words(4, 4, 4)
+    cost = BatchCost(data)
+    assert cost(3, 4, 12, 3) == 12
+    # 2 sentences padded to 8 words, and words padded to 6 chars
+    assert cost(2, 8, 12, 6) == (16 + 24) / 2
+    pair_cost = BatchCost(data, pairs=True)
+    assert pair_cost(3, 4, 12, 3) == 12
+    assert pair_cost(1, 8, 8, 3) == (8 + 8 + 16) / 3
+
+def test_data_to_batches_cost():
+    # by words, the long sentence would share a batch with the short ones
+    data = make_fake_words(2, 2, 2, 8)
+    batched_data, _ = data_to_batches(data, batch_size=12, eval_mode=True, sort_during_eval=True, min_length_to_batch_separately=None)
+    assert [len(batch) for batch in batched_data] == [3, 1]
+    batched_data, _ = data_to_batches(data, batch_size=12, eval_mode=True, sort_during_eval=True, min_length_to_batch_separately=None,
+                                      batch_cost=BatchCost(data, pairs=True))
+    assert [len(batch) for batch in batched_data] == [1, 3]
+
+def test_padding_waste():
+    data = make_fake_words(2, 4)
+    data[0][1] = [[1] * 6, [1] * 2]
+    waste = padding_waste([data])
+    assert waste.words == 0.25
+    assert waste.chars == 1 - 20 / 36
+    assert padding_waste([[x] for x in make_fake_words(2, 4)]) == (0.0, 0.0)
+
 if __name__ == '__main__':
     test_data_to_batches()
 
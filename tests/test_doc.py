@@ -3,6 +3,7 @@ import pytest
 import stanza
 from tests import *
 from stanza.models.common.doc import Document, ID, TEXT, NER
+from stanza.pipeline.processor import combine_documents
 
 pytestmark = [pytest.mark.travis, pytest.mark.pipeline]
 
@@ -55,3 +56,16 @@ def test_set_tokens(doc):
     assert result == ner_contents
 
 
+def test_combine_documents(sentences_dict):
+    """
+    Annotations set on a combination of documents, as done by bulk_process, end up in the original documents
+    """
+    docs = [Document(sentences_dict), Document(sentences_dict[:1])]
+    combined = combine_documents(docs)
+    assert len(combined.sentences) == 3
+    assert combined.num_words == 8
+
+    combined.set(fields="upos", contents=["VERB", "NOUN", "NOUN", "VERB", "PROPN", "VERB", "NOUN", "NOUN"])
+    assert [word.upos for word in docs[0].iter_words()] == ["VERB", "NOUN", "NOUN", "VERB", "PROPN"]
+    assert [word.upos for word in docs[1].iter_words()] == ["VERB", "NOUN", "NOUN"]
+    assert all(sentence.doc is docs[1] for sentence in docs[1].sentences)
@@ -156,4 +156,15 @@ def test_words_multidoc(processed_multidoc):
 
 def test_dependency_parse_multidoc(processed_multidoc):
     assert "\n\n".join([sent.dependencies_string() for processed_doc in processed_multidoc for sent in processed_doc.sentences]) == \
-           EN_DOC_DEPENDENCY_PARSES_GOLD
\ No newline at end of file
+           EN_DOC_DEPENDENCY_PARSES_GOLD
+
+def test_stream():
+    """ streaming the sentences as separate paragraphs gives the same analyses as processing them together """
+    nlp = stanza.Pipeline(dir=TEST_MODELS_DIR)
+    docs = list(nlp.stream(["\n\n".join(EN_DOCS)], chunk_size=40))
+    assert len(docs) == 3
+    assert "\n\n".join([sent.words_string() for doc in docs for sent in doc.sentences]) == EN_DOC_WORDS_GOLD
+
+    conllu = list(nlp.stream(iter(EN_DOCS), output='conllu'))
+    assert len(conllu) == 1
+    assert conllu[0].count("\n\n") == 3
@@ -0,0 +1,73 @@
+"""
+Tests of the features which the data loaders of the processors share through the sentences
+"""
+
+import pytest
+
+from stanza.models.common.doc import Document
+from stanza.models.common.feature_cache import FeatureCache, clear_features, vocab_key
+from stanza.models.common.vocab import CharVocab
+from stanza.models.depparse.data import DataLoader as DepparseDataLoader
+from stanza.models.pos.data import DataLoader as POSDataLoader
+from stanza.utils.conll import CoNLL
+from tests import *
+from tests.pos_helpers import TREEBANK
+
+pytestmark = [pytest.mark.travis, pytest.mark.pipeline]
+
+ARGS = {'shorthand': 'lt_alksnis', 'lang': 'lt', 'pretrain': False}
+
+def test_vocab_key():
+    data = CoNLL.conll2dict(input_str=TREEBANK)
+    data = [[[word['text']] for word in sentence] for sentence in data]
+    # the same contents give the same key, whichever object they are in
+    assert vocab_key(CharVocab(data, 'lt')) == vocab_key(CharVocab(data, 'lt'))
+    assert vocab_key(CharVocab(data, 'lt')) != vocab_key(CharVocab(data[:1], 'lt'))
+
+def test_cache():
+    doc = Document(CoNLL.conll2dict(input_str=TREEBANK))
+    calls = []
+    def compute():
+        calls.append(1)
+        return [1, 2]
+    words = ['Namas', 'yra']
+    cache = FeatureCache(doc.sentences)
+    assert cache.get(0, 'ids', words, compute) == [1, 2]
+    assert FeatureCache(doc.sentences).get(0, 'ids', words, compute) == [1, 2]
+    assert len(calls) == 1
+    # features are not kept without sentences
+    FeatureCache().get(0, 'ids', words, compute)
+    assert len(calls) == 2
+    clear_features(doc)
+    cache.get(0, 'ids', words, compute)
+    assert len(calls) == 3
+    # the features of words which were edited are computed again
+    cache.get(0, 'ids', ['Namai', 'yra'], compute)
+    assert len(calls) == 4
+
+def test_shared_between_processors():
+    """ the parser reuses the char ids mapped by the tagger, since their char vocabularies are the same """
+    train = Document(CoNLL.conll2dict(input_str=TREEBANK))
+    pos_vocab = POSDataLoader(train, 10, ARGS, None, evaluation=False).vocab
+    depparse_vocab = DepparseDataLoader(train, 10, ARGS, None, evaluation=False).vocab
+    assert vocab_key(pos_vocab['char']) == vocab_key(depparse_vocab['char'])
+
+    doc = Document(CoNLL.conll2dict(input_str=TREEBANK))
+    pos_data = POSDataLoader(doc, 10, ARGS, None, vocab=pos_vocab, evaluation=True)
+    depparse_data = DepparseDataLoader(doc, 10, ARGS, None, vocab=depparse_vocab, evaluation=True)
+    pos_chars = [sentence[1] for sentence in pos_data.data[0]]
+    depparse_chars = [sentence[1] for sentence in depparse_data.data[0]]
+    assert all(p == d[1:] for p, d in zip(pos_chars, depparse_chars))
+    words, features = doc.sentences[0]._vocab_features[('char', vocab_key(pos_vocab['char']))]
+    assert features is pos_chars[0]
+
+def test_edited_words():
+    """ a processor run directly on a document whose words were edited does not reuse the old features """
+    train = Document(CoNLL.conll2dict(input_str=TREEBANK))
+    vocab = POSDataLoader(train, 10, ARGS, None, evaluation=False).vocab
+    doc = Document(CoNLL.conll2dict(input_str=TREEBANK))
+    before = POSDataLoader(doc, 10, ARGS, None, vocab=vocab, evaluation=True).data[0][0][1]
+    doc.sentences[0].words[0].text = 'Yra'
+    after = POSDataLoader(doc, 10, ARGS, None, vocab=vocab, evaluation=True).data[0][0][1]
+    assert after[0] == vocab['char'].map(list('Yra'))
+    assert after[0] != before[0]
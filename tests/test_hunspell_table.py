@@ -0,0 +1,185 @@
+"""
+Tests of the hunspell affix expansion and of the precompiled hunspell table used by the POS post-filter
+"""
+
+import os
+import tempfile
+
+import pytest
+
+from stanza.models.pos.hunspeller.affixes import AffixFile
+from stanza.models.pos.hunspeller import table as hunspell_table
+from stanza.models.pos.hunspeller.table import HunspellTable, build_hunspell_table, case_variants
+from stanza.models.pos.morph import write_morph_dict
+from tests import *
+
+pytestmark = [pytest.mark.travis, pytest.mark.pipeline]
+
+AFF = """
+SET UTF-8
+FLAG num
+
+NEEDAFFIX 65521
+CIRCUMFIX 65520
+
+AF 4
+AF 1,2,65521 # 1
+AF 3 # 2
+AF 65520 # 3
+AF 5 # 4
+
+SFX 1 Y 3
+SFX 1 0 0 as 1
+SFX 1 as o . 1
+SFX 1 as ui [^k]as 2
+
+SFX 2 N 1
+SFX 2 ti u/2 [^y]ti 3
+
+SFX 3 Y 1
+SFX 3 u uosi . 4
+
+PFX 4 Y 1
+PFX 4 0 ne . 5
+
+SFX 5 Y 1
+SFX 5 ti ie/6,65520 . 6
+
+PFX 6 Y 1
+PFX 6 0 te/3 . 7
+""".lstrip()
+
+DIC = """
+5
+namas/1	1
+eiti/2,4	2
+lankas/1	1
+taip
+dirbti/4	6
+""".lstrip()
+
+# the words hunspell makes of DIC, and a compound, which the expansion does not make
+HUNSPELL_WORDS = {'namas', 'namo', 'namui', 'eiti', 'eiu', 'eiuosi', 'neeiti', 'lankas', 'lanko', 'taip',
+                  'dirbti', 'tedirbie'}
+COMPOUND = 'namolankas'
+
+def write_affixes(tmp_dir):
+    aff_file = os.path.join(tmp_dir, 'test.aff')
+    with open(aff_file, 'w', encoding='utf-8') as fout:
+        fout.write(AFF)
+    dic_file = os.path.join(tmp_dir, 'test.dic')
+    with open(dic_file, 'w', encoding='utf-8') as fout:
+        fout.write(DIC)
+    return aff_file, dic_file
+
+def test_expand():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        aff_file, dic_file = write_affixes(tmp_dir)
+        affixes = AffixFile(aff_file)
+        assert affixes.flags('1') == ['1', '2', '65521']
+
+        assert set(affixes.expand('namas', affixes.flags('1'))) == {'namas', 'namo', 'namui'}
+        # the condition [^k]as rules out lankui
+        assert set(affixes.expand('lankas', affixes.flags('1'))) == {'lankas', 'lanko'}
+        # a second suffix from the continuation of the first, and a prefix
+        assert set(affixes.expand('eiti', ['2', '4'])) == {'eiti', 'eiu', 'eiuosi', 'neeiti'}
+
+        # a root flagged NEEDAFFIX is only a word with an affix
+        assert list(affixes.expand('namas', ['65521'])) == []
+        # the CIRCUMFIX suffix needs the CIRCUMFIX prefix, and the other way around
+        assert set(affixes.expand('dirbti', ['5'])) == {'dirbti', 'tedirbie'}
+
+        assert set(affixes.expand_dictionary(dic_file)) == HUNSPELL_WORDS
+
+def test_case_variants():
+    assert case_variants('namas') == ['namas']
+    assert case_variants('Namas') == ['Namas', 'namas']
+    assert case_variants('NAMAS') == ['NAMAS', 'Namas', 'namas']
+    assert case_variants('McDonald') == ['McDonald']
+
+def test_table():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        table_file = os.path.join(tmp_dir, 'hunspell.db')
+        write_morph_dict(table_file, [('namas', 'namas', 'NOUN', 'dktv.vyr.vns.V.', 'Case=Nom|Gender=Masc|Number=Sing'),
+                                      ('Vilnius', 'Vilnius', 'PROPN', 'dktv.tikr.vyr.vns.V.', 'Case=Nom|Gender=Masc|Number=Sing')])
+        table = HunspellTable(table_file)
+        analyses = table.analyse_many(['Namas', 'Vilnius', 'vilnius', 'nėra'])
+        assert analyses['Namas'][1] == ['NOUN']
+        assert analyses['Vilnius'][1] == ['PROPN']
+        # lowercase words are not looked up capitalised
+        assert analyses['vilnius'] == (None, None, None, None)
+        assert analyses['nėra'] == (None, None, None, None)
+        assert table.hunspell_to_conll('NAMAS')[0] == ['namas']
+
+def test_hunchecker_registry(monkeypatch):
+    """ each hunspell dictionary is loaded once per process, even when asked for from several threads """
+    from concurrent.futures import ThreadPoolExecutor
+    from stanza.models.pos.hunspeller import huncheck
+
+    loaded = []
+    class FakeHunchecker():
+        def __init__(self, dict_file, dict_data_dir=None):
+            loaded.append((dict_file, dict_data_dir))
+
+    monkeypatch.setattr(huncheck, 'Hunchecker', FakeHunchecker)
+    monkeypatch.setattr(huncheck, '_huncheckers', dict())
+    with ThreadPoolExecutor(4) as executor:
+        checkers = list(executor.map(lambda _: huncheck.get_hunchecker('lt-LT_morphology', 'hunspell'), range(20)))
+    assert len(loaded) == 1
+    assert all(c is checkers[0] for c in checkers)
+    # a different path is a different dictionary
+    assert huncheck.get_hunchecker('lt-LT_morphology', 'other') is not checkers[0]
+    assert len(loaded) == 2
+
+class FakeHunchecker():
+    """ analyses the words of HUNSPELL_WORDS and COMPOUND as nouns, and remembers which words it was asked about """
+    def __init__(self):
+        self.words = []
+
+    def hunspell_to_conll(self, word):
+        self.words.append(word)
+        if word not in HUNSPELL_WORDS and word != COMPOUND:
+            return (None, None, None, None)
+        return ([word], ['NOUN'], ['dktv.'], ['Case=Nom'])
+
+    def analyse_many(self, words):
+        return {word: self.hunspell_to_conll(word) for word in words}
+
+def test_build_table(monkeypatch):
+    """ the table built from a dictionary has the analyses of the analyser, which it asks for the missing words """
+    hunchecker = FakeHunchecker()
+    monkeypatch.setattr(hunspell_table, 'get_hunchecker', lambda dict_name, dict_dir: hunchecker)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        write_affixes(tmp_dir)
+        table_file = os.path.join(tmp_dir, 'hunspell.db')
+        assert build_hunspell_table(table_file, 'test', tmp_dir, numerals=False) == len(HUNSPELL_WORDS)
+        # every form was analysed once, and none that hunspell rejects
+        assert sorted(hunchecker.words) == sorted(HUNSPELL_WORDS)
+
+        words = sorted(HUNSPELL_WORDS) + [COMPOUND, 'dirbie']
+        expected = {word: FakeHunchecker().hunspell_to_conll(word) for word in words}
+        assert HunspellTable(table_file).analyse_many(words) == dict(expected, namolankas=(None, None, None, None))
+        table = HunspellTable(table_file, fallback=FakeHunchecker)
+        assert table.analyse_many(words) == expected
+        assert table.fallback_analyser.words == [COMPOUND, 'dirbie']
+
+def test_table_fallback_unavailable():
+    """ without hunspell, the words missing from the table have no analyses """
+    def fallback():
+        raise ImportError("No module named 'hunspell'")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        table_file = os.path.join(tmp_dir, 'hunspell.db')
+        write_morph_dict(table_file, [('namas', 'namas', 'NOUN', 'dktv.vyr.vns.V.', 'Case=Nom|Gender=Masc|Number=Sing')])
+        table = HunspellTable(table_file, fallback=fallback)
+        assert table.analyse_many(['namas', 'nėra'])['nėra'] == (None, None, None, None)
+        assert table.fallback is None
+
+def test_hunspell_forms():
+    """ hunspell itself accepts the expanded forms, and rejects the ones left out """
+    hunspell = pytest.importorskip('hunspell')
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        write_affixes(tmp_dir)
+        checker = hunspell.Hunspell('test', hunspell_data_dir=tmp_dir)
+        forms = set(AffixFile(os.path.join(tmp_dir, 'test.aff')).expand_dictionary(os.path.join(tmp_dir, 'test.dic')))
+        assert all(checker.spell(form) for form in forms)
+        assert not any(checker.spell(form) for form in ['dirbie', 'tedirbti', 'nenamas', 'lankui'])
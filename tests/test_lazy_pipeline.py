@@ -0,0 +1,82 @@
+"""
+Tests of building a pipeline whose models are only loaded when they are first used, or shared with other pipelines
+"""
+
+import gc
+import json
+import os
+
+import pytest
+
+import stanza
+from stanza.models.pos.morph import write_morph_dict
+from stanza.pipeline.core import load_resources_file
+from stanza.pipeline.shared_models import model_key, shared_keys
+from tests import *
+from tests.pos_helpers import build_tiny_tagger
+
+pytestmark = [pytest.mark.travis, pytest.mark.pipeline]
+
+RESOURCES = {'lt': {'lang_name': 'Lithuanian',
+                    'default_processors': {'tokenize': 'test', 'pos': 'test'},
+                    'default_dependencies': {},
+                    'tokenize': {'test': {}},
+                    'pos': {'test': {}}}}
+
+@pytest.fixture(scope="module")
+def model_dir(tmp_path_factory):
+    """ a directory with a resources.json and a small, untrained tagger """
+    model_dir = str(tmp_path_factory.mktemp("models"))
+    with open(os.path.join(model_dir, 'resources.json'), 'w') as fout:
+        json.dump(RESOURCES, fout)
+    build_tiny_tagger(model_dir)
+    return model_dir
+
+def test_lazy(model_dir):
+    nlp = stanza.Pipeline('lt', dir=model_dir, tokenize_pretokenized=True, use_gpu=False, lazy=True)
+    assert nlp.processors['pos'].trainer is None
+    # only the processors which are run are loaded
+    doc = nlp("Namas yra", processors='tokenize')
+    assert nlp.processors['pos'].trainer is None
+    assert doc.sentences[0].words[0].upos is None
+    doc = nlp("Namas yra")
+    assert nlp.processors['pos'].trainer is not None
+    assert all(word.upos is not None for word in doc.sentences[0].words)
+    assert set(nlp.load_times) == {'resources', 'tokenize', 'pos'}
+
+def test_eager(model_dir):
+    nlp = stanza.Pipeline('lt', dir=model_dir, tokenize_pretokenized=True, use_gpu=False, load_threads=2)
+    assert nlp.processors['pos'].trainer is not None
+    assert 'pos' in nlp.load_report()
+
+def test_missing_model(model_dir):
+    """ with a lazy pipeline, a missing model is only noticed when it is needed """
+    nlp = stanza.Pipeline('lt', dir=model_dir, tokenize_pretokenized=True, use_gpu=False, lazy=True,
+                          pos_model_path=os.path.join(model_dir, 'lt', 'pos', 'missing.pt'))
+    nlp("Namas yra", processors='tokenize')
+    with pytest.raises(FileNotFoundError):
+        nlp("Namas yra")
+
+def test_resources_cache(model_dir):
+    resources_file = os.path.join(model_dir, 'resources.json')
+    assert load_resources_file(resources_file) is load_resources_file(resources_file)
+
+def test_shared_between_pipelines(model_dir):
+    """ two pipelines with the same models use the same loaded trainer, which goes away with them """
+    nlp = stanza.Pipeline('lt', dir=model_dir, tokenize_pretokenized=True, use_gpu=False)
+    other = stanza.Pipeline('lt', dir=model_dir, tokenize_pretokenized=True, use_gpu=False, pos_batch_size=10)
+    assert nlp.processors['pos'].trainer is other.processors['pos'].trainer
+    key = model_key('pos', False, os.path.join(model_dir, 'lt', 'pos', 'test.pt'), None)
+    assert key in shared_keys()
+    del nlp, other
+    gc.collect()
+    assert key not in shared_keys()
+
+def test_close(model_dir):
+    """ closing the pipeline stops the workers of the post-filter """
+    morph_dict = os.path.join(model_dir, 'morph.db')
+    write_morph_dict(morph_dict, [('namas', 'namas', 'NOUN', 'dkt.vyr.vns.V.', 'Case=Nom|Gender=Masc|Number=Sing')])
+    with stanza.Pipeline('lt', dir=model_dir, tokenize_pretokenized=True, use_gpu=False, pos_morph_dict=morph_dict) as nlp:
+        pool = nlp.processors['pos'].post_filter_pool
+        assert pool.executor is not None
+    assert pool.executor is None
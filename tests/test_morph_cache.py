@@ -0,0 +1,65 @@
+"""
+Tests of the analysis caches used by the POS post-filter
+"""
+
+import pytest
+
+from stanza.models.pos.cache import LRUCache, CachedMorphDictionary, CachedHunchecker
+from tests import *
+from tests.pos_helpers import FakeDictionary
+
+pytestmark = [pytest.mark.travis, pytest.mark.pipeline]
+
+class FakeHunchecker():
+    def __init__(self):
+        self.analysed = []
+
+    def hunspell_to_conll(self, word):
+        self.analysed.append(word)
+        if word == 'nėra':
+            return None, None, None, None
+        return [word], ['NOUN'], ['dkt.'], ['_']
+
+def test_lru():
+    cache = LRUCache(2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    # b was the least recently used
+    assert 'b' not in cache
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+    assert cache.stats() == {'size': 2, 'hits': 2, 'misses': 1, 'evictions': 1, 'hit_rate': 2 / 3}
+
+def test_cached_dictionary():
+    backend = FakeDictionary({'namas': (['namas'], ['NOUN'], ['dkt.'], ['Case=Nom'])})
+    morph_dict = CachedMorphDictionary(backend, 10)
+    assert set(morph_dict.find_many(['namas', 'Namas'])) == {'namas'}
+    # both the hit and the miss are cached, so nothing is queried
+    found = morph_dict.find_many(['namas', 'Namas'])
+    assert backend.queries == [['namas', 'Namas']]
+    assert morph_dict.find('Namas') == (None, None, None, None)
+
+    # the caller may extend the returned lists without changing the cache
+    found['namas'][1].append('VERB')
+    assert morph_dict.find('namas')[1] == ['NOUN']
+    assert morph_dict.stats()['misses'] == 2
+
+def test_warm():
+    backend = FakeDictionary({'namas': (['namas'], ['NOUN'], ['dkt.'], ['Case=Nom'])})
+    morph_dict = CachedMorphDictionary(backend, 10)
+    morph_dict.warm(['Namas'])
+    assert backend.queries == [['Namas', 'namas']]
+    morph_dict.find_many(['Namas', 'namas'])
+    assert len(backend.queries) == 1
+
+def test_cached_hunchecker():
+    hunchecker = FakeHunchecker()
+    cached = CachedHunchecker(hunchecker, 10)
+    assert cached.hunspell_to_conll('nėra') == (None, None, None, None)
+    assert cached.hunspell_to_conll('nėra') == (None, None, None, None)
+    lemma, upos, xpos, feats = cached.hunspell_to_conll('namas')
+    upos.append('VERB')
+    assert cached.hunspell_to_conll('namas')[1] == ['NOUN']
+    assert hunchecker.analysed == ['nėra', 'namas']
@@ -0,0 +1,69 @@
+"""
+Tests of the file-backed morphological dictionary used by the POS post-filter
+"""
+
+import gzip
+import os
+import tempfile
+
+import pytest
+
+from stanza.models.pos.morph import build_morph_dict, load_morph_dict, SQLiteMorphDictionary
+from tests import *
+from tests.pos_helpers import TREEBANK
+
+pytestmark = [pytest.mark.travis, pytest.mark.pipeline]
+
+NOUNS = """
+0	namas	namas	NOUN	dkt.vyr.vns.V.	Case=Nom|Gender=Masc|Number=Sing	_	_	_	_
+0	namo	namas	NOUN	dkt.vyr.vns.K.	Case=Gen|Gender=Masc|Number=Sing	_	_	_	_
+""".lstrip()
+
+ADJECTIVES = """
+0	didelis	didelis	ADJ	bdv.nelygin.vyr.vns.V.	Case=Nom|Gender=Masc|Number=Sing	_	_	_	_
+""".lstrip()
+
+def build_test_dict(tmp_dir):
+    os.makedirs(os.path.join(tmp_dir, 'pos_files', 'nouns'))
+    with gzip.open(os.path.join(tmp_dir, 'pos_files', 'nouns', 'nouns1.conllu.gz'), 'wt', encoding='utf-8') as fout:
+        fout.write(NOUNS)
+    os.makedirs(os.path.join(tmp_dir, 'pos_files', 'adjectives'))
+    with gzip.open(os.path.join(tmp_dir, 'pos_files', 'adjectives', 'adjectives1.conllu.gz'), 'wt', encoding='utf-8') as fout:
+        fout.write(ADJECTIVES)
+    # files which are not conllu are ignored
+    with open(os.path.join(tmp_dir, 'pos_files', 'freq_numerals.txt'), 'w', encoding='utf-8') as fout:
+        fout.write("100-as\n")
+    treebank = os.path.join(tmp_dir, 'train.conllu')
+    with open(treebank, 'w', encoding='utf-8') as fout:
+        fout.write(TREEBANK)
+    dict_file = os.path.join(tmp_dir, 'morph.db')
+    total = build_morph_dict(dict_file, [os.path.join(tmp_dir, 'pos_files'), treebank])
+    assert total == 8
+    return dict_file
+
+def test_find():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        morph_dict = load_morph_dict(build_test_dict(tmp_dir))
+        assert isinstance(morph_dict, SQLiteMorphDictionary)
+
+        lemma, upos, xpos, feats = morph_dict.find('namas')
+        assert lemma == ['namas']
+        assert upos == ['NOUN']
+        assert feats == ['Case=Nom|Gender=Masc|Number=Sing']
+
+        # the treebank occurrence is a separate entry, as in the MySQL tables
+        lemma, upos, xpos, feats = morph_dict.find('didelis')
+        assert len(lemma) == 2
+
+        # lookups are case sensitive
+        assert morph_dict.find('Namas')[3] == ['Case=Nom|Gender=Masc|Number=Sing']
+        assert morph_dict.find('NAMAS') == (None, None, None, None)
+
+def test_find_many():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        morph_dict = load_morph_dict(build_test_dict(tmp_dir))
+        # small chunks to check that the results of several queries are combined
+        morph_dict.chunk_size = 2
+        found = morph_dict.find_many(['namas', 'Namas', 'didelis', 'namas', 'nėra'])
+        assert set(found.keys()) == {'namas', 'Namas', 'didelis'}
+        assert found['didelis'][1] == ['ADJ', 'ADJ']
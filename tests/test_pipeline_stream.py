@@ -0,0 +1,40 @@
+"""
+Tests of the way Pipeline.stream cuts its input into chunks
+"""
+
+import io
+
+import pytest
+
+from stanza.pipeline.core import iterate_paragraphs, chunk_paragraphs
+from tests import *
+
+pytestmark = [pytest.mark.travis, pytest.mark.pipeline]
+
+TEXT = """
+Vilnius yra Lietuvos sostinė.
+Tai didžiausias miestas.
+
+  
+Kaunas yra antras.
+"""
+
+def test_file_paragraphs():
+    paragraphs = list(iterate_paragraphs(io.StringIO(TEXT)))
+    assert paragraphs == ["Vilnius yra Lietuvos sostinė.\nTai didžiausias miestas.", "Kaunas yra antras."]
+
+def test_text_paragraphs():
+    # each string which does not end with a newline is a paragraph of its own
+    assert list(iterate_paragraphs(["Vienas.", "Du.\n", "Trys.", "Keturi.\n\nPenki."])) == \
+        ["Vienas.", "Du.\nTrys.", "Keturi.", "Penki."]
+
+def test_chunks():
+    paragraphs = ["a" * 10, "b" * 10, "c" * 10]
+    assert list(chunk_paragraphs(paragraphs, 25)) == ["a" * 10 + "\n\n" + "b" * 10, "c" * 10]
+    assert list(chunk_paragraphs(paragraphs, 5)) == paragraphs
+    assert list(chunk_paragraphs(paragraphs, 100)) == ["\n\n".join(paragraphs)]
+
+def test_long_paragraph():
+    """ a paragraph longer than a chunk is cut between its lines, after the paragraphs before it """
+    chunks = list(chunk_paragraphs(["x", "aaaa\nbbbb\ncccc", "y"], 10))
+    assert chunks == ["x", "aaaa\nbbbb", "cccc\n\ny"]
@@ -0,0 +1,94 @@
+"""
+Tests of the morphological post-filter of the POS tagger, run separately from the tagger
+"""
+
+import os
+import pickle
+import tempfile
+
+import pytest
+
+from stanza.models.common.doc import Document
+from stanza.models.pos.data import DataLoader
+from stanza.models.pos.morph import write_morph_dict
+from stanza.models.pos.postfilter import PostFilter, PostFilterPool, TaggedBatch
+from stanza.utils.conll import CoNLL
+from tests import *
+from tests.pos_helpers import FakeDictionary, TREEBANK
+
+pytestmark = [pytest.mark.travis, pytest.mark.pipeline]
+
+DICTIONARY = {'namas': (['namas'], ['NOUN'], ['dkt.vyr.vns.V.'], ['Case=Nom|Gender=Masc|Number=Sing'])}
+
+def build_vocab():
+    args = {'shorthand': 'sme_giella', 'lang': 'sme'}
+    data = DataLoader(Document(CoNLL.conll2dict(input_str=TREEBANK)), 5000, args, None, evaluation=False)
+    return data.vocab, args
+
+def tagged_batch(vocab):
+    """ the tagger thinks 'Namas' is a verb, with noun as its second choice """
+    upos = vocab['upos'].map(['VERB', 'NOUN'])
+    feats = vocab['feats'].map(['Mood=Ind|Number=Sing|Person=3|Tense=Pres', 'Case=Nom|Gender=Masc|Number=Sing'])
+    tags = [[['VERB', 'vksm.asm.tiesiog.es.vns.3.', 'Mood=Ind|Number=Sing|Person=3|Tense=Pres'],
+             ['VERB', 'vksm.asm.tiesiog.es.vns.3.', 'Mood=Ind|Number=Sing|Person=3|Tense=Pres']]]
+    candidates = [[(upos, feats), (upos, feats)]]
+    return TaggedBatch([['Namas', 'yra']], tags, candidates)
+
+def test_filter():
+    vocab, args = build_vocab()
+    post_filter = PostFilter(vocab, args, FakeDictionary(DICTIONARY))
+    tagged = tagged_batch(vocab)
+    filtered = post_filter(tagged)
+    # the lowercased form is found in the dictionary
+    assert filtered[0][0] == ['NOUN', 'dkt.vyr.vns.V.', 'Case=Nom|Gender=Masc|Number=Sing']
+    # words which are not in the dictionary keep their tags
+    assert filtered[0][1] == tagged.tags[0][1]
+    # the predictions of the tagger are not changed in place
+    assert tagged.tags[0][0][0] == 'VERB'
+
+def test_hunspell_table():
+    """ for Lithuanian, the analyses of the precompiled hunspell table are used as well """
+    vocab, args = build_vocab()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        table_file = os.path.join(tmp_dir, 'hunspell.db')
+        write_morph_dict(table_file, [('namas', 'namas', 'NOUN', 'dkt.vyr.vns.V.', 'Case=Nom|Gender=Masc|Number=Sing')])
+        args.update({'lang': 'lt', 'morph_hunspell_table': table_file})
+        post_filter = PostFilter(vocab, args, FakeDictionary({}))
+        filtered = post_filter(tagged_batch(vocab))
+        assert filtered[0][0][0] == 'NOUN'
+        assert post_filter.hunspell.stats()['size'] > 0
+
+@pytest.mark.parametrize("num_workers", [0, 2])
+def test_pool(num_workers):
+    vocab, args = build_vocab()
+    post_filter = PostFilter(vocab, args, FakeDictionary(DICTIONARY))
+    with PostFilterPool(post_filter, num_workers) as pool:
+        results = list(pool.map(tagged_batch(vocab) for _ in range(5)))
+    assert len(results) == 5
+    assert all(r == results[0] for r in results)
+    assert results[0][0][0][0] == 'NOUN'
+
+def test_process_pool():
+    """ the worker processes are spawned, and open the dictionary themselves """
+    vocab, args = build_vocab()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        args['morph_dict'] = os.path.join(tmp_dir, 'morph.db')
+        write_morph_dict(args['morph_dict'], [('namas', 'namas', 'NOUN', 'dkt.vyr.vns.V.', 'Case=Nom|Gender=Masc|Number=Sing')])
+        pool = PostFilterPool(PostFilter(vocab, args), 1, processes=True)
+        assert pool.executor._mp_context.get_start_method() == 'spawn'
+        with pool:
+            results = list(pool.map(tagged_batch(vocab) for _ in range(3)))
+        assert pool.executor is None
+    assert all(r[0][0][0] == 'NOUN' for r in results)
+
+def test_pickle():
+    vocab, args = build_vocab()
+    # an open dictionary cannot be sent to another process
+    with pytest.raises(TypeError):
+        pickle.dumps(PostFilter(vocab, args, FakeDictionary(DICTIONARY)))
+
+    args['morph_dict'] = 'morph.db'
+    post_filter = pickle.loads(pickle.dumps(PostFilter(vocab, args, FakeDictionary(DICTIONARY))))
+    # the dictionary is reopened by name on first use
+    assert post_filter.morph_dict is None
+    assert post_filter.args['morph_dict'] == 'morph.db'
@@ -0,0 +1,45 @@
+"""
+Tests of the decoding of the seq2seq model of the lemmatizer and the MWT expander
+"""
+
+import pytest
+import torch
+
+import stanza.models.common.seq2seq_constant as constant
+from stanza.models.common.seq2seq_model import Seq2SeqModel
+
+pytestmark = [pytest.mark.travis, pytest.mark.pipeline]
+
+ARGS = {'vocab_size': 20, 'emb_dim': 8, 'hidden_dim': 8, 'num_layers': 1, 'dropout': 0, 'max_dec_len': 12, 'attn_type': 'soft'}
+
+@pytest.fixture(scope="module")
+def model():
+    torch.manual_seed(1234)
+    model = Seq2SeqModel(ARGS)
+    model.eval()
+    # an untrained model is too unsure of itself to stop at different steps
+    with torch.no_grad():
+        model.embedding.weight.normal_()
+        model.dec2vocab.weight.normal_(std=3)
+    return model
+
+def random_batch(batch_size):
+    lengths = sorted(torch.randint(1, 8, (batch_size,)).tolist(), reverse=True)
+    src = torch.full((batch_size, lengths[0]), constant.PAD_ID, dtype=torch.long)
+    for i, length in enumerate(lengths):
+        src[i, :length] = torch.randint(4, ARGS['vocab_size'], (length,))
+    return src, src.eq(constant.PAD_ID)
+
+@pytest.mark.parametrize("beam_size", [1, 3])
+def test_batch_same_as_single(model, beam_size):
+    """ the words of a batch are decoded as if they were alone, while the ones which are done leave the batch """
+    torch.manual_seed(4321)
+    src, src_mask = random_batch(16)
+    with torch.no_grad():
+        # some words are done early, some reach max_dec_len
+        preds, _ = model.predict(src, src_mask, beam_size=beam_size)
+        for i in range(len(src)):
+            length = int((~src_mask[i]).sum())
+            single, _ = model.predict(src[i:i+1, :length], src_mask[i:i+1, :length], beam_size=beam_size)
+            assert preds[i] == single[0]
+    assert len(set(len(pred) for pred in preds)) > 1
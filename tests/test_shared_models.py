@@ -0,0 +1,45 @@
+"""
+Tests of the registry of models shared between pipelines
+"""
+
+import gc
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from stanza.pipeline.shared_models import _key_locks, get_shared, model_key, shared_keys
+from tests import *
+
+pytestmark = [pytest.mark.travis, pytest.mark.pipeline]
+
+class FakeModel():
+    pass
+
+def test_key():
+    assert model_key('pos', False, 'a/../b.pt', None) == model_key('pos', False, 'b.pt', None)
+    assert model_key('pos', False, 'b.pt') != model_key('pos', True, 'b.pt')
+
+def test_shared_once():
+    """ a model asked for by several threads at once is loaded once """
+    loaded = []
+    def load():
+        loaded.append(1)
+        return FakeModel()
+    key = model_key('test', False, 'shared_once.pt')
+    with ThreadPoolExecutor(4) as executor:
+        models = list(executor.map(lambda _: get_shared(key, load), range(20)))
+    assert len(loaded) == 1
+    assert all(model is models[0] for model in models)
+    # the lock of the key is not kept once the model is loaded
+    assert key not in _key_locks
+
+def test_released():
+    key = model_key('test', False, 'released.pt')
+    model = get_shared(key, FakeModel)
+    assert key in shared_keys()
+    assert get_shared(key, FakeModel) is model
+    del model
+    gc.collect()
+    assert key not in shared_keys()
+    # loaded again once nothing holds it
+    assert get_shared(key, FakeModel) is not None
@@ -0,0 +1,51 @@
+"""
+Tests of the concurrent stages used by Pipeline.stream(pipelined=True)
+"""
+
+import threading
+
+import pytest
+
+from stanza.pipeline.stages import run_stages
+from tests import *
+
+pytestmark = [pytest.mark.travis, pytest.mark.pipeline]
+
+def test_order():
+    stages = [lambda x: x + 1, lambda x: x * 10, str]
+    assert list(run_stages(stages, range(20), queue_size=1)) == [str((x + 1) * 10) for x in range(20)]
+
+def test_overlap():
+    """ the second stage works on the first chunk while the first stage waits on the second """
+    second_started = threading.Event()
+
+    def first(x):
+        if x == 1:
+            assert second_started.wait(5)
+        return x
+
+    def second(x):
+        second_started.set()
+        return x
+
+    assert list(run_stages([first, second], [0, 1])) == [0, 1]
+
+def test_failure():
+    def fail(x):
+        if x == 3:
+            raise ValueError("chunk 3")
+        return x
+
+    results = []
+    with pytest.raises(ValueError, match="chunk 3"):
+        for x in run_stages([fail, str], range(10)):
+            results.append(x)
+    assert results == ['0', '1', '2']
+
+def test_close():
+    """ stopping early stops the threads, even with more input waiting """
+    before = threading.active_count()
+    stream = run_stages([str], iter(range(1000)), queue_size=1)
+    assert next(stream) == '0'
+    stream.close()
+    assert threading.active_count() == before
@@ -2,9 +2,13 @@
 Basic testing of part of speech tagging
 """
 
+import os
+import tempfile
+
 import pytest
 import stanza
 
+from stanza.models.pos.morph import build_morph_dict
 from tests import *
 
 pytestmark = pytest.mark.pipeline
@@ -26,3 +30,20 @@ def test_part_of_speech():
     nlp = stanza.Pipeline(**{'processors': 'tokenize,pos', 'dir': TEST_MODELS_DIR, 'lang': 'en'})
     doc = nlp(EN_DOC)
     assert EN_DOC_GOLD == '\n\n'.join([sent.tokens_string() for sent in doc.sentences])
+
+def test_morph_dict_post_filter():
+    """ A word whose tags are not in the dictionary gets the tags of its only dictionary entry """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        entries = os.path.join(tmp_dir, 'entries.conllu')
+        with open(entries, 'w', encoding='utf-8') as fout:
+            fout.write("1\tCalifornia\tCalifornia\tNOUN\tNN\tNumber=Sing\t_\t_\t_\t_\n\n")
+        dict_file = os.path.join(tmp_dir, 'morph.db')
+        build_morph_dict(dict_file, [entries])
+
+        nlp = stanza.Pipeline(**{'processors': 'tokenize,pos', 'dir': TEST_MODELS_DIR, 'lang': 'en',
+                                 'pos_morph_dict': dict_file})
+        doc = nlp(EN_DOC)
+        words = doc.sentences[0].words
+        assert (words[5].upos, words[5].xpos) == ('NOUN', 'NN')
+        # words which are not in the dictionary keep the tags of the tagger
+        assert (words[0].upos, words[0].xpos) == ('PROPN', 'NNP')
@@ -0,0 +1,52 @@
+"""
+Tests of the prediction path of the POS tagger model, which runs without the gold tags
+"""
+
+import pytest
+import torch
+
+from stanza.models.pos.data import DataLoader
+from stanza.models.pos.trainer import unpack_batch
+from tests import *
+from tests.pos_helpers import build_tiny_tagger
+
+pytestmark = [pytest.mark.travis, pytest.mark.pipeline]
+
+@pytest.fixture(scope="module")
+def trainer_and_data(tmp_path_factory):
+    torch.manual_seed(1234)
+    trainer, data = build_tiny_tagger(str(tmp_path_factory.mktemp("models")), ['--rec_dropout', '0.3'])
+    with torch.no_grad():
+        for p in trainer.model.parameters():
+            p.normal_(0, 0.5)
+    return trainer, DataLoader(data.doc, 10, trainer.args, None, vocab=data.vocab, evaluation=True, sort_during_eval=True)
+
+def test_forward_without_tags(trainer_and_data):
+    """ without the gold tags there is no loss, and the predictions are the same """
+    trainer, data = trainer_and_data
+    inputs, orig_idx, word_orig_idx, sentlens, wordlens, _ = unpack_batch(data[0], False)
+    word, word_mask, wordchars, wordchars_mask, upos, xpos, ufeats, pretrained = inputs
+
+    trainer.model.eval()
+    loss, preds = trainer.model(word, word_mask, wordchars, wordchars_mask, upos, xpos, ufeats, pretrained, word_orig_idx, sentlens, wordlens)
+    with torch.no_grad():
+        no_loss, no_tag_preds = trainer.model(word, word_mask, wordchars, wordchars_mask, None, None, None, pretrained, word_orig_idx, sentlens, wordlens)
+    assert loss.item() > 0
+    assert no_loss == 0
+    assert all(torch.equal(x, y) for x, y in zip(preds, no_tag_preds))
+    assert not any(x.requires_grad for x in no_tag_preds)
+
+def test_predict(trainer_and_data):
+    trainer, data = trainer_and_data
+    preds = trainer.predict(data[0])
+    assert [len(sentence) for sentence in preds] == [3, 2]
+    # prediction does not build a graph, so the parameters get no gradients from it
+    assert all(p.grad is None for p in trainer.model.parameters())
+
+def test_morph_topk(trainer_and_data):
+    """ the post-filter chooses from morph_topk candidate tags """
+    trainer, data = trainer_and_data
+    tagged = trainer.predict(data[0], candidates=True, num_candidates=2)
+    upos, feats = tagged.candidates[0][0]
+    assert len(upos) == 2
+    assert len(feats) == 2
@@ -0,0 +1,102 @@
+"""
+Tests of running a pipeline in forked worker processes
+"""
+
+import os
+
+import pytest
+
+from stanza.models.common.doc import Document
+from stanza.models.depparse.trainer import DecoderPool
+from stanza.pipeline.depparse_processor import DepparseProcessor
+from stanza.pipeline.worker_pool import PipelineWorkerPool, _pool_pipelines
+from tests import *
+
+pytestmark = [pytest.mark.travis, pytest.mark.pipeline]
+
+class FakePipeline():
+    """ splits the text of each document into one sentence of whitespace tokens, and notes the process """
+    loaded_processors = []
+
+    def process(self, docs):
+        for doc in docs:
+            tokens = doc.text.split()
+            doc.sentences = Document([[{'id': (i + 1,), 'text': token} for i, token in enumerate(tokens)]]).sentences
+            doc.text = "{} {}".format(os.getpid(), doc.text)
+        return docs
+
+@pytest.mark.parametrize("docs_per_task", [1, 3])
+def test_order(docs_per_task):
+    texts = ["text number {}".format(i) for i in range(20)]
+    with PipelineWorkerPool(FakePipeline(), 2, docs_per_task=docs_per_task) as pool:
+        docs = list(pool.map(iter(texts)))
+        stats = pool.stats()
+    assert [doc.text.split(' ', 1)[1] for doc in docs] == texts
+    assert all(len(doc.sentences[0].tokens) == 3 for doc in docs)
+    # the documents were processed in the workers, which report what they did
+    assert os.getpid() not in stats
+    assert sum(worker['docs'] for worker in stats.values()) == 20
+    assert sum(worker['sentences'] for worker in stats.values()) == 20
+    assert sum(worker['tasks'] for worker in stats.values()) == (20 + docs_per_task - 1) // docs_per_task
+
+def test_backpressure():
+    """ the input is only read a few tasks ahead of the results """
+    read = []
+    def texts():
+        for i in range(100):
+            read.append(i)
+            yield "text {}".format(i)
+    with PipelineWorkerPool(FakePipeline(), 2, max_pending=3) as pool:
+        docs = pool.map(texts())
+        next(docs)
+        assert len(read) <= 4
+
+def test_worker_replaced():
+    """ the workers forked after the pool started, here after every task, still have the pipeline """
+    with PipelineWorkerPool(FakePipeline(), 1, max_tasks_per_worker=1) as pool:
+        docs = list(pool.map(["text {}".format(i) for i in range(3)]))
+        assert len(_pool_pipelines) == 1
+    assert len(set(doc.text.split()[0] for doc in docs)) == 3
+    assert not _pool_pipelines
+
+class FakeTrainer():
+    """ scores a batch by doubling it, and decodes the scores by listing them """
+    def score(self, batch):
+        return [x * 2 for x in batch]
+
+    def decode(self, scores, unsort=True):
+        return list(scores)
+
+    def predict(self, batch, unsort=True):
+        return self.decode(self.score(batch), unsort)
+
+class DecodingPipeline(FakePipeline):
+    """ also runs the decoder pool of a parser on the length of each document """
+    def __init__(self):
+        processor = DepparseProcessor.__new__(DepparseProcessor)
+        processor._trainer = FakeTrainer()
+        processor._decoder_pool = DecoderPool(processor._trainer, 2)
+        self.loaded_processors = [processor]
+
+    def process(self, docs):
+        lengths = list(self.loaded_processors[0].decoder_pool.map([len(doc.text)] for doc in docs))
+        docs = super().process(docs)
+        for doc, length in zip(docs, lengths):
+            doc.text = "{} {}".format(doc.text, length[0])
+        return docs
+
+def test_fork_after_threads():
+    """ the threads of the decoder of a pipeline which already ran are stopped before forking it, and start again later """
+    pipeline = DecodingPipeline()
+    decoder_pool = pipeline.loaded_processors[0].decoder_pool
+    assert pipeline.process([Document([], text="before")])[0].text.endswith(" 12")
+    assert decoder_pool.executor is not None
+    with PipelineWorkerPool(pipeline, 2) as pool:
+        assert decoder_pool.executor is None
+        docs = list(pool.map(["text {}".format(i) for i in range(6)]))
+    assert [doc.text.split()[-1] for doc in docs] == ["12"] * 6
+    assert all(doc.text.split()[0] != str(os.getpid()) for doc in docs)
+    # used again, the pipeline starts its threads again
+    assert pipeline.process([Document([], text="after")])[0].text.endswith(" 10")
+    assert decoder_pool.executor is not None
+    decoder_pool.close()